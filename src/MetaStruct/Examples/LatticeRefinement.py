@@ -1,9 +1,8 @@
 import math
 
-import numpy as np
-
 from MetaStruct.Objects.Lattices.Gyroid import Gyroid
-from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.Misc.Field import LinearField
+from MetaStruct.Objects.Transforms.Warp import CylindricalWarp
 from MetaStruct.Objects.designspace import DesignSpace
 from MetaStruct.Objects.Shapes.Cuboid import Cuboid
 
@@ -14,18 +13,10 @@ def latticeRefinementExample():
 
     cuboid = Cuboid(ds, xd=2, yd=2, zd=0.5)
 
-    refinedLattice = Gyroid(ds, ny=math.pi/3, nz=2, vf=0.4)
-
-    refinedLattice.convert_to_cylindrical()
-
-    sphere = Sphere(ds, r=1.5)
-
-    sphere.evaluate_grid()
-
-    sphere.evaluated_grid = np.where(
-        sphere.evaluated_grid > 0, 0, sphere.evaluated_grid)
+    # The warp hands the gyroid (r, theta, z), so a ramp along x grades the volume fraction with the radius.
+    vf = LinearField(start=(0, 0, 0), end=(1.5, 0, 0), start_value=0.2, end_value=0.4)
 
-    refinedLattice.evaluated_grid -= sphere.evaluated_grid / 10
+    refinedLattice = CylindricalWarp(Gyroid(ds, ny=math.pi/3, nz=2, vf=vf))
 
     shape = cuboid / refinedLattice
 
@@ -33,4 +24,4 @@ def latticeRefinementExample():
 
 if __name__ == "__main__":
 
-    latticeRefinementExample()
\ No newline at end of file
+    latticeRefinementExample()
@@ -0,0 +1,332 @@
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+
+import numexpr as ne
+import numpy as np
+
+# Autotune results, saved so tuning runs once per machine and loaded with compute_context.load()
+AUTOTUNE_PATH = os.environ.get('METASTRUCT_AUTOTUNE',
+                               os.path.join(os.path.expanduser('~'), '.cache', 'metastruct', 'autotune.json'))
+
+# Functions used in the numexpr expressions of the shape library, and their NumPy equivalents
+NUMPY_FUNCTIONS = {'where': np.where, 'sqrt': np.sqrt, 'abs': np.abs, 'exp': np.exp, 'log': np.log,
+                   'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'arcsin': np.arcsin, 'arccos': np.arccos,
+                   'arctan': np.arctan, 'arctan2': np.arctan2, 'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+                   'floor': np.floor, 'ceil': np.ceil}
+
+
+class NumexprBackend:
+
+    name = 'numexpr'
+    available = True
+
+    def evaluate(self, expression, local_dict, out=None):
+
+        return ne.evaluate(expression, local_dict=local_dict, out=out, casting='same_kind')
+
+
+class NumpyBackend:
+    """Evaluates the expression with NumPy ufuncs, one temporary per operation."""
+
+    name = 'numpy'
+    available = True
+
+    def evaluate(self, expression, local_dict, out=None):
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = eval(compiled(expression), {'__builtins__': {}, **NUMPY_FUNCTIONS}, local_dict)
+
+        if out is None:
+            return values
+
+        out[...] = values
+
+        return out
+
+
+class NumbaBackend:
+    """Compiles each expression into a fused Numba ufunc, one pass with no temporaries. Only available if
+    numba is installed."""
+
+    name = 'numba'
+
+    def __init__(self):
+
+        self.kernels = {}
+
+    @property
+    def available(self):
+
+        try:
+            import numba
+
+        except ImportError:
+            return False
+
+        return True
+
+    def evaluate(self, expression, local_dict, out=None):
+
+        names = tuple(name for name in compiled(expression).co_names if name in local_dict)
+
+        if (expression, names) not in self.kernels:
+            self.kernels[(expression, names)] = self.compile(expression, names)
+
+        arguments = [local_dict[name] for name in names]
+
+        if out is None:
+            return self.kernels[(expression, names)](*arguments)
+
+        return self.kernels[(expression, names)](*arguments, out=out)
+
+    @staticmethod
+    def compile(expression, names):
+
+        import numba
+
+        @numba.njit
+        def where(condition, a, b):
+
+            return a if condition else b
+
+        namespace = {**NUMPY_FUNCTIONS, 'where': where}
+
+        exec(f'def kernel({", ".join(names)}):\n    return {expression}\n', namespace)
+
+        return numba.vectorize(nopython=True)(namespace['kernel'])
+
+
+BACKENDS = {backend.name: backend for backend in (NumexprBackend(), NumpyBackend(), NumbaBackend())}
+
+
+class ComputeContext:
+    """Backend and thread settings for every expression evaluated through evaluate().
+
+    backend is 'numexpr', 'numpy', 'numba', or 'auto' to use the autotuned choice for each node type and tile
+    size. Thread counts are only set here."""
+
+    def __init__(self, backend='numexpr', threads=None):
+
+        self.backend = backend
+        self.threads = None
+
+        # Node type -> tile size -> {'backend', 'threads', 'seconds'}
+        self.choices = {}
+
+        self.default_threads = threads or int(os.environ.get('METASTRUCT_THREADS', 0)) or \
+            min(ne.detect_number_of_cores(), ne.MAX_THREADS)
+
+        self.set_threads(self.default_threads)
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({self.backend!r}, {self.threads} threads, {len(self.choices)} tuned types)'
+
+    def set_threads(self, threads):
+
+        if threads == self.threads:
+            return
+
+        ne.set_num_threads(threads)
+
+        if 'numba' in sys.modules:
+            numba = sys.modules['numba']
+            numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+
+        self.threads = threads
+
+    def set_backend(self, backend):
+
+        if backend != 'auto' and (backend not in BACKENDS or not BACKENDS[backend].available):
+            raise ValueError(f'"{backend}" is not an available backend, use one of '
+                             f'{[name for name, b in BACKENDS.items() if b.available] + ["auto"]}.')
+
+        self.backend = backend
+
+    @contextlib.contextmanager
+    def using(self, backend=None, threads=None):
+        """Temporarily sets the backend and thread count."""
+
+        previous = self.backend, self.threads
+
+        if backend is not None:
+            self.set_backend(backend)
+
+        if threads is not None:
+            self.set_threads(threads)
+
+        try:
+            yield self
+
+        finally:
+            self.backend = previous[0]
+            self.set_threads(previous[1])
+
+    def resolve(self, node, size):
+        """(backend, threads) for a node type evaluating size points."""
+
+        if self.backend != 'auto':
+            return self.backend, self.threads
+
+        tuned = self.choices.get(type(node).__name__) if node is not None else None
+
+        if not tuned:
+            return 'numexpr', self.default_threads
+
+        # Nearest tuned tile, by side length on a log scale
+        side = max(size, 1) ** (1 / 3)
+        choice = tuned[min(tuned, key=lambda tile: abs(math.log(int(tile) / side)))]
+
+        return choice['backend'], choice['threads']
+
+    def save(self, path=AUTOTUNE_PATH):
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with open(path, 'w') as f:
+            json.dump({'cores': ne.detect_number_of_cores(), 'choices': self.choices}, f, indent=2)
+
+    def load(self, path=AUTOTUNE_PATH):
+        """Loads autotune results saved on this machine and switches to the 'auto' backend. Returns False if
+        there are none. Never called on import, so the backend only changes when asked to. Choices of backends
+        that are not available here are dropped."""
+
+        try:
+            with open(path) as f:
+                tuned = json.load(f)
+
+        except (OSError, ValueError):
+            return False
+
+        if tuned.get('cores') != ne.detect_number_of_cores():
+            return False
+
+        self.choices = {name: {tile: choice for tile, choice in tiles.items()
+                               if choice.get('backend') in BACKENDS and BACKENDS[choice['backend']].available}
+                        for name, tiles in tuned['choices'].items()}
+        self.backend = 'auto'
+
+        return True
+
+
+# Code objects of the expressions seen so far, for the NumPy and Numba backends
+COMPILED = {}
+
+
+def compiled(expression):
+
+    if expression not in COMPILED:
+        COMPILED[expression] = compile(expression, '<expression>', 'eval')
+
+    return COMPILED[expression]
+
+
+def evaluate(expression, local_dict=None, out=None, node=None):
+    """Evaluates a numexpr expression on the backend chosen for node, into out if given. Like ne.evaluate,
+    names are looked up in the caller's locals if local_dict is None."""
+
+    if local_dict is None:
+        local_dict = sys._getframe(1).f_locals
+
+    backend = compute_context.backend
+
+    if backend == 'auto':
+        size = out.size if out is not None else max((v.size for v in local_dict.values() if isinstance(v, np.ndarray)),
+                                                    default=1)
+
+        backend, threads = compute_context.resolve(node, size)
+        compute_context.set_threads(threads)
+
+    return BACKENDS[backend].evaluate(expression, local_dict, out)
+
+
+def autotune(shapes=None, tile_sizes=(16, 32, 64), threads=None, repeats=3, path=AUTOTUNE_PATH, verbose=True):
+    """Times every available backend and thread count on each node type and tile size, then makes the context
+    use the fastest ('auto'). shapes are nodes to tune, one per type (a sphere, cuboids, cylinder, line, torus
+    and the TPMS lattices if None). Results are saved to path (if not None) for
+    compute_context.load() to use in later sessions."""
+
+    if shapes is None:
+        shapes = default_shapes()
+
+    if threads is None:
+        threads = sorted({2 ** i for i in range(int(math.log2(compute_context.default_threads)) + 1)} |
+                         {compute_context.default_threads})
+
+    backends = [name for name, backend in BACKENDS.items() if backend.available]
+
+    for tile in tile_sizes:
+
+        axis = np.linspace(-1, 1, tile, dtype=np.float32)
+        x, y, z = np.meshgrid(axis, axis, axis, indexing='ij')
+        out = np.empty(x.shape, dtype=np.float32)
+
+        for shape in shapes:
+
+            timings = []
+
+            for backend in backends:
+
+                # NumPy runs on one thread whatever the setting
+                for n in (threads if backend != 'numpy' else threads[:1]):
+
+                    with compute_context.using(backend, n):
+
+                        # The first call compiles the expression
+                        shape.evaluate_point(x, y, z, out=out)
+
+                        seconds = min(timed(lambda: shape.evaluate_point(x, y, z, out=out)) for _ in range(repeats))
+
+                    timings.append((seconds, backend, n))
+
+            seconds, backend, n = min(timings)
+
+            compute_context.choices.setdefault(type(shape).__name__, {})[str(tile)] = \
+                {'backend': backend, 'threads': n, 'seconds': seconds}
+
+            if verbose is True:
+                print(f'{type(shape).__name__} ({tile}^3): {backend}, {n} threads, {seconds * 1e3:.2f} ms')
+
+    compute_context.backend = 'auto'
+
+    if path is not None:
+        compute_context.save(path)
+
+    return compute_context.choices
+
+
+def timed(function):
+
+    start = time.perf_counter()
+    function()
+
+    return time.perf_counter() - start
+
+
+def default_shapes():
+
+    from MetaStruct.Objects.designspace import DesignSpace
+    from MetaStruct.Objects.Lattices.Diamond import Diamond
+    from MetaStruct.Objects.Lattices.Gyroid import Gyroid
+    from MetaStruct.Objects.Lattices.Primitive import Primitive
+    from MetaStruct.Objects.Shapes.Cube import Cube
+    from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+    from MetaStruct.Objects.Shapes.Cylinder import Cylinder
+    from MetaStruct.Objects.Shapes.Line import Line
+    from MetaStruct.Objects.Shapes.Sphere import Sphere
+    from MetaStruct.Objects.Shapes.Spheroid import Spheroid
+    from MetaStruct.Objects.Shapes.Torus import Torus
+
+    ds = DesignSpace(resolution=4)
+
+    return [Sphere(ds, r=0.5), Spheroid(ds, xr=0.5, yr=0.3, zr=0.4), Cuboid(ds, xd=0.5, yd=0.3, zd=0.4),
+            Cube(ds, dim=0.5, round_r=0.1), Cylinder(ds, r1=0.4, r2=0.4, l=0.5), Line(ds, [0, 0, 0], [0.5, 0.5, 0]),
+            Torus(ds), Gyroid(ds, nx=2, ny=2, nz=2), Diamond(ds, nx=2, ny=2, nz=2), Primitive(ds, nx=2, ny=2, nz=2)]
+
+
+# Shared by every node. Uses numexpr until autotune() or compute_context.load() switch it to 'auto'.
+compute_context = ComputeContext()
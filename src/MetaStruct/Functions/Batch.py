@@ -0,0 +1,281 @@
+import concurrent.futures
+import contextlib
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import time
+import tracemalloc
+
+from MetaStruct.Functions.Backends import compute_context
+from MetaStruct.Functions.Scheduler import initialise
+from MetaStruct.Functions.Serialization import load_model, model_files
+
+# Scene files read from the scene directory
+SCENE_TYPES = ('.json', '.yaml', '.yml')
+
+# Suffix of the report written for each scene, never read as a scene
+REPORT_SUFFIX = '.report.json'
+
+# Jobs queued per process at a time, so the queue stays bounded however many scenes there are
+JOBS_PER_PROCESS = 2
+
+
+def run_batch(directory, output_directory=None, processes=None, force=False, verbose=True):
+    """Generates, meshes and exports every scene in directory with a pool of processes, and returns their reports.
+
+    A scene is a JSON or YAML file such as
+        {"model": "brackets.py:bracket", "parameters": {"thickness": 2, "mesh": "base.stl"},
+         "design_space": {"resolution": 150, "x_bounds": [0, 100]}, "level": 0, "format": "stl"}
+    where model is module:function or file.py:function (build if no function is given), called as
+    function(design_space, **parameters) to build the shape, or a model.json saved with save_model, which has
+    its own design space and no parameters. Saved models in directory are run as scenes of their own. Paths are
+    relative to the scene.
+
+    Outputs, a log of each job and a report of the status, timings and peak memory of each stage (generate, mesh,
+    export) go to output_directory (directory/output if None). Scenes whose contents, model file and parameter files
+    hash the same as in their last successful report are skipped unless force is True."""
+
+    if output_directory is None:
+        output_directory = os.path.join(directory, 'output')
+
+    os.makedirs(output_directory, exist_ok=True)
+
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.endswith(SCENE_TYPES) and not name.endswith(REPORT_SUFFIX))
+
+    processes = processes or os.cpu_count()
+
+    reports = {}
+    jobs = []
+
+    for path in paths:
+
+        try:
+            scene = load_scene(path)
+            digest = scene_hash(path, scene)
+
+        except (OSError, ValueError, ImportError) as error:
+            reports[path] = {'scene': path, 'status': 'failed', 'error': repr(error)}
+            continue
+
+        previous = read_report(path, output_directory)
+
+        if not force and previous.get('hash') == digest and previous.get('status') == 'done' and \
+                all(os.path.exists(output) for output in previous['outputs']):
+            reports[path] = {**previous, 'status': 'skipped'}
+            continue
+
+        jobs.append((path, scene, digest))
+
+    if verbose is True:
+        print(f'Running {len(jobs)} of {len(paths)} scenes in {processes} processes...')
+
+    # The cores are shared between the processes rather than each using all of them
+    threads = max(compute_context.default_threads // processes, 1)
+
+    with concurrent.futures.ProcessPoolExecutor(processes, initializer=initialise, initargs=(threads,)) as pool:
+
+        futures = {}
+
+        while jobs or futures:
+
+            while jobs and len(futures) < JOBS_PER_PROCESS * processes:
+                path, scene, digest = jobs.pop(0)
+                futures[pool.submit(run_job, path, scene, digest, output_directory)] = path
+
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+
+                path = futures.pop(future)
+
+                try:
+                    reports[path] = future.result()
+
+                # Eg. a process killed for running out of memory
+                except Exception as error:
+                    reports[path] = {'scene': path, 'status': 'failed', 'error': repr(error)}
+
+                if verbose is True:
+                    print(summary(reports[path]))
+
+    if verbose is True:
+        counts = {status: sum(report['status'] == status for report in reports.values())
+                  for status in ('done', 'skipped', 'failed')}
+
+        print(', '.join(f'{count} {status}' for status, count in counts.items()))
+
+    return [reports[path] for path in paths]
+
+
+def run_job(path, scene, digest, output_directory):
+    """Runs the stages of one scene, printing into its log, and writes its report. Runs in a pool process."""
+
+    name = scene_name(path)
+
+    report = {'scene': path, 'hash': digest, 'status': 'failed', 'stages': {}, 'outputs': [],
+              'log': os.path.join(output_directory, name + '.log')}
+
+    tracemalloc.start()
+
+    try:
+
+        with open(report['log'], 'w') as log, contextlib.redirect_stdout(log):
+
+            with stage(report, 'generate'):
+                shape = build_model(path, scene)
+                shape.evaluate_grid(sparse=scene.get('sparse', False))
+
+            with stage(report, 'mesh'):
+                shape.find_surface(scene.get('level', 0))
+
+            with stage(report, 'export'):
+                shape.save_mesh(os.path.join(output_directory, name), scene.get('format', 'stl'))
+
+            report['outputs'].append(shape.filename)
+
+        report['status'] = 'done'
+
+    except Exception as error:
+        report['error'] = repr(error)
+
+    finally:
+        tracemalloc.stop()
+
+    with open(report_path(path, output_directory), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    return report
+
+
+@contextlib.contextmanager
+def stage(report, name):
+    """Records the time and peak traced memory of the stage in the report."""
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+        report['stages'][name] = {'seconds': time.perf_counter() - start,
+                                  'peak_bytes': tracemalloc.get_traced_memory()[1]}
+
+
+def load_scene(path):
+
+    with open(path) as f:
+
+        if path.endswith('.json'):
+            scene = json.load(f)
+
+        else:
+            try:
+                import yaml
+
+            except ImportError:
+                raise ImportError('PyYAML is needed to read YAML scenes, pip install pyyaml.') from None
+
+            scene = yaml.safe_load(f)
+
+    # A model saved with save_model
+    if isinstance(scene, dict) and scene.get('format') == 'MetaStruct':
+        return {'model': os.path.basename(path)}
+
+    if not isinstance(scene, dict) or 'model' not in scene:
+        raise ValueError(f'Scene "{path}" does not name a model.')
+
+    return scene
+
+
+def build_model(path, scene):
+    """Builds the shape of a scene, in its design space."""
+
+    from MetaStruct.Objects.designspace import DesignSpace
+
+    module_name, _, function_name = scene['model'].partition(':')
+
+    if module_name.endswith('.json'):
+        return load_model(relative(path, module_name))
+
+    if module_name.endswith('.py'):
+        spec = importlib.util.spec_from_file_location(scene_name(module_name), relative(path, module_name))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+    else:
+        module = importlib.import_module(module_name)
+
+    model = getattr(module, function_name or 'build')
+
+    parameters = {name: relative(path, value) if is_file(path, value) else value
+                  for name, value in scene.get('parameters', {}).items()}
+
+    return model(DesignSpace(**scene.get('design_space', {})), **parameters)
+
+
+def scene_hash(path, scene):
+    """Hash of the scene and the contents of the files it uses."""
+
+    digest = hashlib.sha256(json.dumps(scene, sort_keys=True, default=str).encode())
+
+    module_name = scene['model'].partition(':')[0]
+    files = [module_name] if module_name.endswith('.py') else []
+
+    if module_name.endswith('.json'):
+        files = [os.path.relpath(file, os.path.dirname(path)) for file in model_files(relative(path, module_name))]
+
+    files += [value for value in scene.get('parameters', {}).values() if is_file(path, value)]
+
+    for file in files:
+
+        digest.update(file.encode())
+
+        with open(relative(path, file), 'rb') as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b''):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def read_report(path, output_directory):
+
+    try:
+        with open(report_path(path, output_directory)) as f:
+            return json.load(f)
+
+    except (OSError, ValueError):
+        return {}
+
+
+def summary(report):
+
+    stages = ', '.join(f'{name} {timing["seconds"]:.2f} s / {timing["peak_bytes"] / 2 ** 20:.0f} MiB'
+                       for name, timing in report.get('stages', {}).items())
+
+    return f'{scene_name(report["scene"])}: {report["status"]}' + (f' ({stages})' if stages else '') + \
+        (f' {report["error"]}' if 'error' in report else '')
+
+
+def scene_name(path):
+
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def report_path(path, output_directory):
+
+    return os.path.join(output_directory, scene_name(path) + REPORT_SUFFIX)
+
+
+def relative(path, file):
+    """file relative to the directory of the scene at path."""
+
+    return os.path.join(os.path.dirname(path), file)
+
+
+def is_file(path, value):
+
+    return isinstance(value, str) and os.path.isfile(relative(path, value))
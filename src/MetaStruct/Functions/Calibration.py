@@ -0,0 +1,85 @@
+import hashlib
+import math
+import os
+
+import numexpr as ne
+import numpy as np
+
+CALIBRATION_RESOLUTION = 64
+CALIBRATION_LEVELS = 257
+
+_tables = {}
+
+
+def cache_directory():
+    """Directory the calibration tables are saved to, METASTRUCT_CACHE if set."""
+
+    return os.environ.get('METASTRUCT_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'metastruct'))
+
+
+def measure_levels(surface, resolution=CALIBRATION_RESOLUTION, levels=CALIBRATION_LEVELS):
+    """Samples surface over one unit cell and returns (vf, t): the fraction of voxels with a surface value
+    at or below each level t. Levels are quantiles of the sorted voxel values, so the table is monotone."""
+
+    centres = (np.arange(resolution, dtype=np.float32) + 0.5) / resolution
+
+    x, y, z = np.meshgrid(centres, centres, centres, indexing='ij')
+
+    parameters = {'x': x, 'y': y, 'z': z, 'x0': 0., 'y0': 0., 'z0': 0.,
+                  'kx': 2 * math.pi, 'ky': 2 * math.pi, 'kz': 2 * math.pi}
+
+    values = np.sort(ne.evaluate(surface, local_dict=parameters), axis=None).astype(np.float64)
+
+    vf = np.linspace(0, 1, levels)
+    t = np.interp(vf * (values.size - 1), np.arange(values.size), values)
+
+    return vf, np.maximum.accumulate(t)
+
+
+def calibration_table(name, surface, resolution=CALIBRATION_RESOLUTION, levels=CALIBRATION_LEVELS):
+    """(vf, t) table for a lattice surface, measured once and then read from memory or the disk cache."""
+
+    digest = hashlib.sha1(f'{surface}|{resolution}|{levels}'.encode()).hexdigest()[:16]
+
+    key = (name, digest)
+
+    if key in _tables:
+        return _tables[key]
+
+    path = os.path.join(cache_directory(), f'calibration_{name}_{digest}.npz')
+
+    try:
+
+        with np.load(path) as data:
+            table = data['vf'], data['t']
+
+    except (OSError, KeyError, ValueError):
+
+        print(f'Calibrating {name} volume fraction...')
+
+        table = measure_levels(surface, resolution, levels)
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.savez(path, vf=table[0], t=table[1])
+
+        except OSError:
+            pass
+
+    _tables[key] = table
+
+    return table
+
+
+def calibrated_threshold(name, surface, vf):
+    """Level set value t at which the solid (surface <= t) fills volume fraction vf of a unit cell.
+    vf may be a number or an array, for graded lattices."""
+
+    table_vf, table_t = calibration_table(name, surface)
+
+    t = np.interp(vf, table_vf, table_t)
+
+    if np.ndim(t) == 0:
+        return float(t)
+
+    return t.astype(np.float32, copy=False)
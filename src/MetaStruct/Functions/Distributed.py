@@ -0,0 +1,427 @@
+import collections
+import contextlib
+import hmac
+import json
+import os
+import pickle
+import secrets
+import selectors
+import socket
+import struct
+import subprocess
+import sys
+import uuid
+
+import numpy as np
+
+from MetaStruct.Objects.BufferArena import store
+
+# Address metastruct-worker listens on by default. Use unix:path for a Unix socket.
+DEFAULT_ADDRESS = '127.0.0.1:7411'
+
+# Message kind, length of the JSON metadata and length of the raw data that follow
+HEADER = struct.Struct('!4sIQ')
+
+SCENE, TILE, RESULT, ERROR = b'SCEN', b'TILE', b'RSLT', b'ERRR'
+
+# Sent by a worker to a new client, answered with the HMAC of the challenge, then accepted (or the connection closed)
+CHALLENGE, RESPONSE, ACCEPTED = b'CHAL', b'AUTH', b'OKAY'
+
+# Environment variable holding the shared key workers and clients authenticate with
+AUTHKEY_VARIABLE = 'METASTRUCT_AUTHKEY'
+
+# Largest message, and seconds, a worker waits for from a client that has not authenticated yet
+AUTH_MESSAGE_SIZE = 1024
+AUTH_TIMEOUT = 10
+
+# Tile jobs sent to each worker ahead of its results, so workers are not idle while results are in transit
+PIPELINE = 2
+
+
+def distributed_evaluate(shape, workers, tile_size=64, retries=3, timeout=60, verbose=True, authkey=None):
+    """Evaluates the grid of shape tile by tile on metastruct-worker processes, eg. on several machines.
+
+    The tree and its design space are pickled and sent to every worker in workers (addresses host:port or
+    unix:path) once, then tiles of tile_size samples per side are handed out as jobs and their float32 values
+    received as raw buffers into the grid. Jobs of a worker that disconnects or sends nothing for timeout seconds
+    are reassigned to the others, and a job that fails more than retries times raises a RuntimeError. The grid
+    is returned and stored as shape.evaluated_grid.
+
+    Workers unpickle what they are sent, so they only serve clients holding their authkey (bytes or str, the
+    METASTRUCT_AUTHKEY environment variable if None). It is never sent, but messages are not encrypted, so
+    only use workers on trusted networks."""
+
+    ds = shape.design_space
+    authkey = get_authkey(authkey)
+
+    scene = uuid.uuid4().hex
+    payload = pickle.dumps(shape, protocol=pickle.HIGHEST_PROTOCOL)
+
+    selector = selectors.DefaultSelector()
+
+    # Socket -> (address, jobs in flight)
+    connections = {}
+
+    for address in workers:
+
+        try:
+            connection = connect(address, timeout)
+            answer_challenge(connection, authkey)
+            send_message(connection, SCENE, {'scene': scene}, payload)
+
+        except OSError as error:
+            print(f'Worker {address} is unavailable ({error}).')
+            continue
+
+        connections[connection] = (address, [])
+        selector.register(connection, selectors.EVENT_READ)
+
+    grid = np.empty((len(ds.X), len(ds.Y), len(ds.Z)), dtype=ds.DATA_TYPE)
+
+    jobs = collections.deque(enumerate(ds.tiles(tile_size)))
+    attempts = collections.Counter()
+    remaining = len(jobs)
+
+    if verbose is True:
+        print(f'Evaluating {shape.name} in {remaining} tiles on {len(connections)} workers...')
+
+    def retry(job, tile, reason):
+
+        attempts[job] += 1
+
+        if attempts[job] > retries:
+            raise RuntimeError(f'Tile {job} failed {attempts[job]} times, last with: {reason}')
+
+        jobs.appendleft((job, tile))
+
+    def lose(connection, reason):
+
+        address, in_flight = connections.pop(connection)
+
+        selector.unregister(connection)
+        connection.close()
+
+        print(f'Worker {address} lost ({reason}), reassigning {len(in_flight)} tiles.')
+
+        for job, tile in in_flight:
+            retry(job, tile, f'worker {address} lost')
+
+    try:
+
+        while remaining > 0:
+
+            if not connections:
+                raise ConnectionError(f'No workers left with {remaining} tiles to evaluate.')
+
+            for connection, (address, in_flight) in list(connections.items()):
+
+                try:
+                    while jobs and len(in_flight) < PIPELINE:
+                        job, tile = jobs[0]
+
+                        send_message(connection, TILE, {'scene': scene, 'job': job,
+                                                        'tile': [(t.start, t.stop) for t in tile]})
+
+                        in_flight.append(jobs.popleft())
+
+                except OSError as error:
+                    lose(connection, error)
+
+            events = selector.select(timeout)
+
+            if not events:
+
+                for connection, (_, in_flight) in list(connections.items()):
+                    if in_flight:
+                        lose(connection, f'no result in {timeout} s')
+
+            for key, _ in events:
+
+                connection = key.fileobj
+
+                # Lost while handling an earlier event
+                if connection not in connections:
+                    continue
+
+                try:
+                    kind, meta, data = receive_message(connection)
+
+                except OSError as error:
+                    lose(connection, error)
+                    continue
+
+                in_flight = connections[connection][1]
+                job, tile = next(entry for entry in in_flight if entry[0] == meta['job'])
+                in_flight.remove((job, tile))
+
+                if kind == RESULT:
+                    grid[tile] = np.frombuffer(data, dtype=ds.DATA_TYPE).reshape(meta['shape'])
+                    remaining -= 1
+
+                else:
+                    retry(job, tile, meta['error'])
+
+    finally:
+
+        for connection in connections:
+            connection.close()
+
+        selector.close()
+
+    shape.evaluated_grid = grid
+    shape.dirty_region = None
+    shape.sign_only = False
+
+    return grid
+
+
+def serve(address=DEFAULT_ADDRESS, verbose=True, authkey=None):
+    """Listens on address (host:port, port 0 for any free port, or unix:path) and evaluates the tile jobs of
+    distributed_evaluate until interrupted. One client is served at a time, and only once it has proven it holds
+    authkey (see distributed_evaluate)."""
+
+    authkey = get_authkey(authkey)
+    family, location = parse_address(address)
+
+    with socket.socket(family, socket.SOCK_STREAM) as server:
+
+        if family == socket.AF_UNIX:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(location)
+
+        else:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        server.bind(location)
+        server.listen()
+
+        name = f'unix:{location}' if family == socket.AF_UNIX else '{}:{}'.format(*server.getsockname())
+
+        # Always printed, local_workers reads it to find the port
+        print(f'Listening on {name}', flush=True)
+
+        while True:
+
+            connection, _ = server.accept()
+
+            # A client that disconnects mid-reply, or fails to authenticate, is just dropped
+            with connection, contextlib.suppress(OSError):
+
+                if authenticate(connection, authkey):
+                    handle(connection, verbose)
+
+                elif verbose is True:
+                    print('Rejected a client with the wrong authkey')
+
+
+def get_authkey(authkey=None):
+    """authkey as bytes, read from the METASTRUCT_AUTHKEY environment variable if None."""
+
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_VARIABLE)
+
+    if not authkey:
+        raise ValueError(f'No authkey given, pass one or set the {AUTHKEY_VARIABLE} environment variable.')
+
+    return os.fsencode(authkey) if isinstance(authkey, str) else bytes(authkey)
+
+
+def authenticate(connection, authkey):
+    """Challenges a new client to prove it holds authkey. Returns False if it does not."""
+
+    challenge = secrets.token_bytes(32)
+
+    connection.settimeout(AUTH_TIMEOUT)
+    send_message(connection, CHALLENGE, {}, challenge)
+
+    kind, _, response = receive_message(connection, AUTH_MESSAGE_SIZE)
+
+    if kind != RESPONSE or not hmac.compare_digest(response, hmac.new(authkey, challenge, 'sha256').digest()):
+        return False
+
+    send_message(connection, ACCEPTED, {})
+    connection.settimeout(None)
+
+    return True
+
+
+def answer_challenge(connection, authkey):
+    """Proves to a worker that this client holds authkey. Raises ConnectionError if the worker rejects it."""
+
+    kind, _, challenge = receive_message(connection, AUTH_MESSAGE_SIZE)
+
+    if kind != CHALLENGE:
+        raise ConnectionError('Expected an authentication challenge.')
+
+    send_message(connection, RESPONSE, {}, hmac.new(authkey, challenge, 'sha256').digest())
+
+    try:
+        kind, _, _ = receive_message(connection, AUTH_MESSAGE_SIZE)
+
+    except ConnectionError:
+        raise ConnectionError('The worker rejected the authkey.') from None
+
+    if kind != ACCEPTED:
+        raise ConnectionError('The worker rejected the authkey.')
+
+
+def handle(connection, verbose=True):
+    """Serves one client until it disconnects. Scenes are kept for the connection only."""
+
+    scenes = {}
+
+    while True:
+
+        try:
+            kind, meta, data = receive_message(connection)
+
+        except OSError:
+            return
+
+        if kind == SCENE:
+
+            try:
+                scenes[meta['scene']] = pickle.loads(data)
+
+            except Exception as error:
+                # Reported as the error of each tile of the scene
+                scenes[meta['scene']] = error
+
+            if verbose is True:
+                print(f'Received scene {meta["scene"]}')
+
+            continue
+
+        try:
+            scene = scenes[meta['scene']]
+
+            if isinstance(scene, Exception):
+                raise scene
+
+            values = evaluate_tile(scene, tuple(slice(*t) for t in meta['tile']))
+
+        except Exception as error:
+            send_message(connection, ERROR, {'job': meta['job'], 'error': repr(error)})
+            continue
+
+        send_message(connection, RESULT, {'job': meta['job'], 'shape': values.shape}, values)
+
+
+def evaluate_tile(shape, tile):
+    """Values of shape on the tile, with its coordinates built from the axes rather than the full sample grids."""
+
+    ds = shape.design_space
+
+    x, y, z = np.meshgrid(ds.X[tile[0]], ds.Y[tile[1]], ds.Z[tile[2]], indexing='ij')
+    out = np.empty(x.shape, dtype=ds.DATA_TYPE)
+
+    return store(shape.evaluate_point(x, y, z, out=out), out)
+
+
+@contextlib.contextmanager
+def local_workers(count=2, threads=1, authkey=None):
+    """Starts count metastruct-worker processes of threads threads each on this machine, for testing or to use
+    the cores of one machine. They serve clients holding authkey (see distributed_evaluate). Yields their
+    addresses, and stops them on exit."""
+
+    environment = {**os.environ, AUTHKEY_VARIABLE: os.fsdecode(get_authkey(authkey))}
+
+    processes = [subprocess.Popen([sys.executable, '-m', 'MetaStruct.worker', '--address', '127.0.0.1:0',
+                                   '--threads', str(threads), '--quiet'], stdout=subprocess.PIPE, text=True,
+                                  env=environment)
+                 for _ in range(count)]
+
+    try:
+        addresses = []
+
+        for process in processes:
+
+            for line in process.stdout:
+                if line.startswith('Listening on '):
+                    addresses.append(line.split()[-1])
+                    break
+
+            else:
+                raise RuntimeError(f'Worker {process.pid} exited with {process.wait()} before listening.')
+
+        yield addresses
+
+    finally:
+
+        for process in processes:
+            process.kill()
+            process.wait()
+            process.stdout.close()
+
+
+def parse_address(address):
+    """(socket family, address) for host:port or unix:path."""
+
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+
+    host, _, port = address.rpartition(':')
+
+    if not host or not port.isdigit():
+        raise ValueError(f'Invalid worker address "{address}", use host:port or unix:path.')
+
+    return socket.AF_INET, (host, int(port))
+
+
+def connect(address, timeout=None):
+
+    family, location = parse_address(address)
+
+    connection = socket.socket(family, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+
+    try:
+        connection.connect(location)
+
+    except OSError:
+        connection.close()
+        raise
+
+    return connection
+
+
+def send_message(connection, kind, meta, data=b''):
+
+    meta = json.dumps(meta).encode()
+    data = memoryview(data).cast('B')
+
+    connection.sendall(HEADER.pack(kind, len(meta), len(data)) + meta)
+    connection.sendall(data)
+
+
+def receive_message(connection, limit=None):
+    """(kind, metadata, data) of the next message. Raises ConnectionError if the connection is closed, or the
+    message is longer than limit bytes."""
+
+    kind, meta_length, data_length = HEADER.unpack(receive_exactly(connection, HEADER.size))
+
+    if limit is not None and meta_length + data_length > limit:
+        raise ConnectionError(f'Message of {meta_length + data_length} bytes is over the limit of {limit}.')
+
+    meta = json.loads(receive_exactly(connection, meta_length))
+
+    return kind, meta, receive_exactly(connection, data_length)
+
+
+def receive_exactly(connection, length):
+
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+
+    received = 0
+
+    while received < length:
+
+        n = connection.recv_into(view[received:])
+
+        if n == 0:
+            raise ConnectionError('Connection closed.')
+
+        received += n
+
+    return buffer
@@ -0,0 +1,119 @@
+import math
+
+import numpy as np
+
+# Interval arithmetic on (lo, hi) pairs of numbers or arrays. Arrays hold one interval per box, so a whole
+# level of an octree is bounded in one call.
+
+
+def unbounded(x):
+    """(-inf, inf) for every box of the interval x."""
+
+    shape = np.shape(x[0])
+
+    return np.full(shape, -np.inf), np.full(shape, np.inf)
+
+
+def point(value):
+
+    return value, value
+
+
+def add(a, b):
+
+    return a[0] + b[0], a[1] + b[1]
+
+
+def sub(a, b):
+
+    return a[0] - b[1], a[1] - b[0]
+
+
+def neg(a):
+
+    return -a[1], -a[0]
+
+
+def offset(a, c):
+
+    return a[0] + c, a[1] + c
+
+
+def scale(a, c):
+
+    if np.ndim(c) == 0 and c >= 0:
+        return a[0] * c, a[1] * c
+
+    return np.minimum(a[0] * c, a[1] * c), np.maximum(a[0] * c, a[1] * c)
+
+
+def mul(a, b):
+
+    products = (a[0] * b[0], a[0] * b[1], a[1] * b[0], a[1] * b[1])
+
+    return np.minimum.reduce(products), np.maximum.reduce(products)
+
+
+def square(a):
+
+    lo2, hi2 = a[0] ** 2, a[1] ** 2
+    straddles = (a[0] < 0) & (a[1] > 0)
+
+    return np.where(straddles, 0, np.minimum(lo2, hi2)), np.maximum(lo2, hi2)
+
+
+def absolute(a):
+
+    straddles = (a[0] < 0) & (a[1] > 0)
+
+    return np.where(straddles, 0, np.minimum(np.abs(a[0]), np.abs(a[1]))), np.maximum(np.abs(a[0]), np.abs(a[1]))
+
+
+def sqrt(a):
+
+    return np.sqrt(np.maximum(a[0], 0)), np.sqrt(np.maximum(a[1], 0))
+
+
+def exp(a):
+
+    return np.exp(a[0]), np.exp(a[1])
+
+
+def log(a):
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.log(np.maximum(a[0], 0)), np.log(np.maximum(a[1], 0))
+
+
+def maximum(a, b):
+
+    return np.maximum(a[0], b[0]), np.maximum(a[1], b[1])
+
+
+def minimum(a, b):
+
+    return np.minimum(a[0], b[0]), np.minimum(a[1], b[1])
+
+
+def sin(a):
+
+    lo, hi = np.broadcast_arrays(np.asarray(a[0], dtype=float), np.asarray(a[1], dtype=float))
+
+    ends = np.sin(lo), np.sin(hi)
+
+    # The interval reaches a maximum if it contains pi/2 + 2*pi*k, and a minimum if it contains -pi/2 + 2*pi*k
+    peak = math.pi / 2 + 2 * math.pi * np.ceil((lo - math.pi / 2) / (2 * math.pi)) <= hi
+    trough = -math.pi / 2 + 2 * math.pi * np.ceil((lo + math.pi / 2) / (2 * math.pi)) <= hi
+
+    return np.where(trough, -1., np.minimum(*ends)), np.where(peak, 1., np.maximum(*ends))
+
+
+def cos(a):
+
+    return sin(offset(a, math.pi / 2))
+
+
+def contains(a, value):
+    """True for the boxes whose interval may contain value."""
+
+    return (a[0] <= value) & (value <= a[1])
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def quantise(vertices, spacing, scale=1024):
+    """Integer coordinates of vertices on a lattice of spacing/scale."""
+
+    return np.rint(vertices / (spacing / scale)).astype(np.int64)
+
+
+def pack(q, extent):
+    """One int64 key per row of non-negative integer coordinates q, with q[..., i] < extent[i]."""
+
+    return (q[..., 0] * extent[1] + q[..., 1]) * extent[2] + q[..., 2]
+
+
+def weld(vertices, faces, keys, shared=None, normals=None):
+    """Merges vertices with equal integer keys (eg. packed quantised positions) and drops the faces that
+    collapse. Only vertices flagged in shared (all if None) can have duplicates, eg. those on the faces of
+    separately meshed blocks. Returns (vertices, faces, normals), keeping the first copy of each vertex."""
+
+    if shared is None:
+        shared = np.ones(len(vertices), dtype=bool)
+
+    own = np.flatnonzero(~shared)
+    candidates = np.flatnonzero(shared)
+
+    _, first, inverse = np.unique(keys[candidates], return_index=True, return_inverse=True)
+
+    remap = np.empty(len(vertices), dtype=np.int64 if len(vertices) >= 2 ** 31 else np.int32)
+    remap[own] = np.arange(len(own))
+    remap[candidates] = len(own) + inverse.reshape(-1)
+
+    kept = np.concatenate([own, candidates[first]])
+
+    faces = remap[faces]
+
+    collapsed = (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 2] == faces[:, 0])
+
+    if normals is not None:
+        normals = normals[kept]
+
+    return vertices[kept], faces[~collapsed], normals
@@ -1,22 +1,24 @@
-import numpy as np
+from MetaStruct.Objects.Misc.Field import LinearField
 
 
 def create_modifier_array(shape, min_val=0., max_val=1., dim='x', func=None):
+    """Evaluates a linear ramp from min_val to max_val across the design space along dim.
 
-    res = shape.design_space.resolution
+    Lattice parameters also accept a LinearField directly, which is evaluated with the lattice and avoids
+    this full-size array."""
 
-    arr2D = np.linspace(min_val, max_val, res, dtype=np.dtype('f4'))
+    design_space = shape.design_space
 
-    Y, Z, X = np.meshgrid(arr2D, arr2D, arr2D)
+    start = (design_space.X[0], design_space.Y[0], design_space.Z[0])
+    end = {'x': (design_space.X[-1], design_space.Y[0], design_space.Z[0]),
+           'y': (design_space.X[0], design_space.Y[-1], design_space.Z[0]),
+           'z': (design_space.X[0], design_space.Y[0], design_space.Z[-1])}[dim]
 
-    if dim == 'x':
+    field = LinearField(start, end, min_val, max_val)
 
-        return X
+    values = field.evaluate_point(design_space.x_grid, design_space.y_grid, design_space.z_grid)
 
-    if dim == 'y':
+    if func is not None:
+        return func(values)
 
-        return Y
-
-    if dim == 'z':
-
-        return Z
+    return values
@@ -0,0 +1,112 @@
+import itertools
+
+import numpy as np
+
+from MetaStruct.Objects.SparseGrid import SparseGrid
+
+# Points evaluated per evaluate_point call when filling the blocks that may contain the surface
+OCTREE_CHUNK = 2 ** 20
+
+
+def octree_evaluate(shape, level=0, min_block=8, verbose=True, sparse=False):
+    """Evaluates shape on its design space grid, densely only in blocks that may contain the surface.
+
+    The grid is split recursively into blocks of samples. Each block is bounded with shape.evaluate_interval
+    over its box grown by one sample on each side, so no grid edge leaving the block can cross level when the
+    bounds are on one side of it. Such blocks are filled with their bound nearest level and not split further.
+    Blocks of at most min_block samples per side that may contain the surface are evaluated with
+    evaluate_point, so marching cubes gives the same surface as a full evaluation. The grid is returned and
+    stored as shape.evaluated_grid, as a SparseGrid of min_block sized blocks if sparse is True."""
+
+    if sparse is True:
+        shape.evaluated_grid = SparseGrid.from_shape(shape, min_block, level, verbose)
+        shape.dirty_region = None
+        shape.sign_only = False
+
+        return shape.evaluated_grid
+
+    ds = shape.design_space
+    axes = (ds.X, ds.Y, ds.Z)
+    shape_n = np.array([len(axis) for axis in axes])
+
+    grid = np.empty(tuple(shape_n), dtype=ds.DATA_TYPE)
+
+    # Rows of (start, stop) sample indices per axis
+    blocks = np.array([[0, 0, 0, *shape_n]])
+    dense = []
+    n_pruned = 0
+
+    while len(blocks) > 0:
+
+        starts, stops = blocks[:, :3], blocks[:, 3:]
+
+        lower = np.maximum(starts - 1, 0)
+        upper = np.minimum(stops, shape_n - 1)
+
+        box = [(axes[i][lower[:, i]], axes[i][upper[:, i]]) for i in range(3)]
+
+        lo, hi = (np.broadcast_to(bound, (len(blocks),)) for bound in shape.evaluate_interval(*box))
+
+        outside = lo > level
+        inside = hi < level
+
+        for block, value in zip(blocks[outside], lo[outside]):
+            grid[block[0]:block[3], block[1]:block[4], block[2]:block[5]] = value
+
+        for block, value in zip(blocks[inside], hi[inside]):
+            grid[block[0]:block[3], block[1]:block[4], block[2]:block[5]] = value
+
+        n_pruned += np.prod(stops[outside | inside] - starts[outside | inside], axis=1).sum()
+
+        blocks = blocks[~(outside | inside)]
+
+        small = (blocks[:, 3:] - blocks[:, :3] <= min_block).all(axis=1)
+        dense.extend(blocks[small])
+
+        blocks = split(blocks[~small], min_block)
+
+    if verbose is True:
+        print(f'Evaluating {shape.name} at {1 - n_pruned / grid.size:.1%} of grid points '
+              f'({len(dense)} blocks)...')
+
+    if dense:
+
+        index = np.concatenate([np.ravel_multi_index(np.ix_(*[np.arange(b[i], b[i + 3]) for i in range(3)]),
+                                                     tuple(shape_n)).reshape(-1) for b in dense])
+
+        values = grid.reshape(-1)
+        x, y, z = ds.x_grid.reshape(-1), ds.y_grid.reshape(-1), ds.z_grid.reshape(-1)
+
+        for start in range(0, len(index), OCTREE_CHUNK):
+            i = index[start:start + OCTREE_CHUNK]
+            values[i] = shape.evaluate_point(x[i], y[i], z[i])
+
+    shape.evaluated_grid = grid
+    shape.dirty_region = None
+
+    # Pruned blocks hold bounds rather than values
+    shape.sign_only = True
+
+    return grid
+
+
+def split(blocks, min_block):
+    """Halves each block along the axes longer than min_block, giving up to 8 children per block."""
+
+    halves = []
+
+    for i in range(3):
+
+        start, stop = blocks[:, i], blocks[:, i + 3]
+        middle = np.where(stop - start > min_block, (start + stop) // 2, stop)
+
+        halves.append(((start, middle), (middle, stop)))
+
+    children = []
+
+    for (x, y, z) in itertools.product(*halves):
+        children.append(np.stack([x[0], y[0], z[0], x[1], y[1], z[1]], axis=1))
+
+    children = np.concatenate(children)
+
+    return children[(children[:, 3:] > children[:, :3]).all(axis=1)]
@@ -0,0 +1,107 @@
+import itertools
+
+import numpy as np
+
+from MetaStruct.Objects.SparseGrid import SparseGrid
+
+# Corner offsets of a cell, and of the children of a cell at the next level
+CORNERS = np.array(list(itertools.product((0, 1), repeat=3)))
+
+# Points evaluated per evaluate_point call at the intermediate levels
+REFINEMENT_CHUNK = 2 ** 20
+
+
+def refine_evaluate(shape, levels=3, gradient_bound=1., level=0, block_size=16, verbose=True):
+    """Evaluates shape on its design space grid, then only near the surface at 2, 4, ... 2**levels times finer
+    spacing, and returns the finest level as a SparseGrid (also stored as shape.evaluated_grid).
+
+    A cell is refined while any corner is within gradient_bound times the cell diagonal of level, or its corners
+    differ in sign. Cells that are not refined then cannot contain the surface as long as the field changes no
+    faster than gradient_bound (1 for the distance-like primitives, more for lattices). Every finest cell near the
+    surface lies in a dense leaf of one uniform grid, so the marching cubes mesh has no cracks between levels."""
+
+    if levels < 1:
+        raise ValueError('At least one level of refinement is needed.')
+
+    ds = shape.design_space
+
+    coarse = np.asarray(shape.evaluate_point(ds.x_grid, ds.y_grid, ds.z_grid), dtype=ds.DATA_TYPE)
+
+    # The 8 corner values of every coarse cell, as views
+    corners = [coarse[i:coarse.shape[0] - 1 + i, j:coarse.shape[1] - 1 + j, k:coarse.shape[2] - 1 + k]
+               for i, j, k in CORNERS]
+
+    bound = gradient_bound * np.linalg.norm((ds.x_step, ds.y_step, ds.z_step))
+
+    lo, hi = np.minimum.reduce(corners), np.maximum.reduce(corners)
+    nearest = np.minimum.reduce([np.abs(corner - level) for corner in corners])
+
+    # Cells of the next level, as the sample indices of their lowest corners
+    cells = children(np.argwhere(((lo <= level) & (hi >= level)) | (nearest < bound)))
+
+    for step in range(1, levels):
+
+        if verbose is True:
+            print(f'Refining {shape.name}: {len(cells)} cells at {2 ** step}x resolution...')
+
+        axes, steps = ds.axes(2 ** step)
+
+        values = evaluate_corners(shape, cells, axes)
+
+        mixed = (values.min(axis=1) <= level) & (values.max(axis=1) >= level)
+        near = np.abs(values - level).min(axis=1) < gradient_bound * np.linalg.norm(steps)
+
+        cells = children(cells[mixed | near])
+
+    axes, _ = ds.axes(2 ** levels)
+
+    grid = SparseGrid([len(axis) for axis in axes], block_size, level, dtype=ds.DATA_TYPE)
+    grid.axes = axes
+
+    leaves = np.zeros(grid.counts, dtype=bool)
+
+    for corner in CORNERS:
+        leaves[tuple(((cells + corner) // block_size).T)] = True
+
+    # Blocks away from the surface are on one side of it throughout, so one sample sets each tile
+    tiles = np.argwhere(~leaves)
+
+    if len(tiles) > 0:
+
+        centres = [axes[i][np.minimum(tiles[:, i] * block_size + block_size // 2, len(axes[i]) - 1)] for i in range(3)]
+
+        grid.states[tuple(tiles.T)] = np.where(np.asarray(shape.evaluate_point(*centres)) < level,
+                                               SparseGrid.INSIDE, SparseGrid.OUTSIDE)
+
+    keys = [tuple(key) for key in np.argwhere(leaves)]
+
+    if verbose is True:
+        print(f'Evaluating {shape.name} in {len(keys)} of {leaves.size} blocks at {2 ** levels}x resolution...')
+
+    grid.evaluate_blocks(shape, keys, axes)
+
+    shape.evaluated_grid = grid
+    shape.dirty_region = None
+    shape.sign_only = False
+
+    return grid
+
+
+def children(cells):
+    """The 8 cells of the next level inside each cell."""
+
+    return (2 * cells[:, None, :] + CORNERS).reshape(-1, 3)
+
+
+def evaluate_corners(shape, cells, axes):
+    """Values of shape at the 8 corners of each cell, (n, 8)."""
+
+    values = np.empty((len(cells), len(CORNERS)), dtype=axes[0].dtype)
+
+    for start in range(0, len(cells), REFINEMENT_CHUNK // len(CORNERS)):
+
+        corners = cells[start:start + REFINEMENT_CHUNK // len(CORNERS), None, :] + CORNERS
+
+        values[start:start + len(corners)] = shape.evaluate_point(*[axes[i][corners[..., i]] for i in range(3)])
+
+    return values
@@ -0,0 +1,186 @@
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from MetaStruct.Functions.Backends import compute_context
+from MetaStruct.Objects.BufferArena import store
+from MetaStruct.Objects.Geometry import Geometry
+
+# Subtrees submitted to the pool per process at a time, so shared blocks only exist for the work in flight
+TASKS_PER_PROCESS = 2
+
+
+def parallel_evaluate(shape, processes=None, verbose=True, executor=None):
+    """Evaluates the grid of shape with the independent subtrees of its Booleans evaluated in a process pool.
+
+    The Booleans of the tree are ordered so every node comes after its children. Their children that are not
+    Booleans, eg. the bodies of a bracket, are sent to the pool and evaluated straight into shared memory blocks.
+    The parent combines the blocks in place with each Boolean's compute_grid as soon as its children are done.
+    Shared children are evaluated once. The grids of the Booleans are kept, those of the subtrees are not, since
+    their blocks are freed once combined. executor is a concurrent.futures process pool to use instead of a new
+    one of processes (the number of cores if None) processes."""
+
+    if not is_combined(shape):
+        shape.evaluate_grid(verbose=verbose)
+
+        return shape.evaluated_grid
+
+    order = topological_order(shape)
+
+    combined = [node for node in order if is_combined(node)]
+    tasks = [node for node in order if not is_combined(node) and not node.up_to_date()]
+
+    # Booleans still to combine each child
+    consumers = {id(node): 0 for node in order}
+
+    for node in combined:
+        for child in node.children():
+            consumers[id(child)] += 1
+
+    processes = processes or os.cpu_count()
+
+    if verbose is True:
+        print(f'Evaluating {len(tasks)} subtrees of {shape.name} in {processes} processes...')
+
+    # The cores are shared between the processes rather than each using all of them
+    threads = max(compute_context.default_threads // processes, 1)
+
+    pool = executor or concurrent.futures.ProcessPoolExecutor(processes, initializer=initialise, initargs=(threads,))
+
+    blocks = {}
+    futures = {}
+
+    try:
+
+        while tasks or futures:
+
+            while tasks and len(futures) < TASKS_PER_PROCESS * processes:
+
+                node = tasks.pop(0)
+
+                size = node.x_grid.size * np.dtype(node.design_space.DATA_TYPE).itemsize
+
+                block = shared_memory.SharedMemory(create=True, size=size)
+                blocks[id(node)] = node, block
+
+                futures[pool.submit(evaluate_block, node, block.name)] = node
+
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+
+                node = futures.pop(future)
+                future.result()
+
+                # The block is the grid until every Boolean using it is combined
+                node.evaluated_grid = np.ndarray(node.x_grid.shape, node.design_space.DATA_TYPE,
+                                                 blocks[id(node)][1].buf)
+                node.dirty_region = None
+                node.sign_only = False
+
+            combined = combine_ready(combined, consumers, blocks, verbose)
+
+        combine_ready(combined, consumers, blocks, verbose)
+
+    finally:
+
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+        for node, block in blocks.values():
+            node.evaluated_grid = None
+
+            block.close()
+            block.unlink()
+
+    return shape.evaluated_grid
+
+
+def initialise(threads):
+
+    compute_context.set_threads(threads)
+
+
+def evaluate_block(node, name):
+    """Evaluates the grid of node into the shared memory block name. Runs in a pool process."""
+
+    block = shared_memory.SharedMemory(name=name)
+
+    try:
+        grid = np.ndarray(node.x_grid.shape, node.design_space.DATA_TYPE, block.buf)
+
+        # Straight into the block unless the node has its own, faster, way of evaluating a whole grid
+        if type(node).compute_grid is Geometry.compute_grid:
+            store(node.evaluate_point(node.x_grid, node.y_grid, node.z_grid, out=grid), grid)
+
+        else:
+            grid[...] = node.compute_grid(verbose=False)
+
+        del grid
+
+    finally:
+        block.close()
+
+
+def combine_ready(combined, consumers, blocks, verbose=True):
+    """Combines the Booleans whose children are all evaluated, in order, and frees the blocks no longer needed.
+    Returns the Booleans left."""
+
+    left = []
+
+    for node in combined:
+
+        if not all(child.up_to_date() for child in node.children()):
+            left.append(node)
+            continue
+
+        node.sign_only = False
+        node.evaluated_grid = node.compute_grid(verbose=verbose)
+        node.dirty_region = None
+
+        for child in node.children():
+
+            consumers[id(child)] -= 1
+
+            if consumers[id(child)] == 0 and id(child) in blocks:
+                child.evaluated_grid = None
+
+                _, block = blocks.pop(id(child))
+                block.close()
+                block.unlink()
+
+    return left
+
+
+def topological_order(shape):
+    """Nodes of the tree under shape, each once and after all of its children. Only Booleans are descended into."""
+
+    order = []
+    seen = set()
+
+    def visit(node):
+
+        if id(node) in seen:
+            return
+
+        seen.add(id(node))
+
+        if is_combined(node):
+            for child in node.children():
+                visit(child)
+
+        order.append(node)
+
+    visit(shape)
+
+    return order
+
+
+def is_combined(node):
+    """True for Booleans that still need evaluating, which are combined on the parent process."""
+
+    from MetaStruct.Objects.Booleans.Boolean import Boolean, BooleanN
+
+    return isinstance(node, (Boolean, BooleanN)) and not node.up_to_date()
@@ -0,0 +1,261 @@
+import importlib
+import json
+import os
+
+import numpy as np
+
+# Version of the document layout, checked when loading
+FORMAT_VERSION = 1
+
+# Arrays of at most this many elements are written inline in the JSON, larger ones to the .npz sidecar
+INLINE_SIZE = 16
+
+
+def save_model(shape, path):
+    """Saves the tree under shape, with its design space, point clouds and fields, as JSON at path. Arrays larger
+    than INLINE_SIZE elements, such as the lines of strut lattices, go to a sidecar .npz next to it.
+
+    Nodes are saved as their parameters (see Geometry.__getstate__), not their grids or meshes, and shared nodes
+    are saved once."""
+
+    encoder = Encoder()
+
+    document = {'format': 'MetaStruct', 'version': FORMAT_VERSION, 'root': encoder.encode(shape),
+                'objects': encoder.objects, 'sidecar': None}
+
+    if encoder.arrays:
+        np.savez(sidecar_path(path), **encoder.arrays)
+
+        document['sidecar'] = os.path.basename(sidecar_path(path))
+
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=1)
+
+
+def load_model(path):
+    """Loads a tree saved with save_model. Nodes are restored from their parameters without running their
+    constructors, so eg. the graphs of strut lattices are not built again."""
+
+    with open(path) as f:
+        document = json.load(f)
+
+    if document.get('format') != 'MetaStruct' or document.get('version') != FORMAT_VERSION:
+        raise ValueError(f'"{path}" is not a version {FORMAT_VERSION} MetaStruct model.')
+
+    arrays = None
+
+    if document['sidecar'] is not None:
+        arrays = np.load(os.path.join(os.path.dirname(path), document['sidecar']))
+
+    try:
+        return Decoder(document['objects'], arrays).decode(document['root'])
+
+    finally:
+        if arrays is not None:
+            arrays.close()
+
+
+def model_files(path):
+    """The files of a saved model, the JSON and its sidecar if it has one."""
+
+    with open(path) as f:
+        sidecar = json.load(f).get('sidecar')
+
+    return [path] + ([os.path.join(os.path.dirname(path), sidecar)] if sidecar else [])
+
+
+class Encoder:
+    """Encodes values as JSON. MetaStruct objects are encoded once each in objects, by reference, and large
+    arrays are collected in arrays for the sidecar."""
+
+    def __init__(self):
+
+        self.objects = {}
+        self.arrays = {}
+
+        # id -> key of the objects encoded so far, and the objects themselves so their ids stay unique
+        self.keys = {}
+        self.encoded = []
+
+    def encode(self, value):
+
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+
+        if isinstance(value, tuple):
+            return {'$tuple': [self.encode(item) for item in value]}
+
+        if isinstance(value, dict):
+
+            if all(isinstance(key, str) and not key.startswith('$') for key in value):
+                return {key: self.encode(item) for key, item in value.items()}
+
+            return {'$dict': [[self.encode(key), self.encode(item)] for key, item in value.items()]}
+
+        if isinstance(value, np.ndarray):
+            return self.encode_array(value)
+
+        if isinstance(value, np.generic):
+            return {'$scalar': value.item(), 'dtype': value.dtype.str}
+
+        if isinstance(value, np.dtype):
+            return {'$dtype': value.str}
+
+        if isinstance(value, np.random.Generator):
+            return {'$generator': self.encode(value.bit_generator.state)}
+
+        if type(value).__module__.startswith('MetaStruct.'):
+            return {'$ref': self.reference(value)}
+
+        raise ValueError(f'Cannot save {type(value).__name__} objects.')
+
+    def encode_array(self, array):
+
+        if array.dtype == object:
+            return {'$objects': [self.encode(item) for item in array.reshape(-1)], 'shape': list(array.shape)}
+
+        if array.size <= INLINE_SIZE:
+            return {'$array': array.tolist(), 'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+        key = f'a{len(self.arrays)}'
+        self.arrays[key] = array
+
+        return {'$sidecar': key}
+
+    def reference(self, value):
+
+        if id(value) not in self.keys:
+
+            key = str(len(self.keys))
+
+            self.keys[id(value)] = key
+            self.encoded.append(value)
+
+            self.objects[key] = {'type': f'{type(value).__module__}.{type(value).__qualname__}',
+                                 'state': self.encode(state(value))}
+
+        return self.keys[id(value)]
+
+
+class Decoder:
+
+    def __init__(self, objects, arrays=None):
+
+        self.objects = objects
+        self.arrays = arrays
+
+        self.decoded = {}
+
+    def decode(self, value):
+
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+
+        if not isinstance(value, dict):
+            return value
+
+        if '$ref' in value:
+            return self.reference(value['$ref'])
+
+        if '$tuple' in value:
+            return tuple(self.decode(item) for item in value['$tuple'])
+
+        if '$dict' in value:
+            return {self.decode(key): self.decode(item) for key, item in value['$dict']}
+
+        if '$array' in value:
+            return np.array(value['$array'], dtype=value['dtype']).reshape(value['shape'])
+
+        if '$sidecar' in value:
+
+            if self.arrays is None:
+                raise ValueError(f'Array {value["$sidecar"]} is missing, the model has no sidecar.')
+
+            return self.arrays[value['$sidecar']]
+
+        if '$objects' in value:
+            array = np.empty(len(value['$objects']), dtype=object)
+            array[:] = [self.decode(item) for item in value['$objects']]
+
+            return array.reshape(value['shape'])
+
+        if '$scalar' in value:
+            return np.dtype(value['dtype']).type(value['$scalar'])
+
+        if '$dtype' in value:
+            return np.dtype(value['$dtype'])
+
+        if '$generator' in value:
+            generator_state = self.decode(value['$generator'])
+
+            generator = np.random.Generator(getattr(np.random, generator_state['bit_generator'])())
+            generator.bit_generator.state = generator_state
+
+            return generator
+
+        return {key: self.decode(item) for key, item in value.items()}
+
+    def reference(self, key):
+
+        if key not in self.decoded:
+
+            entry = self.objects[key]
+
+            self.decoded[key] = restore(locate(entry['type']), self.decode(entry['state']))
+
+        return self.decoded[key]
+
+
+def state(value):
+    """The attributes an object is saved as."""
+
+    from MetaStruct.Objects.designspace import DesignSpace
+
+    if isinstance(value, DesignSpace):
+        return value.__reduce__()[1][1]
+
+    # object has a default __getstate__ from Python 3.11
+    getstate = getattr(type(value), '__getstate__', None)
+
+    if getstate is not None and getstate is not getattr(object, '__getstate__', None):
+        return value.__getstate__()
+
+    return dict(vars(value))
+
+
+def restore(cls, attributes):
+    """An instance of cls with the saved attributes, made without calling its constructor."""
+
+    from MetaStruct.Objects import designspace
+
+    if cls is designspace.DesignSpace:
+        return designspace.restore(attributes['token'], attributes)
+
+    value = cls.__new__(cls)
+
+    if hasattr(value, '__setstate__'):
+        value.__setstate__(attributes)
+
+    else:
+        value.__dict__.update(attributes)
+
+    return value
+
+
+def locate(name):
+    """The MetaStruct class of a qualified name. Nothing outside the package is imported."""
+
+    module_name, _, class_name = name.rpartition('.')
+
+    if not module_name.startswith('MetaStruct.'):
+        raise ValueError(f'"{name}" is not a MetaStruct class.')
+
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def sidecar_path(path):
+
+    return os.path.splitext(path)[0] + '.npz'
@@ -1,11 +1,30 @@
-import numexpr as ne
+import abc
+import copy
+import weakref
+
 import numpy as np
+from scipy import ndimage
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
+from MetaStruct.Objects.BufferArena import buffer_arena, output, store
 from MetaStruct.Objects.Geometry import Geometry
+from MetaStruct.Objects.SparseGrid import SparseGrid
+
+# Points of shape2 evaluated per call when it is only needed where shape1 is active
+ACTIVE_CHUNK = 2 ** 20
 
 
 class Boolean(Geometry):
 
+    # True where the result is positive wherever g1 > 0 (Intersection, Difference). For the root of a tree (see
+    # Geometry.is_root) shape2 is then only evaluated near where shape1 is active, and shape1 should be the
+    # cheaper of the two.
+    bounded_by_first = False
+
+    # Only Union, Intersection and Difference keep changes to a child inside the changed region
+    local = False
+
     def __init__(self, shape1, shape2):
 
         if shape1.design_space is not shape2.design_space:
@@ -24,6 +43,8 @@ class Boolean(Geometry):
         self.shape2 = shape2
         self.shapes = [shape1, shape2]
 
+        self.adopt(shape1, shape2)
+
         self.shapesXmins = []
         self.shapesXmaxs = []
         self.shapesYmins = []
@@ -100,50 +121,162 @@ class Boolean(Geometry):
 
         self.set_limits()
 
-    def evaluate_grid(self):
+    def compute_grid(self, verbose=True, tile_size=None):
+
+        if self.bounded_by_first and self.is_root() and not self.shape2.up_to_date() and \
+                not fully_evaluated(self.shape2):
+
+            if not self.shape1.up_to_date():
+                self.shape1.evaluate_grid(verbose=verbose, tile_size=tile_size)
+
+            g1 = self.shape1.evaluated_grid
+
+            # Dilated by a voxel so every grid edge or cell crossing the surface has exact values at both ends
+            active = np.flatnonzero(ndimage.binary_dilation(g1 <= 0, structure=np.ones((3, 3, 3), dtype=bool)))
+
+            if len(active) < g1.size / 2:
+
+                if verbose is True:
+                    print(f'Evaluating {self.shape2.name} at {len(active) / g1.size:.1%} of grid points...')
+
+                grid = np.array(g1, dtype=self.design_space.DATA_TYPE)
+
+                result = grid.reshape(-1)
+                x, y, z = self.x_grid.reshape(-1), self.y_grid.reshape(-1), self.z_grid.reshape(-1)
+
+                for start in range(0, len(active), ACTIVE_CHUNK):
+                    i = active[start:start + ACTIVE_CHUNK]
+                    result[i] = self.combine(g1.reshape(-1)[i], self.shape2.evaluate_point(x[i], y[i], z[i]))
+
+                # Elsewhere the grid holds g1, which is positive like the result but smaller
+                self.sign_only = True
+
+                return grid
+
+        for shape in self.shapes:
+
+            if not shape.up_to_date():
+                shape.evaluate_grid(verbose=verbose, tile_size=tile_size)
+
+        return self.combine(self.shape1.evaluated_grid, self.shape2.evaluated_grid)
+
+    def evaluate_region(self, region):
+        """Combines the children in region, re-evaluating the whole grids of changed children and reading
+        unchanged ones."""
+
+        values = []
+
+        for shape in self.shapes:
+
+            if isinstance(shape.evaluated_grid, np.ndarray):
+
+                if not shape.up_to_date():
+                    shape.evaluate_grid(verbose=False)
+
+                values.append(shape.evaluated_grid[region])
+
+            else:
+                values.append(shape.evaluate_region(region))
+
+        return self.combine(*values)
+
+    def evaluate_sparse(self, verbose=True):
+        """Combines the sparse grids of both shapes. Blocks that are a leaf in one grid and a tile in the other
+        are evaluated exactly in the other first, so the leaves of the result match a dense evaluation.
+
+        Tiles only hold a sign, which only decides the sign of local (min/max like) expressions, so other
+        Booleans are evaluated block by block as a whole instead (see SparseGrid.from_shape)."""
+
+        if not self.local:
+            return super().evaluate_sparse(verbose)
 
         for shape in self.shapes:
 
-            if shape.evaluated_grid is None:
-                shape.evaluate_grid()
+            if not isinstance(shape.evaluated_grid, SparseGrid) or shape.dirty_region is not None:
+                shape.evaluate_grid(verbose=verbose, sparse=True)
+
+        g1, g2 = self.shape1.evaluated_grid, self.shape2.evaluated_grid
+
+        g1.evaluate_blocks(self.shape1, g1.tiles_under(g2))
+        g2.evaluate_blocks(self.shape2, g2.tiles_under(g1))
+
+        return g1.combine(g2, self.expression, self.blend, self)
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        # shape1 is evaluated straight into the result and combined with shape2 in place
+        result = output(x, y, z, out)
+        g1 = self.shape1.evaluate_point(x, y, z, out=result)
+
+        with buffer_arena.borrow(result.shape) as (g2,):
+
+            return self.combine(g1, self.shape2.evaluate_point(x, y, z, out=g2), result)
+
+    def combine(self, g1, g2, out=None):
+
+        b = self.blend
 
-        g1 = self.shape1.evaluated_grid
-        g2 = self.shape2.evaluated_grid
+        return evaluate(self.expression, {'g1': g1, 'g2': g2, 'b': b}, out, self)
 
-        if self.blend is not None:
+    def evaluate_interval(self, x, y, z):
 
-            b = self.blend
+        bounds = self.combine_interval(self.shape1.evaluate_interval(x, y, z), self.shape2.evaluate_interval(x, y, z))
 
-        self.evaluated_grid = ne.evaluate(self.expression)
+        if bounds is None:
+            return Interval.unbounded(x)
 
-    def evaluate_point(self, x, y, z):
+        return bounds
 
-        g1 = self.shape1.evaluate_point(x, y, z)
-        g2 = self.shape2.evaluate_point(x, y, z)
+    def combine_interval(self, g1, g2):
+        """Bounds of the expression given the bounds of both children, None if unknown."""
 
-        return ne.evaluate(self.expression)
+        return None
 
 
 class Union(Boolean):
 
+    local = True
+
     def __init__(self, shape1, shape2):
         super().__init__(shape1, shape2)
         self.expression = 'where(g1<g2, g1, g2)'
 
+    def __add__(self, other):
+
+        return UnionN([self.shape1, self.shape2, other])
+
+    def combine_interval(self, g1, g2):
+
+        return Interval.minimum(g1, g2)
+
 
 class Difference(Boolean):
 
+    bounded_by_first = True
+    local = True
+
     def __init__(self, shape1, shape2):
         super().__init__(shape1, shape2)
         self.expression = 'where(g1>-g2, g1, -g2)'
 
+    def combine_interval(self, g1, g2):
+
+        return Interval.maximum(g1, Interval.neg(g2))
+
 
 class Intersection(Boolean):
 
+    bounded_by_first = True
+    local = True
+
     def __init__(self, shape1, shape2):
         super().__init__(shape1, shape2)
         self.expression = 'where(g1>g2, g1, g2)'
 
+    def combine_interval(self, g1, g2):
+
+        return Interval.maximum(g1, g2)
+
 
 class Add(Boolean):
 
@@ -151,6 +284,10 @@ class Add(Boolean):
         super().__init__(shape1, shape2)
         self.expression = 'g1 + g2'
 
+    def combine_interval(self, g1, g2):
+
+        return Interval.add(g1, g2)
+
 
 class Blend(Boolean):
 
@@ -159,6 +296,10 @@ class Blend(Boolean):
         self.blend = blend
         self.expression = 'b * g1 + (1 - b) * g2'
 
+    def combine_interval(self, g1, g2):
+
+        return Interval.add(Interval.scale(g1, self.blend), Interval.scale(g2, 1 - self.blend))
+
 
 class Divide(Boolean):
 
@@ -173,6 +314,10 @@ class Multiply(Boolean):
         super().__init__(shape1, shape2)
         self.expression = 'g1 * g2'
 
+    def combine_interval(self, g1, g2):
+
+        return Interval.mul(g1, g2)
+
 
 class SmoothUnion(Boolean):
 
@@ -181,9 +326,338 @@ class SmoothUnion(Boolean):
         self.blend = blend
         self.expression = '-log(where((exp(-b*g1) + exp(-b*g2))>0.000, exp(-b*g1) + exp(-b*g2), 0.000))/b'
 
+    def combine_interval(self, g1, g2):
+
+        b = self.blend
+
+        # Increasing in both g1 and g2, so the bounds come from the ends of the intervals
+        return -np.logaddexp(-b * g1[0], -b * g2[0]) / b, -np.logaddexp(-b * g1[1], -b * g2[1]) / b
+
 
 class Subtract(Boolean):
 
     def __init__(self, shape1, shape2):
         super().__init__(shape1, shape2)
         self.expression = 'g1 - g2'
+
+    def combine_interval(self, g1, g2):
+
+        return Interval.sub(g1, g2)
+
+
+class BooleanN(Geometry, metaclass=abc.ABCMeta):
+    """Boolean of any number of shapes, reduced into one output array in place rather than through a tree of
+    binary nodes with a temporary grid each. Subclasses define accumulate."""
+
+    # Margin in samples kept around each child's limits when culling, so values next to the surface are exact
+    CULL_MARGIN = 2
+
+    def __init__(self, shapes, blend=None):
+
+        shapes = list(shapes)
+
+        if len(shapes) < 2:
+            raise ValueError('At least two shapes are needed.')
+
+        if any(shape.design_space is not shapes[0].design_space for shape in shapes):
+            raise ValueError('Mismatching Design Spaces')
+
+        super().__init__(shapes[0].design_space)
+
+        self.morph = 'Shape'
+
+        self.shapes = shapes
+        self.blend = blend
+
+        self.adopt(*shapes)
+
+        self.x = sum(shape.x for shape in shapes) / len(shapes)
+        self.y = sum(shape.y for shape in shapes) / len(shapes)
+        self.z = sum(shape.z for shape in shapes) / len(shapes)
+
+        self.name = '_'.join(shape.name for shape in shapes)
+
+        # Stands in for the field where culled children leave it unevaluated, at least CULL_MARGIN samples from
+        # their limits. A lower bound of the distance there, so only its sign is right (see compute_grid).
+        ds = self.design_space
+        self.outside = self.CULL_MARGIN * float(min(np.diff(axis).min(initial=np.inf) for axis in (ds.X, ds.Y, ds.Z)))
+
+        self.set_limits()
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}([{", ".join(repr(shape) for shape in self.shapes)}])'
+
+    def __add__(self, other):
+
+        return Union(self, other)
+
+    def __sub__(self, other):
+
+        return Difference(self, other)
+
+    def __truediv__(self, other):
+
+        return Intersection(self, other)
+
+    def set_limits(self):
+
+        boxes = [shape.bounding_box() for shape in self.shapes]
+
+        lower, upper = self.reduce_boxes(boxes)
+
+        if not (np.isfinite(lower).all() and np.isfinite(upper).all()):
+            self.x_limits = self.y_limits = self.z_limits = None
+            return
+
+        self.x_limits, self.y_limits, self.z_limits = np.stack((lower, upper), axis=1)
+
+    def reduce_boxes(self, boxes):
+
+        return np.min([box[0] for box in boxes], axis=0), np.max([box[1] for box in boxes], axis=0)
+
+    def translate(self, x, y, z):
+
+        for shape in self.shapes:
+            shape.translate(x, y, z)
+
+        self.set_limits()
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        first = output(x, y, z, out)
+        result = self.accumulate(None, self.shapes[0].evaluate_point(x, y, z, out=first), first)
+
+        # One buffer holds each remaining child's values in turn
+        with buffer_arena.borrow(first.shape) as (values,):
+
+            for shape in self.shapes[1:]:
+                result = self.accumulate(result, shape.evaluate_point(x, y, z, out=values))
+
+        return self.finish(result)
+
+    @abc.abstractmethod
+    def accumulate(self, result, values, out=None):
+        """Adds values to the running result, in place where it is an array. The first values (result None) are
+        copied into out, or a new array if it is None."""
+
+    def finish(self, result):
+
+        return result
+
+    def child_values(self, shape, region):
+
+        if shape.up_to_date():
+            return shape.evaluated_grid[region]
+
+        return shape.evaluate_region(region)
+
+    def compute_grid(self, verbose=True, tile_size=None):
+
+        if verbose is True:
+            print(f'Evaluating grid points for {self.name}...')
+
+        return self.finish(self.reduce_region((slice(None),) * 3))
+
+    def reduce_region(self, region):
+
+        result = None
+
+        for child in self.shapes:
+            result = self.accumulate(result, self.child_values(child, region))
+
+        return np.asarray(result, dtype=self.design_space.DATA_TYPE)
+
+    def evaluate_interval(self, x, y, z):
+
+        bounds = None
+
+        for shape in self.shapes:
+            child = shape.evaluate_interval(x, y, z)
+            bounds = child if bounds is None else self.combine_interval(bounds, child)
+
+        return bounds
+
+    def combine_interval(self, g1, g2):
+
+        return None
+
+
+class UnionN(BooleanN):
+    """Union of any number of shapes. At the root of a tree (see is_root), each child is only evaluated within
+    its limits (plus a margin), elsewhere it cannot be the nearest surface, and the grid is sign_only."""
+
+    local = True
+
+    def __add__(self, other):
+
+        return UnionN([*self.shapes, other])
+
+    def accumulate(self, result, values, out=None):
+
+        if result is None:
+            return np.array(values, dtype=self.design_space.DATA_TYPE) if out is None else store(values, out)
+
+        return np.minimum(result, values, out=result)
+
+    def combine_interval(self, g1, g2):
+
+        return Interval.minimum(g1, g2)
+
+    def compute_grid(self, verbose=True, tile_size=None):
+
+        regions = [self.box_slices(shape.bounding_box(), self.CULL_MARGIN) or (slice(None),) * 3
+                   for shape in self.shapes]
+
+        if not self.is_root() or (slice(None),) * 3 in regions:
+            return super().compute_grid(verbose, tile_size)
+
+        if verbose is True:
+            print(f'Evaluating grid points for {self.name}...')
+
+        grid = np.full(self.x_grid.shape, self.outside, dtype=self.design_space.DATA_TYPE)
+
+        for shape, region in zip(self.shapes, regions):
+
+            # Slices are views, so the minimum is written straight into the grid
+            np.minimum(grid[region], self.child_values(shape, region), out=grid[region])
+
+        self.sign_only = True
+
+        return grid
+
+
+class IntersectionN(BooleanN):
+    """Intersection of any number of shapes. At the root of a tree (see is_root), only evaluated where the limits
+    of every child overlap, and the grid is sign_only."""
+
+    local = True
+
+    def __truediv__(self, other):
+
+        return IntersectionN([*self.shapes, other])
+
+    def reduce_boxes(self, boxes):
+
+        return np.max([box[0] for box in boxes], axis=0), np.min([box[1] for box in boxes], axis=0)
+
+    def accumulate(self, result, values, out=None):
+
+        if result is None:
+            return np.array(values, dtype=self.design_space.DATA_TYPE) if out is None else store(values, out)
+
+        return np.maximum(result, values, out=result)
+
+    def combine_interval(self, g1, g2):
+
+        return Interval.maximum(g1, g2)
+
+    def compute_grid(self, verbose=True, tile_size=None):
+
+        region = self.box_slices(self.bounding_box(), self.CULL_MARGIN)
+
+        if not self.is_root() or region is None:
+            return super().compute_grid(verbose, tile_size)
+
+        if verbose is True:
+            print(f'Evaluating grid points for {self.name}...')
+
+        grid = np.full(self.x_grid.shape, self.outside, dtype=self.design_space.DATA_TYPE)
+
+        if all(s.stop > s.start for s in region):
+            grid[region] = self.reduce_region(region)
+
+        self.sign_only = True
+
+        return grid
+
+
+class SmoothUnionN(BooleanN):
+    """Smooth union of any number of shapes, -log(sum(exp(-b*g)))/b, as a running log-sum-exp so it stays finite.
+    Not culled, since the blend reaches beyond each child's limits."""
+
+    def __init__(self, shapes, blend=4):
+        super().__init__(shapes, blend)
+
+    def accumulate(self, result, values, out=None):
+
+        if result is None:
+            return np.multiply(values, -self.blend, out=out, dtype=self.design_space.DATA_TYPE)
+
+        return np.logaddexp(result, np.multiply(values, -self.blend, dtype=result.dtype), out=result)
+
+    def finish(self, result):
+
+        return np.divide(result, -self.blend, out=result)
+
+    def combine_interval(self, g1, g2):
+
+        b = self.blend
+
+        return -np.logaddexp(-b * g1[0], -b * g2[0]) / b, -np.logaddexp(-b * g1[1], -b * g2[1]) / b
+
+
+# Binary Boolean classes and the N-ary class their chains flatten into
+N_ARY = {Union: UnionN, Intersection: IntersectionN, SmoothUnion: SmoothUnionN}
+
+
+def flatten(shape):
+    """Returns the tree with chains of Union, Intersection or SmoothUnion (of the same blend) replaced by one
+    UnionN, IntersectionN or SmoothUnionN of all their operands. Other Booleans are copied with flattened
+    children. The shapes themselves are shared, not copied."""
+
+    n_ary = N_ARY.get(type(shape)) or (type(shape) if isinstance(shape, BooleanN) else None)
+
+    if n_ary is not None:
+
+        operands = []
+        collect(shape, n_ary, shape.blend, operands)
+
+        if n_ary is SmoothUnionN:
+            return SmoothUnionN(operands, shape.blend)
+
+        return n_ary(operands)
+
+    if isinstance(shape, Boolean):
+
+        shape1, shape2 = flatten(shape.shape1), flatten(shape.shape2)
+
+        if shape1 is shape.shape1 and shape2 is shape.shape2:
+            return shape
+
+        flat = copy.copy(shape)
+        flat.shape1, flat.shape2 = shape1, shape2
+        flat.shapes = [shape1, shape2]
+        flat.evaluated_grid = None
+        flat.parents = weakref.WeakSet()
+        flat.adopt(shape1, shape2)
+
+        return flat
+
+    return shape
+
+
+def collect(shape, n_ary, blend, operands):
+
+    same = (N_ARY.get(type(shape)) is n_ary or type(shape) is n_ary) and shape.blend == blend
+
+    if not same:
+        operands.append(flatten(shape))
+
+    elif isinstance(shape, BooleanN):
+
+        for child in shape.shapes:
+            collect(child, n_ary, blend, operands)
+
+    else:
+        collect(shape.shape1, n_ary, blend, operands)
+        collect(shape.shape2, n_ary, blend, operands)
+
+
+def fully_evaluated(shape):
+    """True if evaluating the whole grid of shape costs about as much as a fraction of it, eg. for lattices that
+    are evaluated on one unit cell and tiled."""
+
+    periods = getattr(shape, 'periods', None)
+
+    return periods is not None and periods() is not None
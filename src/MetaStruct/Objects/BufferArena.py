@@ -0,0 +1,134 @@
+import collections
+import contextlib
+import threading
+
+import numpy as np
+
+
+class BufferArena:
+    """Pool of reusable scratch arrays for the temporaries of evaluate_point.
+
+    Composite nodes (Booleans, transforms, noise) borrow buffers for their children's values and hand them back
+    when done, so evaluating the same tree again allocates nothing. Buffers are pooled by shape and dtype and
+    are only valid while borrowed. At most budget bytes are kept in the pool. An arena is not thread safe; the
+    shared buffer_arena keeps one per thread (see ThreadArenas)."""
+
+    def __init__(self, dtype=np.float32, budget=256 * 2 ** 20):
+
+        self.dtype = np.dtype(dtype)
+        self.budget = budget
+
+        self.free = collections.defaultdict(list)
+        self.in_use = 0
+        self.nbytes = 0
+        self.peak = 0
+
+        self.allocations = self.reuses = 0
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({self.nbytes / 2 ** 20:.1f} MiB, peak {self.peak / 2 ** 20:.1f} MiB)'
+
+    def acquire(self, shape, dtype=None):
+
+        key = (tuple(shape), np.dtype(dtype or self.dtype))
+
+        if self.free[key]:
+            self.reuses += 1
+            buffer = self.free[key].pop()
+
+        else:
+            self.allocations += 1
+            buffer = np.empty(*key)
+            self.nbytes += buffer.nbytes
+
+        self.in_use += buffer.nbytes
+        self.peak = max(self.peak, self.in_use)
+
+        return buffer
+
+    def release(self, *buffers):
+
+        for buffer in buffers:
+            self.in_use -= buffer.nbytes
+
+            if self.nbytes > self.budget:
+                self.nbytes -= buffer.nbytes
+
+            else:
+                self.free[(buffer.shape, buffer.dtype)].append(buffer)
+
+    @contextlib.contextmanager
+    def borrow(self, shape, count=1, dtype=None):
+        """Yields count buffers of shape, returned to the pool on exit."""
+
+        buffers = [self.acquire(shape, dtype) for _ in range(count)]
+
+        try:
+            yield buffers
+
+        finally:
+            self.release(*buffers)
+
+    def clear(self):
+        """Drops the pooled buffers. Borrowed buffers are still returned to the pool when released."""
+
+        self.free.clear()
+        self.nbytes = self.in_use
+
+    def reset_peak(self):
+
+        self.peak = self.in_use
+
+    def stats(self):
+
+        return {'allocations': self.allocations, 'reuses': self.reuses, 'nbytes': self.nbytes,
+                'in_use': self.in_use, 'peak': self.peak}
+
+
+def point_shape(x, y, z):
+    """Shape of the values at points (x, y, z), which may broadcast against each other."""
+
+    return np.broadcast_shapes(np.shape(x), np.shape(y), np.shape(z))
+
+
+def output(x, y, z, out=None, dtype=np.float32):
+    """out, or a new array for the values at points (x, y, z) if it is None."""
+
+    if out is None:
+        return np.empty(point_shape(x, y, z), dtype=dtype)
+
+    return out
+
+
+def store(values, out=None):
+    """values, written into out if it is given."""
+
+    if out is None or values is out:
+        return values
+
+    out[...] = values
+
+    return out
+
+
+class ThreadArenas(threading.local):
+    """Stands in for a BufferArena, forwarding to the calling thread's own arena, created with the same
+    arguments on first use in each thread. Nodes evaluated in parallel threads (eg. by parallel_evaluate) never
+    share buffers, and the pool and statistics read are those of the current thread."""
+
+    def __init__(self, *args, **kwargs):
+
+        self.arena = BufferArena(*args, **kwargs)
+
+    def __repr__(self):
+
+        return repr(self.arena)
+
+    def __getattr__(self, name):
+
+        return getattr(self.arena, name)
+
+
+# Shared by every node, one arena per thread
+buffer_arena = ThreadArenas()
@@ -0,0 +1,186 @@
+import collections
+import hashlib
+import os
+
+import numpy as np
+
+# Attributes that are results or views of the design space rather than parameters of a node
+DERIVED_ATTRIBUTES = {'design_space', 'designSpace', 'name', 'filename', 'vertices', 'faces', 'normals', 'values',
+                      'evaluated_grid', 'evaluated_distance', 'gradient_grid', 'x_grid', 'y_grid', 'z_grid',
+                      'XX', 'YY', 'ZZ', 'shell_shape', 'shell_parameters', 'version', 'dirty_region', 'parents',
+                      '_finalizer', 'sign_only', 'exact'}
+
+
+class EvaluationCache:
+    """Evaluated grids shared between nodes with the same parameters, on design spaces with the same axes.
+
+    Entries are keyed by (node_key(node), tile) and held in memory up to budget bytes, least recently used first
+    out. Evicted entries are written to spill_directory if one is set, and read back on a later hit. Grids are
+    not copied: they are made read-only and the same array is handed to every node using it, so caching adds no
+    memory of its own. Nodes copy a cached grid before changing it in place."""
+
+    def __init__(self, budget=512 * 2 ** 20, spill_directory=None):
+
+        self.budget = budget
+        self.spill_directory = spill_directory
+
+        self.entries = collections.OrderedDict()
+        self.spilled = {}
+        self.nbytes = 0
+
+        self.hits = self.misses = self.evictions = self.disk_hits = 0
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({len(self.entries)} entries, {self.nbytes / 2 ** 20:.1f} MiB)'
+
+    @property
+    def enabled(self):
+
+        return self.budget > 0
+
+    def get(self, node, compute, tile=None):
+        """Cached grid of node (or of one tile of its grid), computed with compute() and stored on a miss."""
+
+        if not self.enabled:
+            return compute()
+
+        key = (node_key(node), tile)
+
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+            return self.entries[key]
+
+        if key in self.spilled:
+            self.hits += 1
+            self.disk_hits += 1
+
+            grid = np.load(self.spilled.pop(key))
+            self.put(key, grid)
+
+            return grid
+
+        self.misses += 1
+
+        grid = np.asarray(compute())
+
+        # Grids only right near the surface of a root node are not shared with nodes that may need exact values
+        if not getattr(node, 'sign_only', False):
+            self.put(key, grid)
+
+        return grid
+
+    def put(self, key, grid):
+
+        if grid.nbytes > self.budget:
+            return
+
+        grid.flags.writeable = False
+
+        self.entries[key] = grid
+        self.nbytes += grid.nbytes
+
+        while self.nbytes > self.budget:
+            self.evict()
+
+    def evict(self):
+
+        key, grid = self.entries.popitem(last=False)
+
+        self.nbytes -= grid.nbytes
+        self.evictions += 1
+
+        if self.spill_directory is not None:
+            os.makedirs(self.spill_directory, exist_ok=True)
+
+            path = os.path.join(self.spill_directory, f'{key[0]}_{abs(hash(key[1])):x}.npy')
+            np.save(path, grid)
+
+            self.spilled[key] = path
+
+    def clear(self):
+
+        for path in self.spilled.values():
+
+            try:
+                os.remove(path)
+
+            except OSError:
+                pass
+
+        self.entries.clear()
+        self.spilled.clear()
+        self.nbytes = 0
+
+    def stats(self):
+
+        lookups = self.hits + self.misses
+
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.,
+                'evictions': self.evictions, 'disk_hits': self.disk_hits, 'entries': len(self.entries),
+                'spilled': len(self.spilled), 'nbytes': self.nbytes}
+
+
+def node_key(node):
+    """Digest of a node's class, its parameters and those of its children, and its design space axes."""
+
+    digest = hashlib.sha1()
+
+    ds = getattr(node, 'design_space', None)
+
+    if ds is not None:
+
+        for axis in (ds.X, ds.Y, ds.Z):
+            digest.update(np.ascontiguousarray(axis).tobytes())
+
+    update(digest, node, ds, {})
+
+    return digest.hexdigest()
+
+
+def update(digest, value, ds, seen):
+
+    if id(value) in seen:
+        digest.update(f'<{seen[id(value)]}>'.encode())
+        return
+
+    if isinstance(value, np.ndarray):
+
+        # Views of the design space grids are covered by its axes
+        if ds is not None and any(np.may_share_memory(value, grid) for grid in (ds.x_grid, ds.y_grid, ds.z_grid)):
+            digest.update(b'<grid>')
+
+        else:
+            digest.update(f'{value.dtype}{value.shape}'.encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+
+        for item in value:
+            update(digest, item, ds, seen)
+
+    elif isinstance(value, dict):
+
+        for name in sorted(value, key=str):
+            digest.update(str(name).encode())
+            update(digest, value[name], ds, seen)
+
+    elif isinstance(value, np.generic):
+        digest.update(repr(value.item()).encode())
+
+    elif hasattr(value, '__dict__') and not callable(value):
+        seen[id(value)] = len(seen)
+
+        digest.update(f'{type(value).__module__}.{type(value).__qualname__}'.encode())
+
+        update(digest, {name: item for name, item in vars(value).items() if name not in DERIVED_ATTRIBUTES}, ds, seen)
+
+    else:
+        digest.update(repr(value).encode())
+
+
+# Shared by every node. Off unless a budget is set, with METASTRUCT_CACHE_BYTES or evaluation_cache.budget.
+evaluation_cache = EvaluationCache(int(os.environ.get('METASTRUCT_CACHE_BYTES', 0)))
@@ -1,14 +1,35 @@
+import weakref
+
 import igl
-import numexpr as ne
 import numpy as np
-from scipy.spatial.transform import Rotation as R
 from skimage import measure
 
-from MetaStruct.Functions.Remap import remap
+from MetaStruct.Functions import Interval
+from MetaStruct.Objects.EvaluationCache import DERIVED_ATTRIBUTES, evaluation_cache
+from MetaStruct.Objects.SparseGrid import SparseGrid
+from MetaStruct.Objects.designspace import is_uniform, map_to_axes
+
+# Views of the design space sample grids held by nodes, and the grid each views. Not pickled, but looked up again
+# when first used (see __getattr__), so unpickled nodes do not build the grids unless they read them.
+GRID_VIEWS = {'x_grid': 'x_grid', 'y_grid': 'y_grid', 'z_grid': 'z_grid',
+              'XX': 'x_grid', 'YY': 'y_grid', 'ZZ': 'z_grid'}
+
+# Results of a node, not pickled
+RESULTS = ('vertices', 'faces', 'normals', 'values', 'evaluated_grid', 'evaluated_distance', 'gradient_grid')
 
 
 class Geometry:
 
+    # True if a change to a child only changes this node's field inside the changed region
+    local = True
+
+    # True if the evaluated grid only has exact values near the surface and the right sign elsewhere, as left by
+    # the shortcuts Booleans take for the root of a tree (see is_root)
+    sign_only = False
+
+    # Set while exact values are asked for, so the node takes no shortcuts even as the root
+    exact = False
+
     def __init__(self, design_space):
 
         self.design_space = design_space
@@ -36,6 +57,56 @@ class Geometry:
         self.evaluated_grid = self.evaluated_distance = None
         self.filename = None
 
+        # Bumped on every change. dirty_region is the box, (lower, upper), changed since the grid was evaluated.
+        self.version = 0
+        self.dirty_region = None
+        self.parents = weakref.WeakSet()
+
+    def __getstate__(self):
+        """Pickles the parameters and children only, so nodes are cheap to send to other processes."""
+
+        state = {name: value for name, value in vars(self).items()
+                 if name not in ('parents', '_finalizer', *GRID_VIEWS)}
+
+        for name in RESULTS:
+            if name in state:
+                state[name] = None
+
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update({name: value for name, value in state.items() if name not in GRID_VIEWS})
+
+        self.parents = weakref.WeakSet()
+        self.adopt(*self.children())
+
+    def __getattr__(self, name):
+
+        # Only called for missing attributes, the grid views of an unpickled node
+        if name in GRID_VIEWS and 'design_space' in vars(self):
+            return getattr(self.design_space, GRID_VIEWS[name])
+
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __add__(self, other):
+
+        from MetaStruct.Objects.Booleans.Boolean import Union
+
+        return Union(self, other)
+
+    def __sub__(self, other):
+
+        from MetaStruct.Objects.Booleans.Boolean import Difference
+
+        return Difference(self, other)
+
+    def __truediv__(self, other):
+
+        from MetaStruct.Objects.Booleans.Boolean import Intersection
+
+        return Intersection(self, other)
+
     def compare_limits(self):
 
         if min(self.x_limits) < self.design_space.x_lower or max(self.x_limits) > self.design_space.x_upper:
@@ -66,41 +137,261 @@ class Geometry:
 
         pass
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
+        """Field values at points (x, y, z), written into out (a float32 array of their shape) if given."""
 
         pass
 
+    def evaluate_interval(self, x, y, z):
+        """Bounds (lo, hi) on the field over axis-aligned boxes, given as intervals x = (x_lo, x_hi) etc. of
+        numbers or arrays with one box per element. Unbounded unless the subclass implements it."""
+
+        return Interval.unbounded(x)
+
     def translate(self, x, y, z):
 
+        before = self.bounding_box()
+
         self.x += x
         self.y += y
         self.z += z
         self.set_limits()
 
-    def evaluate_grid(self, verbose=True, gradients=False):
-        if verbose is True:
-            print(f'Evaluating grid points for {self.name}...')
+        self.changed(union_box(before, self.bounding_box()))
+
+    def update(self, **parameters):
+        """Sets parameters (eg. r=0.5) and marks the region covered by the old and new limits as changed."""
+
+        before = self.bounding_box()
+
+        for name, value in parameters.items():
+            setattr(self, name, value)
+
+        self.set_limits()
+
+        self.changed(union_box(before, self.bounding_box()))
+
+    def adopt(self, *children):
+        """Registers self as a parent of children, so their changes propagate to it."""
+
+        for child in children:
+            child.parents.add(self)
+
+    def children(self):
+        """Nodes this node is built from."""
+
+        children = []
+
+        for name, value in vars(self).items():
+
+            if name in DERIVED_ATTRIBUTES:
+                continue
+
+            for child in (value if isinstance(value, (list, tuple)) else [value]):
+                if isinstance(child, Geometry) and not any(child is c for c in children):
+                    children.append(child)
+
+        return children
+
+    def is_root(self):
+        """True if only the surface of this node's grid is used: no node is built from it and exact values were
+        not asked for. Booleans then skip work away from the surface, leaving a sign_only grid whose values are
+        exact near the surface and only of the right sign elsewhere, which is enough to mesh it at levels up to
+        0. Nodes with parents always have exact grids, since their parents read the values."""
+
+        return not self.parents and not self.exact
+
+    def bounding_box(self):
+        """(lower, upper) corners of the limits, unbounded if any are unknown."""
+
+        limits = (self.x_limits, self.y_limits, self.z_limits)
+
+        if any(limit is None for limit in limits):
+            return np.full(3, -np.inf), np.full(3, np.inf)
+
+        return np.array([min(limit) for limit in limits], dtype=float), \
+            np.array([max(limit) for limit in limits], dtype=float)
+
+    def changed(self, region=None):
+        """Marks region (everything if None) as changed here and in every parent."""
+
+        if region is None:
+            region = np.full(3, -np.inf), np.full(3, np.inf)
+
+        self.version += 1
+        self.dirty_region = union_box(self.dirty_region, region)
+
+        for parent in list(self.parents):
+            parent.child_changed(self, region)
+
+    def child_changed(self, child, region):
+
+        self.changed(region if self.local else None)
+
+    def dirty_slices(self, margin=2):
+        """Slices of the grid covering the dirty region plus margin samples, None if it is unbounded."""
+
+        return self.box_slices(self.dirty_region, margin)
+
+    def box_slices(self, box, margin=2):
+        """Slices of the grid covering the box (lower, upper) plus margin samples, None if it is unbounded."""
+
+        lower, upper = box
+
+        if not (np.isfinite(lower).all() and np.isfinite(upper).all()):
+            return None
+
+        slices = []
+
+        for axis, lo, hi in zip((self.design_space.X, self.design_space.Y, self.design_space.Z), lower, upper):
+            start = max(np.searchsorted(axis, lo) - margin, 0)
+            stop = min(np.searchsorted(axis, hi, side='right') + margin, len(axis))
+
+            slices.append(slice(start, max(stop, start)))
+
+        return tuple(slices)
+
+    def evaluate_grid(self, verbose=True, gradients=False, tile_size=None, sparse=False, exact=False):
+        """Evaluates the grid (a SparseGrid if sparse is True). Dense grids of nodes with the same parameters are
+        shared through the evaluation cache, by whole grid or by tile if tile_size is given.
+
+        The grid of a root node may be sign_only (see is_root) unless exact or gradients is True."""
+
+        if (exact or gradients) and not self.exact:
+
+            self.exact = True
+
+            try:
+                return self.evaluate_grid(verbose, gradients, tile_size, sparse)
+
+            finally:
+                del self.exact
+
+        self.sign_only = False
+
+        if sparse is True:
+            self.evaluated_grid = self.evaluate_sparse(verbose)
+
+            self.dirty_region = None
+
+            if gradients is True:
+                self.gradient_grid = np.gradient(
+                    self.evaluated_grid.to_dense(), self.design_space.X, self.design_space.Y, self.design_space.Z)
+
+            return
+
+        if tile_size is None:
+
+            if not self.update_grid(verbose):
+                self.evaluated_grid = evaluation_cache.get(self, lambda: self.compute_grid(verbose))
+
+        else:
+            self.evaluated_grid = self.compute_grid(verbose, tile_size)
+
+        self.dirty_region = None
 
-        self.evaluated_grid = np.array(
-            self.evaluate_point(self.x_grid, self.y_grid, self.z_grid))
         if gradients is True:
             self.gradient_grid = np.gradient(
-                self.evaluated_grid, self.design_space.resolution)
+                self.evaluated_grid, self.design_space.X, self.design_space.Y, self.design_space.Z)
+
+    def update_grid(self, verbose=True):
+        """Re-evaluates only the dirty region of the dense grid of a root node (see is_root). Outside the region,
+        which covers the old and new limits of what changed, the previous values have the same sign as the new
+        ones but not the same values, so the grid becomes sign_only. Returns False if a full evaluation is needed
+        instead, which is always the case for nodes with parents, since a change to a distance field changes it
+        everywhere and parents read its values."""
+
+        if not self.is_root() or not isinstance(self.evaluated_grid, np.ndarray) or self.dirty_region is None:
+            return False
+
+        region = self.dirty_slices()
+
+        if region is None or np.prod([s.stop - s.start for s in region]) > self.evaluated_grid.size / 2:
+            return False
+
+        if verbose is True:
+            print(f'Updating grid points for {self.name} in the changed region...')
+
+        # Shared with the evaluation cache
+        if not self.evaluated_grid.flags.writeable:
+            self.evaluated_grid = self.evaluated_grid.copy()
+
+        self.evaluated_grid[region] = self.evaluate_region(region)
+        self.sign_only = True
+
+        return True
+
+    def evaluate_region(self, region):
+
+        return self.evaluate_point(self.x_grid[region], self.y_grid[region], self.z_grid[region])
+
+    def up_to_date(self):
+        """True if the node has a dense grid of exact values with no changes since it was evaluated."""
+
+        return isinstance(self.evaluated_grid, np.ndarray) and self.dirty_region is None and not self.sign_only
+
+    def compute_grid(self, verbose=True, tile_size=None):
+
+        if verbose is True:
+            print(f'Evaluating grid points for {self.name}...')
+
+        if tile_size is None:
+            grid = np.empty(self.x_grid.shape, dtype=self.design_space.DATA_TYPE)
+
+            return np.asarray(self.evaluate_point(self.x_grid, self.y_grid, self.z_grid, out=grid))
+
+        # Only one tile's worth of temporaries is alive at a time
+        grid = np.empty(self.x_grid.shape, dtype=self.design_space.DATA_TYPE)
+
+        for tile in self.design_space.tiles(tile_size):
+            grid[tile] = evaluation_cache.get(
+                self, lambda: self.evaluate_point(self.x_grid[tile], self.y_grid[tile], self.z_grid[tile]),
+                tuple((t.start, t.stop) for t in tile))
+
+        return grid
+
+    def evaluate_sparse(self, verbose=True):
+
+        return SparseGrid.from_shape(self, verbose=verbose)
 
     def find_surface(self, level=0):
 
         print(f'Extracting Isosurface (level = {level})...')
 
-        if self.evaluated_grid is None:
-            self.evaluate_grid()
+        # Away from the surface, sign_only grids are only right about the sign
+        if self.evaluated_grid is None or (self.sign_only and level > 0):
+            self.evaluate_grid(exact=self.sign_only)
 
         try:
 
-            self.vertices, self.faces, self.normals, self.values = measure.marching_cubes(self.evaluated_grid, level=level,
-                                                                                          spacing=(
-                                                                                           self.x_step, self.y_step,
-                                                                                           self.z_step),
-                                                                                          allow_degenerate=False)
+            grid = self.evaluated_grid
+
+            # Tiles only hold the side of the level the grid was built for
+            if isinstance(grid, SparseGrid) and level != grid.level:
+                self.evaluate_grid(verbose=False)
+                grid = self.evaluated_grid
+
+            ds = self.design_space
+            axes = grid.axes if isinstance(grid, SparseGrid) and grid.axes is not None else (ds.X, ds.Y, ds.Z)
+            uniform = all(is_uniform(axis) for axis in axes)
+
+            # Non-uniform grids are meshed in sample index space and mapped onto the axes
+            spacing = tuple(float(axis[-1] - axis[0]) / (len(axis) - 1) for axis in axes) if uniform else (1., 1., 1.)
+
+            if isinstance(grid, SparseGrid):
+                self.vertices, self.faces, self.normals, self.values = grid.marching_cubes(level, spacing)
+
+            else:
+                # Cached grids are read-only, which marching_cubes does not accept
+                if not grid.flags.writeable:
+                    grid = grid.copy()
+
+                self.vertices, self.faces, self.normals, self.values = measure.marching_cubes(grid, level=level,
+                                                                                              spacing=spacing,
+                                                                                              allow_degenerate=False)
+
+            if not uniform:
+                self.vertices, self.normals = map_to_axes(self.vertices, self.normals, axes)
 
         except ValueError:
             print(f'No isosurface found at specified level ({level})')
@@ -118,6 +409,9 @@ class Geometry:
         if self.evaluated_grid is None:
             self.evaluate_grid()
 
+        if isinstance(self.evaluated_grid, SparseGrid):
+            self.evaluated_grid = self.evaluated_grid.to_dense()
+
         if clip is not None:
 
             if clip == 'x':
@@ -250,58 +544,40 @@ class Geometry:
         print(f'"{self.filename}" successfully exported.')
 
     def convert_to_cylindrical(self):
+        """Evaluates the object in cylindrical coordinates. Wrapping it in a CylindricalWarp instead shares
+        the warped coordinates with every other warped object."""
 
-        x_grid = self.x_grid
-        y_grid = self.y_grid
-        z_grid = self.z_grid
-
-        r = ne.evaluate('sqrt(x_grid**2 + y_grid**2)')
-        az = ne.evaluate('arctan2(y_grid, x_grid)')
-
-        self.x_grid = r
-        self.y_grid = az
+        from MetaStruct.Objects.Transforms.Warp import CylindricalWarp
 
-        self.evaluated_grid = self.evaluate_point(
+        self.evaluated_grid = CylindricalWarp(self).evaluate_point(
             self.x_grid, self.y_grid, self.z_grid)
 
     def convert_to_spherical(self):
+        """Evaluates the object in spherical coordinates. Wrapping it in a SphericalWarp instead shares the
+        warped coordinates with every other warped object."""
 
-        x_grid = self.x_grid
-        y_grid = self.y_grid
-        z_grid = self.z_grid
+        from MetaStruct.Objects.Transforms.Warp import SphericalWarp
 
-        self.x_grid = ne.evaluate('sqrt(x_grid**2 + y_grid**2 + z_grid**2)')
-        self.y_grid = ne.evaluate(
-            'arctan2(sqrt(x_grid**2 + y_grid**2),z_grid)')
-        self.z_grid = ne.evaluate('arctan2(y_grid,x_grid)')
-
-        self.evaluated_grid = self.evaluate_point(
+        self.evaluated_grid = SphericalWarp(self).evaluate_point(
             self.x_grid, self.y_grid, self.z_grid)
 
-    def transform_test(self, fac=10):
-
-        pi = np.pi
-        x = remap(self.x_grid)
-        y = remap(self.y_grid)
-        z = remap(self.z_grid)
-        k = fac
-
-        r = R.from_quat([1, -1, 1, 1])
+    def pringle(self, pringle_factor=0.1):
+        """Evaluates the object bent into a saddle. Wrapping it in a PringleWarp instead shares the warped
+        coordinates with every other warped object."""
 
-        self.x_grid = r.apply(x)
+        from MetaStruct.Objects.Transforms.Warp import PringleWarp
 
-        self.evaluated_grid = self.evaluate_point(
+        self.evaluated_grid = PringleWarp(self, pringle_factor).evaluate_point(
             self.x_grid, self.y_grid, self.z_grid)
 
-    def pringle(self, pringle_factor=0.1):
 
-        x = self.x_grid
-        y = self.y_grid
-        z = self.z_grid
-        pi = np.pi
-        fac = pringle_factor
+def union_box(a, b):
+    """Smallest box containing boxes a and b, either of which may be None."""
 
-        self.z_grid = ne.evaluate('z + 0.1*(x**2 - y**2)')
+    if a is None:
+        return b
 
-        self.evaluated_grid = self.evaluate_point(
-            self.x_grid, self.y_grid, self.z_grid)
+    if b is None:
+        return a
+
+    return np.minimum(a[0], b[0]), np.maximum(a[1], b[1])
@@ -1,5 +1,5 @@
-import numexpr as ne
-
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
 
@@ -11,28 +11,34 @@ class BCC(Lattice):
 
     # https://www.ncbi.nlm.nih.gov/pmc/articles/PMC6317040/pdf/materials-11-02411.pdf
 
+    surface = 'cos(2*kx*(x-x0)) + cos(2*ky*(y-y0)) + cos(2*kz*(z-z0)) - ' \
+              '2*(cos(kx*(x-x0))*cos(ky*(y-y0)) + cos(ky*(y-y0))*cos(kz*(z-z0)) + cos(kz*(z-z0))*cos(kx*(x-x0)))'
+
     def __init__(self, design_space, x=0, y=0, z=0, nx=1, ny=1, nz=1, lx=1, ly=1, lz=1, vf=0.2):
 
         self.vf = vf
 
         super().__init__(design_space, x, y, z, nx, ny, nz, lx, ly, lz, vf)
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
-        x0 = self.x
-        y0 = self.y
-        z0 = self.z
-        kx = self.kx
-        ky = self.ky
-        kz = self.kz
-        vf = self.vf
-        vf = ne.evaluate('vf*100')
+        parameters = self.parameters(x, y, z)
+        parameters['t'] = self.threshold(parameters['vf'])
+
+        return evaluate(self.surface + ' - t', parameters, out, self)
+
+    @staticmethod
+    def surface_bounds(a, b, c):
+
+        ca, cb, cc = Interval.cos(a), Interval.cos(b), Interval.cos(c)
+
+        doubles = Interval.add(Interval.add(Interval.cos(Interval.scale(a, 2)), Interval.cos(Interval.scale(b, 2))),
+                               Interval.cos(Interval.scale(c, 2)))
+        pairs = Interval.add(Interval.add(Interval.mul(ca, cb), Interval.mul(cb, cc)), Interval.mul(cc, ca))
 
-        t = ne.evaluate('-8.04119e-8*vf**4 + 1.71079e-5*vf**3 - \
-            0.0014808*vf**2 - 0.0136365*vf + 2.96255414')
+        return Interval.sub(doubles, Interval.scale(pairs, 2))
 
-        expr = 'cos(2*kx*(x-x0)) + cos(2*ky*(y-y0)) + cos(2*kz*(z-z0)) - \
-            2*(cos(kx*(x-x0))*cos(ky*(y-y0)) + cos(ky*(y-y0))*cos(kz*(z-z0)) + cos(kz*(z-z0))*cos(kx*(x-x0))) + t'
+    def bounds(self, a, b, c):
 
-        return ne.evaluate(expr)
+        return Interval.offset(self.surface_bounds(a, b, c), -self.threshold(self.vf))
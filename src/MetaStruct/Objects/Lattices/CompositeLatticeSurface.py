@@ -24,7 +24,7 @@ class CompositeLatticeSurface(Geometry):
 
         self.blendMatrix = blendMatrix
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
 
         for lat in self.lattices:
 
@@ -36,4 +36,4 @@ class CompositeLatticeSurface(Geometry):
         l1 = self.lat1.evaluated_grid
         l2 = self.lat2.evaluated_grid
 
-        return ne.evaluate('blend * l1 + (1- blend) * l2')
+        return ne.evaluate('blend * l1 + (1- blend) * l2', out=out, casting='same_kind')
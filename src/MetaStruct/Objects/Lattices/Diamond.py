@@ -1,5 +1,3 @@
-import numexpr as ne
-
 from MetaStruct.Objects.Lattices.DiamondSurface import DiamondSurface
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
@@ -10,24 +8,13 @@ class Diamond(Lattice):
     (nx, ny, nz)\t: Number of unit cells per length.\n\n\
     (lx, ly, lz)\t: Length of unit cell in each direction."""
 
-
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
-        vf = self.vf
-
-        vfHigh = ne.evaluate('0.5 + vf/2')
-        vfLow = ne.evaluate('0.5 - vf/2')
-
-        lattice = DiamondSurface(self.design_space, self.x, self.y, self.z, self.nx,
-                                 self.ny, self.nz, self.lx, self.ly, self.lz, vfHigh) - \
-            DiamondSurface(self.design_space, self.x, self.y, self.z, self.nx, self.ny,
-                           self.nz, self.lx, self.ly, self.lz, vfLow)
+        parameters = self.parameters(x, y, z)
 
-        for shape in lattice.shapes:
+        return self.sheet(DiamondSurface.surface, DiamondSurface.threshold, parameters, parameters['vf'], out)
 
-            shape.x_grid = self.x_grid
-            shape.y_grid = self.y_grid
-            shape.z_grid = self.z_grid
+    def bounds(self, a, b, c):
 
-        return lattice.evaluate_point(x, y, z)
+        return self.sheet_bounds(DiamondSurface.surface_bounds(a, b, c), DiamondSurface.threshold, self.vf)
@@ -1,5 +1,7 @@
 import numexpr as ne
+import numpy as np
 
+from MetaStruct.Functions import Interval
 from MetaStruct.Objects.Lattices.DiamondSurface import DiamondSurface
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
@@ -10,22 +12,16 @@ class DiamondNetwork(Lattice):
     (nx, ny, nz)\t: Number of unit cells per length.\n\n\
     (lx, ly, lz)\t: Length of unit cell in each direction."""
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
-        vf = 1 - self.vf
+        parameters = self.parameters(x, y, z)
+        vf = parameters['vf']
 
-        vfHigh = ne.evaluate('0.5 + vf/2')
-        vfLow = ne.evaluate('0.5 - vf/2')
+        sheet = self.sheet(DiamondSurface.surface, DiamondSurface.threshold, parameters, ne.evaluate('1 - vf'), out)
 
-        lattice = DiamondSurface(self.design_space, self.x, self.y, self.z, self.nx, self.ny, self.nz, self.lx, self.ly, self.lz, vfHigh) - \
-                  DiamondSurface(self.design_space, self.x, self.y, self.z, self.nx, self.ny,
-                                 self.nz, self.lx, self.ly, self.lz, vfLow)
+        return np.negative(sheet, out=sheet)
 
-        for shape in lattice.shapes:
+    def bounds(self, a, b, c):
 
-            shape.x_grid = self.x_grid
-            shape.y_grid = self.y_grid
-            shape.z_grid = self.z_grid
-
-        return -lattice.evaluate_point(x, y, z)
+        return Interval.neg(self.sheet_bounds(DiamondSurface.surface_bounds(a, b, c), DiamondSurface.threshold, 1 - self.vf))
@@ -1,24 +1,29 @@
-import numexpr as ne
-
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
 
 class DiamondSurface(Lattice):
 
-    def evaluate_point(self, x, y, z):
+    surface = 'sin(kx*(x-x0))*sin(ky*(y-y0))*sin(kz*(z-z0)) + sin(kx*(x-x0))*cos(ky*(y-y0))*cos(kz*(z-z0)) + ' \
+              'cos(kx*(x-x0))*sin(ky*(y-y0))*cos(kz*(z-z0)) + cos(kx*(x-x0))*cos(ky*(y-y0))*cos(kz*(z-z0))'
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        parameters = self.parameters(x, y, z)
+        parameters['t'] = self.threshold(parameters['vf'])
+
+        return evaluate(self.surface + ' - t', parameters, out, self)
+
+    @staticmethod
+    def surface_bounds(a, b, c):
+
+        sa, ca, sb, cb, sc, cc = Interval.sin(a), Interval.cos(a), Interval.sin(b), Interval.cos(b), \
+            Interval.sin(c), Interval.cos(c)
 
-        x0 = self.x
-        y0 = self.y
-        z0 = self.z
-        kx = self.kx
-        ky = self.ky
-        kz = self.kz
-        vf = self.vf
-        t = ne.evaluate('2.691*vf -1.333')
+        return Interval.add(Interval.add(Interval.mul(Interval.mul(sa, sb), sc), Interval.mul(Interval.mul(sa, cb), cc)),
+                            Interval.add(Interval.mul(Interval.mul(ca, sb), cc), Interval.mul(Interval.mul(ca, cb), cc)))
 
-        expr = 'sin(kx * (x - x0)) * sin(ky * (y - y0)) * sin(kz * (z - z0)) + \
-                sin(kx * (x - x0)) * cos(ky * (y - y0)) * cos(kz * (z - z0)) + \
-                cos(kx * (x - x0)) * sin(ky * (y - y0)) * cos(kz * (z - z0)) + \
-                cos(kx * (x - x0)) * cos(ky * (y - y0)) * cos(kz * (z - z0)) - t'
+    def bounds(self, a, b, c):
 
-        return ne.evaluate(expr)
+        return Interval.offset(self.surface_bounds(a, b, c), -self.threshold(self.vf))
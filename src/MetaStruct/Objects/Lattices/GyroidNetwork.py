@@ -1,3 +1,7 @@
+import numexpr as ne
+
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Lattices.GyroidSurface import GyroidSurface
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
@@ -8,12 +12,15 @@ class GyroidNetwork(Lattice):
     (nx, ny, nz)\t: Number of unit cells per length.\n\n\
     (lx, ly, lz)\t: Length of unit cell in each direction."""
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
-        vf = 1 - self.vf
+        parameters = self.parameters(x, y, z)
+        vf = parameters['vf']
+        parameters['t'] = GyroidSurface.threshold(ne.evaluate('1 - vf'))
+
+        return evaluate('t - (' + GyroidSurface.surface + ')', parameters, out, self)
 
-        lattice = GyroidSurface(self.design_space, self.x, self.y, self.z, self.nx,
-                                self.ny, self.nz, self.lx, self.ly, self.lz, vf)
+    def bounds(self, a, b, c):
 
-        return -lattice.evaluate_point(x, y, z)
+        return Interval.sub(Interval.point(GyroidSurface.threshold(1 - self.vf)), GyroidSurface.surface_bounds(a, b, c))
@@ -1,5 +1,5 @@
-import numexpr as ne
-
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
 
@@ -11,23 +11,23 @@ class GyroidSurface(Lattice):
 
     # https://tinyurl.com/ybjoblaw
 
-    def evaluate_point(self, x, y, z):
+    surface = 'sin(kx*(x-x0))*cos(ky*(y-y0)) + sin(ky*(y-y0))*cos(kz*(z-z0)) + sin(kz*(z-z0))*cos(kx*(x-x0))'
+
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
-        x0 = self.x
-        y0 = self.y
-        z0 = self.z
-        kx = self.kx
-        ky = self.ky
-        kz = self.kz
-        vf = self.vf
+        parameters = self.parameters(x, y, z)
+        parameters['t'] = self.threshold(parameters['vf'])
+
+        return evaluate(self.surface + ' - t', parameters, out, self)
 
-        t = ne.evaluate('(vf-0.501)/0.3325')
+    @staticmethod
+    def surface_bounds(a, b, c):
 
-        expr = 'sin(kx*(x-x0))*cos(ky*(y-y0)) + \
-                sin(ky * (y - y0)) * cos(kz * (z - z0)) + \
-                sin(kz*(z-z0))*cos(kx*(x-x0)) - t '
+        return Interval.add(Interval.add(Interval.mul(Interval.sin(a), Interval.cos(b)),
+                                         Interval.mul(Interval.sin(b), Interval.cos(c))),
+                            Interval.mul(Interval.sin(c), Interval.cos(a)))
 
-        ne.set_num_threads(ne.ncores)
+    def bounds(self, a, b, c):
 
-        return ne.evaluate(expr)
+        return Interval.offset(self.surface_bounds(a, b, c), -self.threshold(self.vf))
@@ -1,15 +1,29 @@
 import math
 
+import numexpr as ne
 import numpy as np
+from skimage import measure
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
+from MetaStruct.Functions.Calibration import calibrated_threshold
+from MetaStruct.Functions.MeshWelding import pack, quantise, weld
 from MetaStruct.Objects.Booleans.Boolean import Difference, Intersection, Union, Geometry
+from MetaStruct.Objects.Misc.Field import evaluate_field, is_field
 
 
 # TODO: Compress lattice types into one class? Use dict of functions?
 
 class Lattice(Geometry):
+    """Base class of the TPMS lattices. Centre (x, y, z), cells per length (nx, ny, nz), cell size (lx, ly, lz)
+    and vf may be numbers or fields (see Objects/Misc/Field.py), which are evaluated alongside the lattice."""
+
     morph = 'Lattice'
 
+    surface = None
+
+    periodic = True
+
     def __init__(self, design_space, x=0, y=0, z=0, nx=1, ny=1, nz=1, lx=1, ly=1, lz=1, vf=0.5):
         super().__init__(design_space)
 
@@ -29,13 +43,7 @@ class Lattice(Geometry):
 
         self.vf = vf
 
-        self.kx = 2 * math.pi * (self.nx / self.lx)
-        self.ky = 2 * math.pi * (self.ny / self.ly)
-        self.kz = 2 * math.pi * (self.nz / self.lz)
-
-        self.xLims = np.array([-self.lx, self.lx])
-        self.yLims = np.array([-self.ly, self.ly])
-        self.zLims = np.array([-self.lz, self.lz])
+        self.set_wavenumbers()
 
     def __repr__(self):
 
@@ -66,15 +74,265 @@ class Lattice(Geometry):
         self.lx = value
         self.ly = value
         self.lz = value
-        self.kx = 2 * math.pi * (self.nx / self.lx)
-        self.ky = 2 * math.pi * (self.ny / self.ly)
-        self.kz = 2 * math.pi * (self.nz / self.lz)
-        self.xLims = np.array([-self.lx, self.lx])
-        self.yLims = np.array([-self.ly, self.ly])
-        self.zLims = np.array([-self.lz, self.lz])
+        self.set_wavenumbers()
+
+    def set_wavenumbers(self):
+        """Sets kx, ky, kz and the limits, which are None where they depend on a field."""
+
+        self.kx = wavenumber(self.nx, self.lx)
+        self.ky = wavenumber(self.ny, self.ly)
+        self.kz = wavenumber(self.nz, self.lz)
+
+        self.xLims = None if is_field(self.lx) else np.array([-self.lx, self.lx])
+        self.yLims = None if is_field(self.ly) else np.array([-self.ly, self.ly])
+        self.zLims = None if is_field(self.lz) else np.array([-self.lz, self.lz])
+
+    def periods(self):
+        """Number of samples in one period along each axis, if the lattice repeats every whole number of grid
+        samples. None if any parameter is a field, the grid is not uniform or the period and grid step are not
+        commensurate."""
+
+        if not self.periodic or not self.design_space.uniform or any(is_field(p) for p in (self.x, self.y, self.z, self.vf)) or \
+                None in (self.kx, self.ky, self.kz):
+            return None
+
+        periods = []
+
+        for k, step, n in ((self.kx, self.x_step, len(self.design_space.X)),
+                           (self.ky, self.y_step, len(self.design_space.Y)),
+                           (self.kz, self.z_step, len(self.design_space.Z))):
+
+            samples = 2 * math.pi / (abs(k) * step)
+            p = round(samples)
+
+            if p >= n:
+                periods.append(n)
+
+            # Phase drift at the far side of the grid must stay well below one sample
+            elif p >= 1 and abs(samples - p) * n / p < 1e-3:
+                periods.append(p)
+
+            else:
+                return None
+
+        if periods == [len(self.design_space.X), len(self.design_space.Y), len(self.design_space.Z)]:
+            return None
+
+        return periods
+
+    def compute_grid(self, verbose=True, tile_size=None):
+        """Evaluates one period of the lattice and tiles it over the grid when possible, otherwise every
+        sample is evaluated."""
+
+        periods = self.periods()
+
+        if periods is None:
+            return super().compute_grid(verbose, tile_size)
+
+        if verbose is True:
+            print(f'Evaluating unit cell for {self.name}...')
+
+        px, py, pz = periods
+        ds = self.design_space
+
+        cell = np.asarray(self.evaluate_point(*np.ix_(ds.X[:px], ds.Y[:py], ds.Z[:pz])), dtype=ds.DATA_TYPE)
+
+        return cell[np.ix_(np.arange(len(ds.X)) % px, np.arange(len(ds.Y)) % py, np.arange(len(ds.Z)) % pz)]
+
+    def instance_mesh(self, shape=None, cell_resolution=16, level=0, verbose=True):
+        """Meshes the lattice inside shape (the design space bounds if None) by marching cubes on one unit cell,
+        copied into every cell that lies fully inside. Only cells crossing the boundary are meshed against shape.
+        Shapes are assumed to change no faster than distance, as the primitives do, when cells are classified.
+        Vertices are relative to the grid origin, as in find_surface."""
+
+        if not self.periodic or any(is_field(p) for p in (self.x, self.y, self.z, self.vf)) or \
+                None in (self.kx, self.ky, self.kz):
+            raise ValueError('Mesh instancing needs a periodic lattice with constant parameters.')
+
+        ds = self.design_space
+
+        cell = 2 * math.pi / np.abs(np.array([self.kx, self.ky, self.kz], dtype=np.float64))
+        origin = np.array([self.x, self.y, self.z], dtype=np.float64)
+        spacing = cell / cell_resolution
+
+        if shape is None:
+            lower = np.array([ds.x_lower, ds.y_lower, ds.z_lower], dtype=np.float64)
+            upper = np.array([ds.x_upper, ds.y_upper, ds.z_upper], dtype=np.float64)
+            # Pulled in slightly so the bounds do not fall exactly on samples, which would leave the mesh open
+            centre, half = (upper + lower) / 2, (upper - lower) / 2 - 1e-3 * spacing
+
+            def region(x, y, z):
+
+                return np.maximum(np.maximum(np.abs(x - centre[0]) - half[0], np.abs(y - centre[1]) - half[1]),
+                                  np.abs(z - centre[2]) - half[2])
+
+        else:
+            limits = (shape.x_limits, shape.y_limits, shape.z_limits)
+            bounds = ((ds.x_lower, ds.x_upper), (ds.y_lower, ds.y_upper), (ds.z_lower, ds.z_upper))
+            lower = np.array([min(l) if l is not None else b[0] for l, b in zip(limits, bounds)], dtype=np.float64)
+            upper = np.array([max(l) if l is not None else b[1] for l, b in zip(limits, bounds)], dtype=np.float64)
+            region = shape.evaluate_point
+
+        # One cell of padding on each side so the clipped surface is closed where the region ends on a cell face
+        first = np.floor((lower - origin) / cell).astype(int) - 1
+        counts = np.ceil((upper - origin) / cell).astype(int) + 1 - first
+
+        if verbose is True:
+            print(f'Instancing {self.name} unit cell over {counts[0]} x {counts[1]} x {counts[2]} cells...')
+
+        # Classify cells from region values on a coarse grid of 4 intervals per cell edge
+        sub = 4
+        axes = [origin[i] + (first[i] + np.arange(counts[i] * sub + 1) / sub) * cell[i] for i in range(3)]
+        values = np.asarray(region(*np.ix_(*axes)))
+        windows = np.lib.stride_tricks.sliding_window_view(values, (sub + 1,) * 3)[::sub, ::sub, ::sub]
+        margin = np.linalg.norm(cell / sub) / 2
+        band = np.linalg.norm(spacing)
+
+        # Interior cells keep band clear of the boundary so the faces they share with boundary cells match
+        inside = windows.max(axis=(3, 4, 5)) < -(margin + band)
+        outside = windows.min(axis=(3, 4, 5)) > margin
+
+        if shape is not None:
+
+            # Interval bounds are exact where the shape provides them, whatever its field looks like
+            corners = [origin[i] + (first[i] + np.arange(counts[i] + 1)) * cell[i] for i in range(3)]
+            lower_corners = np.meshgrid(*[c[:-1] for c in corners], indexing='ij')
+            upper_corners = np.meshgrid(*[c[1:] for c in corners], indexing='ij')
+
+            lo, hi = shape.evaluate_interval(*zip(lower_corners, upper_corners))
+            bounded = np.isfinite(lo) & np.isfinite(hi)
+
+            inside = np.where(bounded, hi < -band, inside)
+            outside = np.where(bounded, lo > 0, outside)
+
+        boundary = ~inside & ~outside
+
+        samples = [np.arange(cell_resolution + 1) * spacing[i] for i in range(3)]
+
+        # Vertices are welded on integer coordinates, exact across cells: 1/scale of a sample in each cell
+        scale = 1024
+        extent = counts * cell_resolution * scale + 1
+        face = cell_resolution * scale
+
+        vertices, faces, normals, keys, shared = [], [], [], [], []
+        n_vertices = 0
+
+        interior = np.argwhere(inside)
+
+        if len(interior) > 0:
+
+            lattice = np.asarray(self.evaluate_point(*np.ix_(*[origin[i] + samples[i] for i in range(3)])))
+
+            if lattice.min() < level < lattice.max():
+
+                v, f, n, _ = measure.marching_cubes(lattice, level=level, spacing=tuple(spacing),
+                                                    allow_degenerate=False)
+
+                q = quantise(v, spacing, scale)
+                offsets = (origin + (first + interior) * cell).astype(v.dtype)
+
+                vertices.append((v[None, :, :] + offsets[:, None, :]).reshape(-1, 3))
+                faces.append((f[None, :, :] + (np.arange(len(interior)) * len(v))[:, None, None]).reshape(-1, 3))
+                normals.append(np.tile(n, (len(interior), 1)))
+                keys.append((pack(q, extent)[None, :] + pack(interior * face, extent)[:, None]).reshape(-1))
+                shared.append(np.tile(((q == 0) | (q == face)).any(axis=1), len(interior)))
+                n_vertices += len(interior) * len(v)
+
+        for index in np.argwhere(boundary):
+
+            corner = origin + (first + index) * cell
+            x, y, z = np.ix_(*[corner[i] + samples[i] for i in range(3)])
+
+            clip = np.asarray(region(x, y, z))
+            lattice = np.asarray(self.evaluate_point(x, y, z))
+
+            grid = np.where(clip < -band, lattice, np.maximum(clip, lattice))
+
+            if not grid.min() < level < grid.max():
+                continue
+
+            v, f, n, _ = measure.marching_cubes(grid, level=level, spacing=tuple(spacing), allow_degenerate=False)
+
+            q = quantise(v, spacing, scale)
+
+            vertices.append(v + corner.astype(v.dtype))
+            faces.append(f + n_vertices)
+            normals.append(n)
+            keys.append(pack(q + index * face, extent))
+            shared.append(((q == 0) | (q == face)).any(axis=1))
+            n_vertices += len(v)
+
+        if n_vertices == 0:
+            raise ValueError(f'No isosurface found at specified level ({level})')
+
+        self.vertices, self.faces, self.normals = weld(np.concatenate(vertices), np.concatenate(faces),
+                                                       np.concatenate(keys), np.concatenate(shared),
+                                                       np.concatenate(normals))
+
+        self.vertices -= np.array([ds.X[0], ds.Y[0], ds.Z[0]], dtype=self.vertices.dtype)
+
+    def parameters(self, x, y, z):
+        """Local dictionary for the lattice expressions at points (x, y, z). Parameters given as fields are
+        evaluated at the same points, so graded lattices need no full-size parameter arrays."""
+
+        x0, y0, z0, nx, ny, nz, lx, ly, lz, vf = (evaluate_field(p, x, y, z) for p in (
+            self.x, self.y, self.z, self.nx, self.ny, self.nz, self.lx, self.ly, self.lz, self.vf))
+
+        return {'x': x, 'y': y, 'z': z, 'x0': x0, 'y0': y0, 'z0': z0, 'vf': vf,
+                'kx': self.kx if self.kx is not None else wavenumber(nx, lx),
+                'ky': self.ky if self.ky is not None else wavenumber(ny, ly),
+                'kz': self.kz if self.kz is not None else wavenumber(nz, lz)}
+
+    @classmethod
+    def threshold(cls, vf):
+        """Level set value at which surface <= t fills volume fraction vf, from the calibration tables."""
+
+        return calibrated_threshold(cls.__name__, cls.surface, vf)
+
+    def sheet(self, surface, threshold, parameters, vf, out=None):
+        """Solid between the two level sets of surface enclosing volume fraction vf, as a single pass
+        over the surface values, written into out if given."""
+
+        g = evaluate(surface, parameters, out, self)
+        t_high = threshold(ne.evaluate('0.5 + vf/2'))
+        t_low = threshold(ne.evaluate('0.5 - vf/2'))
+
+        return evaluate('where(g - t_high > t_low - g, g - t_high, t_low - g)', out=g, node=self)
+
+    def evaluate_interval(self, x, y, z):
+        """Bounds over boxes from sin/cos bounds of the phases kx*(x-x0) etc. Unbounded for graded lattices."""
+
+        if any(is_field(p) for p in (self.x, self.y, self.z, self.vf)) or None in (self.kx, self.ky, self.kz):
+            return Interval.unbounded(x)
+
+        a, b, c = (Interval.scale(Interval.offset(v, -v0), k)
+                   for v, v0, k in ((x, self.x, self.kx), (y, self.y, self.ky), (z, self.z, self.kz)))
+
+        bounds = self.bounds(a, b, c)
+
+        if bounds is None:
+            return Interval.unbounded(x)
+
+        return bounds
+
+    def bounds(self, a, b, c):
+        """Bounds of the field given the intervals of the phases, None if unknown."""
+
+        return None
+
+    def sheet_bounds(self, g, threshold, vf):
+        """Bounds of sheet() given the bounds g of the surface."""
+
+        t_high = threshold(0.5 + vf / 2)
+        t_low = threshold(0.5 - vf / 2)
+
+        return Interval.maximum(Interval.offset(g, -t_high), Interval.sub(Interval.point(t_low), g))
 
     def paramCheck(self, n):
 
+        if is_field(n):
+            return n
+
         try:
 
             float(n)
@@ -83,3 +341,17 @@ class Lattice(Geometry):
         except ValueError:
             print(f'{n} is not a number.')
             raise
+
+
+def wavenumber(n, l):
+    """2*pi*n/l for numbers or arrays, None if either is a field that has not been evaluated yet."""
+
+    if is_field(n) or is_field(l):
+        return None
+
+    if np.ndim(n) == 0 and np.ndim(l) == 0:
+        return 2 * math.pi * (n / l)
+
+    two_pi = 2 * math.pi
+
+    return ne.evaluate('two_pi * n / l')
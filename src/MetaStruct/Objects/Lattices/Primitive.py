@@ -8,12 +8,13 @@ class Primitive(Lattice):
     (nx, ny, nz)\t: Number of unit cells per length.\n\n\
     (lx, ly, lz)\t: Length of unit cell in each direction."""
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
-        lattice = PrimitiveSurface(self.design_space, self.x, self.y, self.z, self.nx,
-                                   self.ny, self.nz, self.lx, self.ly, self.lz, -self.vf) - \
-            PrimitiveSurface(self.design_space, self.x, self.y, self.z, self.nx, self.ny,
-                             self.nz, self.lx, self.ly, self.lz, self.vf)
+        parameters = self.parameters(x, y, z)
 
-        return lattice.evaluate_point(x, y, z)
+        return self.sheet(PrimitiveSurface.surface, PrimitiveSurface.threshold, parameters, parameters['vf'], out)
+
+    def bounds(self, a, b, c):
+
+        return self.sheet_bounds(PrimitiveSurface.surface_bounds(a, b, c), PrimitiveSurface.threshold, self.vf)
@@ -1,4 +1,6 @@
 from MetaStruct.Objects.Lattices.Lattice import Lattice
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Lattices.PrimitiveSurface import PrimitiveSurface
 
 
@@ -8,10 +10,14 @@ class PrimitiveNetwork(Lattice):
     (nx, ny, nz)\t: Number of unit cells per length.\n\n\
     (lx, ly, lz)\t: Length of unit cell in each direction."""
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
-        lattice = PrimitiveSurface(self.design_space,
-                                   self.x, self.y, self.z, self.nx, self.ny, self.nz, self.lx, self.ly, self.lz, -self.t)
+        parameters = self.parameters(x, y, z)
+        parameters['t'] = PrimitiveSurface.threshold(parameters['vf'])
 
-        return -lattice.evaluate_point(x, y, z)
+        return evaluate(PrimitiveSurface.surface + ' - t', parameters, out, self)
+
+    def bounds(self, a, b, c):
+
+        return Interval.offset(PrimitiveSurface.surface_bounds(a, b, c), -PrimitiveSurface.threshold(self.vf))
@@ -1,23 +1,27 @@
 import numexpr as ne
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
 
 class PrimitiveSurface(Lattice):
 
-    def evaluate_point(self, x, y, z):
+    surface = 'cos(kx*(x-x0)) + cos(ky*(y-y0)) + cos(kz*(z-z0))'
 
-        x0 = self.x
-        y0 = self.y
-        z0 = self.z
-        kx = self.kx
-        ky = self.ky
-        kz = self.kz
-        t = self.vf
+    def evaluate_point(self, x, y, z, out=None):
 
-        expr = '-(cos(kx*(x-x0)) + \
-                cos(ky*(y-y0)) + \
-                cos(kz*(z-z0)) - \
-                  t) '
+        parameters = self.parameters(x, y, z)
+        vf = parameters['vf']
+        parameters['t'] = self.threshold(ne.evaluate('1 - vf'))
 
-        return ne.evaluate(expr)
+        return evaluate('t - (' + self.surface + ')', parameters, out, self)
+
+    @staticmethod
+    def surface_bounds(a, b, c):
+
+        return Interval.add(Interval.add(Interval.cos(a), Interval.cos(b)), Interval.cos(c))
+
+    def bounds(self, a, b, c):
+
+        return Interval.sub(Interval.point(self.threshold(1 - self.vf)), self.surface_bounds(a, b, c))
@@ -2,12 +2,15 @@ import math
 
 import numexpr as ne
 
+from MetaStruct.Objects.BufferArena import store
 from MetaStruct.Objects.Lattices.Lattice import Lattice
 
 
 class SquareLattice(Lattice):
 
-    def evaluate_point(self, x, y, z):
+    periodic = False
+
+    def evaluate_point(self, x, y, z, out=None):
         """Returns the function value at point (x, y, z)."""
 
         qx = 2
@@ -33,4 +36,4 @@ class SquareLattice(Lattice):
         xy_xz = ne.re_evaluate(local_dict={'s1':xy, 's2': xz})
         combine = ne.re_evaluate(local_dict={'s1': yz, 's2': xy_xz})
 
-        return -combine
+        return store(-combine, out)
@@ -7,6 +7,8 @@ import numpy as np
 import scipy
 from sklearn.neighbors import NearestNeighbors
 
+from MetaStruct.Functions.Backends import evaluate
+from MetaStruct.Objects.BufferArena import buffer_arena, output, store
 from MetaStruct.Objects.Shapes.Line import Line
 from MetaStruct.Objects.Shapes.Shape import Shape
 
@@ -28,6 +30,10 @@ def profile(func):
 
 
 class StrutLattice(Shape):
+
+    # Structures the lines are built from, not kept when the lattice is pickled or saved since the lines are
+    BUILDERS = ('neighbours', 'delaunay', 'convex_hull', 'voronoi')
+
     def __init__(self, design_space, r=0.02, point_cloud=None, blend=0):
         super().__init__(design_space)
         self.r = r
@@ -41,6 +47,50 @@ class StrutLattice(Shape):
             self.point_cloud = point_cloud
             self.points = self.point_cloud.points
 
+    def __getstate__(self):
+
+        state = super().__getstate__()
+
+        # The lines as one (n, 2, 3) array of end points rather than a list of pairs
+        state['lines'] = np.array(self.lines, dtype=float).reshape(-1, 2, 3)
+
+        for name in self.BUILDERS:
+            if name in state:
+                state[name] = None
+
+        return state
+
+    def __setstate__(self, state):
+
+        super().__setstate__({**state, 'lines': [list(line) for line in state['lines']]})
+
+    def evaluate_point(self, x, y, z, out=None):
+        """Union of the struts, smooth if blend is not 0, as built by generate_lattice."""
+
+        if not self.lines:
+            raise ValueError('No line points found.')
+
+        result = output(x, y, z, out)
+
+        with buffer_arena.borrow(result.shape) as (values,):
+
+            for i, (p1, p2) in enumerate(self.lines):
+
+                strut = Line(self.design_space, p1, p2, r=self.r)
+
+                if i == 0:
+                    store(strut.evaluate_point(x, y, z, out=result), result)
+
+                elif self.blend == 0:
+                    np.minimum(result, strut.evaluate_point(x, y, z, out=values), out=result)
+
+                else:
+                    evaluate('-log(where((exp(-b*g2) + exp(-b*g1))>0.000, exp(-b*g2) + exp(-b*g1), 0.000))/b',
+                             {'g1': result, 'g2': strut.evaluate_point(x, y, z, out=values), 'b': self.blend},
+                             result, self)
+
+        return result
+
     def generate_lattice(self):
 
         self.n_lines = len(self.lines)
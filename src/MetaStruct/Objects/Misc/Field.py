@@ -0,0 +1,86 @@
+import abc
+
+import numexpr as ne
+import numpy as np
+
+
+class Field(abc.ABC):
+    """Scalar field that can be passed in place of a number for lattice parameters (vf, nx, lx, x, ...).
+
+    Fields are evaluated lazily at the same points (and in the same tiles) as the lattice, so grading a
+    lattice does not need any extra full-size arrays. Any Geometry can also be used as a field, in which case
+    its raw function value is used. Subclasses define evaluate_point."""
+
+    @abc.abstractmethod
+    def evaluate_point(self, x, y, z):
+        """Values of the field at points (x, y, z)."""
+
+
+class LinearField(Field):
+    """Linear ramp from start_value at the point start to end_value at the point end, constant beyond them."""
+
+    def __init__(self, start=(0, 0, 0), end=(1, 0, 0), start_value=0., end_value=1.):
+
+        self.start = np.array(start, dtype=float)
+        self.end = np.array(end, dtype=float)
+        self.start_value = start_value
+        self.end_value = end_value
+
+        if not (self.end - self.start).any():
+            raise ValueError('Start and end points of a linear field must differ.')
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({tuple(self.start)}, {tuple(self.end)}, {self.start_value}, ' \
+               f'{self.end_value})'
+
+    def evaluate_point(self, x, y, z):
+
+        x0, y0, z0 = self.start
+        dx, dy, dz = (self.end - self.start) / np.sum((self.end - self.start) ** 2)
+        a = self.start_value
+        b = self.end_value
+
+        t = ne.evaluate('(x-x0)*dx + (y-y0)*dy + (z-z0)*dz')
+
+        return ne.evaluate('a + (b-a)*where(t<0, 0, where(t>1, 1, t))')
+
+
+class DistanceField(Field):
+    """Grades a value with the function value of a shape: near_value on and inside the surface, far_value at
+    a function value of distance and beyond, and linear in between."""
+
+    def __init__(self, shape, distance=1., near_value=0., far_value=1.):
+
+        self.shape = shape
+        self.distance = distance
+        self.near_value = near_value
+        self.far_value = far_value
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({repr(self.shape)}, {self.distance}, {self.near_value}, ' \
+               f'{self.far_value})'
+
+    def evaluate_point(self, x, y, z):
+
+        s = self.shape.evaluate_point(x, y, z)
+        d = self.distance
+        a = self.near_value
+        b = self.far_value
+
+        return ne.evaluate('a + (b-a)*where(s<0, 0, where(s>d, 1, s/d))')
+
+
+def is_field(value):
+
+    return hasattr(value, 'evaluate_point')
+
+
+def evaluate_field(value, x, y, z):
+    """Value of a parameter at the points: fields and geometries are evaluated, numbers are returned as is."""
+
+    if is_field(value):
+        return value.evaluate_point(x, y, z)
+
+    return value
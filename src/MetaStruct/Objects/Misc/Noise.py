@@ -1,35 +1,164 @@
 import numexpr as ne
 import numpy as np
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Objects.BufferArena import output
 from MetaStruct.Objects.Geometry import Geometry
 
+# Permutation-free hashing: lattice coordinates are mixed with large odd constants and finished with the
+# murmur3 avalanche, so any point can be evaluated on its own and every tile agrees with its neighbours.
+_PRIMES = (np.uint32(0x8da6b343), np.uint32(0xd8163841), np.uint32(0xcb1ab31f), np.uint32(0x165667b1))
+
+# Gradient directions of improved Perlin noise (the 12 cube edge midpoints, padded to 16)
+_GRADIENTS = np.array([[1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],
+                       [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],
+                       [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1],
+                       [1, 1, 0], [-1, 1, 0], [0, -1, 1], [0, -1, -1]], dtype=np.float32)
+
+
+def hash_lattice(ix, iy, iz, seed=0):
+    """Seeded 32 bit hash of integer lattice coordinates."""
+
+    h = (ix.astype(np.uint32) * _PRIMES[0]) ^ (iy.astype(np.uint32) * _PRIMES[1]) ^ \
+        (iz.astype(np.uint32) * _PRIMES[2]) ^ (np.uint32(seed) * _PRIMES[3])
+
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x85ebca6b)
+    h ^= h >> np.uint32(13)
+    h *= np.uint32(0xc2b2ae35)
+    h ^= h >> np.uint32(16)
+
+    return h
+
+
+def lattice_noise(x, y, z, frequency=1., seed=0, kind='value'):
+    """Smooth noise in [-1, 1] evaluated independently at each point.
+
+    kind='value' interpolates hashed values at the lattice corners, kind='gradient' interpolates hashed
+    gradients (Perlin noise). frequency is the number of lattice cells per unit length, either a scalar or
+    one value per axis. The result is float32."""
+
+    if kind not in ('value', 'gradient'):
+        raise ValueError(f'"{kind}" is not a valid noise type, use "value" or "gradient".')
+
+    fx, fy, fz = np.broadcast_to(np.asarray(frequency, dtype=np.float32), (3,))
+
+    px = np.asarray(x, dtype=np.float32) * fx
+    py = np.asarray(y, dtype=np.float32) * fy
+    pz = np.asarray(z, dtype=np.float32) * fz
+
+    ix = np.floor(px)
+    iy = np.floor(py)
+    iz = np.floor(pz)
+
+    tx = px - ix
+    ty = py - iy
+    tz = pz - iz
+
+    ix = ix.astype(np.int32)
+    iy = iy.astype(np.int32)
+    iz = iz.astype(np.int32)
+
+    # Quintic fade, so the field has a continuous second derivative across cell faces
+    fade = '(t * t * t * (t * (t * 6 - 15) + 10))'
+    ux = ne.evaluate(fade, local_dict={'t': tx})
+    uy = ne.evaluate(fade, local_dict={'t': ty})
+    uz = ne.evaluate(fade, local_dict={'t': tz})
+
+    result = np.zeros(px.shape, dtype=np.float32)
+
+    for dx in (0, 1):
+        for dy in (0, 1):
+            for dz in (0, 1):
+
+                h = hash_lattice(ix + dx, iy + dy, iz + dz, seed)
+
+                if kind == 'value':
+                    corner = (h >> np.uint32(8)).astype(np.float32) * np.float32(2 / 2 ** 24) - 1
+
+                else:
+                    g = _GRADIENTS[h & np.uint32(15)]
+                    corner = g[..., 0] * (tx - dx) + g[..., 1] * (ty - dy) + g[..., 2] * (tz - dz)
+
+                wx = ux if dx else 1 - ux
+                wy = uy if dy else 1 - uy
+                wz = uz if dz else 1 - uz
+
+                ne.evaluate('result + wx * wy * wz * corner', out=result, casting='same_kind')
+
+    return result
+
+
+def fractal_noise(x, y, z, frequency=1., seed=0, kind='gradient', octaves=4, lacunarity=2., gain=0.5):
+    """Sum of octaves of lattice_noise, normalised back to [-1, 1]."""
+
+    result = None
+    amplitude = 1.
+    total = 0.
+
+    for octave in range(octaves):
+
+        layer = lattice_noise(x, y, z, np.multiply(frequency, lacunarity ** octave), seed + octave, kind)
+
+        result = amplitude * layer if result is None else result + amplitude * layer
+
+        total += amplitude
+        amplitude *= gain
+
+    return (result / total).astype(np.float32)
+
 
 class Noise(Geometry):
+    """Shape with smooth value noise added to its field.
+
+    The noise is hashed from the point coordinates and seed, so it is deterministic wherever and in
+    whatever order it is evaluated. frequency is in lattice cells per unit length and defaults to one cell
+    per grid step, which resembles per-voxel random noise. intensity scales the noise amplitude in hundredths
+    of a field unit."""
 
-    def __init__(self, design_space, shape, intensity=1.5):
+    morph = 'Shape'
+
+    def __init__(self, design_space, shape, intensity=1.5, frequency=None, seed=0, kind='value'):
         super().__init__(design_space)
 
         self.shape = shape
-        self.designSpace = design_space
-        self.intensity = 10000/intensity
+        self.adopt(shape)
+
+        self.intensity = intensity
+        self.seed = seed
+        self.kind = kind
+
+        if frequency is None:
+            frequency = 1 / min(self.x_step, self.y_step, self.z_step)
+
+        self.frequency = frequency
+
+        self.set_limits()
+
+    def set_limits(self):
+
+        self.x_limits = self.shape.x_limits
+        self.y_limits = self.shape.y_limits
+        self.z_limits = self.shape.z_limits
 
-        self.xLims = self.shape.x_limits
-        self.yLims = self.shape.y_limits
-        self.zLims = self.shape.z_limits
+    def translate(self, x, y, z):
 
-    def evaluate_grid(self):
+        self.shape.translate(x, y, z)
+        self.set_limits()
 
-        grid = np.random.randint(
-            100, size=self.designSpace.x_grid.shape)
-        intensity = self.intensity
+    def evaluate_point(self, x, y, z, out=None):
 
-        self.noiseGrid = ne.evaluate('grid / intensity')
+        shape_value = self.shape.evaluate_point(x, y, z, out=output(x, y, z, out))
+        noise = lattice_noise(x, y, z, self.frequency, self.seed, self.kind)
+        amplitude = self.intensity / 200
 
-        if not hasattr(self.shape, 'evaluated_grid'):
+        # Shift the noise into [0, intensity / 100] as the original per-voxel noise was non-negative
+        return ne.evaluate('shape_value + amplitude * (noise + 1)', out=shape_value, casting='same_kind')
 
-            self.shape.evaluate_grid()
+    def evaluate_interval(self, x, y, z):
 
-        shapeGrid = self.shape.evaluated_grid
-        noiseGrid = self.noiseGrid
+        # Value noise interpolates lattice values in [-1, 1], gradient noise has no simple bound
+        if self.kind != 'value':
+            return Interval.unbounded(x)
 
-        self.evaluatedGrid = ne.evaluate('shapeGrid + noiseGrid')
+        return Interval.add(self.shape.evaluate_interval(x, y, z), (0, self.intensity / 100))
@@ -1,17 +1,30 @@
-import copy
+import math
 
+import numexpr as ne
+import numpy as np
+
+from MetaStruct.Objects.BufferArena import buffer_arena, point_shape
 from MetaStruct.Objects.Shapes.Shape import Shape
 
+# Index of the nearest copy along one direction, clamped to the copies that exist
+NEAREST_COPY = 'where(floor({t} + 0.5) < 0, 0, where(floor({t} + 0.5) > n, n, floor({t} + 0.5)))'
+
+AXES = {'x': (1, 2, 0), 'y': (2, 0, 1), 'z': (0, 1, 2)}
+
 
 class Pattern(Shape):
+    """Grid of nx * ny * nz copies of a shape, spaced xd, yd and zd apart from the shape's position.
 
-    def __init__(self, shape, nx=3, ny=2, nz=2, xd=0.5, yd=0.5, zd=0.5):
+    Points are folded into the cell of the nearest copy before the source shape is evaluated, so a pattern
+    costs about the same as a single copy regardless of the number of copies. Copies should fit within
+    their spacing, as only the nearest copy is evaluated."""
 
-        self.x = shape.x
-        self.y = shape.y
-        self.z = shape.z
+    # Changes to the source shape appear in every copy
+    local = False
 
-        super().__init__(self.x, self.y, self.z)
+    def __init__(self, shape, nx=3, ny=2, nz=2, xd=0.5, yd=0.5, zd=0.5):
+
+        super().__init__(shape.design_space, shape.x, shape.y, shape.z)
 
         self.nx = nx
         self.ny = ny
@@ -22,66 +35,208 @@ class Pattern(Shape):
         self.zd = zd
 
         self.sourceShape = shape
+        self.adopt(shape)
 
         self.shape = shape
 
-        self.set_limits(self.sourceShape)
+        self.set_limits()
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({repr(self.sourceShape)}, {self.nx}, {self.ny}, {self.nz}, ' \
+               f'{self.xd}, {self.yd}, {self.zd})'
+
+    def set_limits(self):
+
+        self.x_limits = extend_limits(self.sourceShape.x_limits, (self.nx - 1) * self.xd)
+        self.y_limits = extend_limits(self.sourceShape.y_limits, (self.ny - 1) * self.yd)
+        self.z_limits = extend_limits(self.sourceShape.z_limits, (self.nz - 1) * self.zd)
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        source = self.sourceShape
+
+        with buffer_arena.borrow(point_shape(x, y, z), 3) as (xs, ys, zs):
+
+            return source.evaluate_point(fold(x, source.x, self.xd, self.nx, xs),
+                                         fold(y, source.y, self.yd, self.ny, ys),
+                                         fold(z, source.z, self.zd, self.nz, zs), out=out)
+
+    def translate(self, x, y, z):
+
+        self.sourceShape.translate(x, y, z)
+
+        self.x += x
+        self.y += y
+        self.z += z
+
+        self.set_limits()
+
+
+class LinearPattern(Shape):
+    """n copies of a shape along the vector direction, each one direction further from the last."""
+
+    # Changes to the source shape appear in every copy
+    local = False
+
+    def __init__(self, shape, n=3, direction=(1, 0, 0)):
+
+        super().__init__(shape.design_space, shape.x, shape.y, shape.z)
+
+        self.n = n
+        self.direction = np.array(direction, dtype=float)
+
+        if not self.direction.any():
+            raise ValueError('Pattern direction must be non-zero.')
+
+        self.sourceShape = shape
+        self.adopt(shape)
+
+        self.set_limits()
 
-        self.createPattern()
+    def __repr__(self):
 
-    def createPattern(self):
+        return f'{self.__class__.__name__}({repr(self.sourceShape)}, {self.n}, {tuple(self.direction)})'
 
-        for it in range(self.nx):
+    def set_limits(self):
 
-            it += 1
+        dx, dy, dz = (self.n - 1) * self.direction
 
-            new_shape = copy.deepcopy(self.sourceShape)
+        self.x_limits = extend_limits(self.sourceShape.x_limits, dx)
+        self.y_limits = extend_limits(self.sourceShape.y_limits, dy)
+        self.z_limits = extend_limits(self.sourceShape.z_limits, dz)
 
-            new_shape.translate(it*self.xd, 0, 0)
+    def evaluate_point(self, x, y, z, out=None):
 
-            self.shape += new_shape
+        source = self.sourceShape
 
-        self.set_limits(self.shape)
+        x0 = source.x
+        y0 = source.y
+        z0 = source.z
+        dx, dy, dz = self.direction
+        length = float(self.direction @ self.direction)
 
-        for it in range(self.ny):
+        n = self.n - 1
+        i = nearest_copy('((x-x0)*dx + (y-y0)*dy + (z-z0)*dz) / length')
 
-            it += 1
+        with buffer_arena.borrow(point_shape(x, y, z), 3) as (xs, ys, zs):
 
-            new_shape = copy.deepcopy(self.sourceShape)
+            ne.evaluate(f'x - {i}*dx', out=xs, casting='same_kind')
+            ne.evaluate(f'y - {i}*dy', out=ys, casting='same_kind')
+            ne.evaluate(f'z - {i}*dz', out=zs, casting='same_kind')
 
-            new_shape.translate(0, it*self.yd, 0)
+            return source.evaluate_point(xs, ys, zs, out=out)
 
-            self.shape += new_shape
+    def translate(self, x, y, z):
+
+        self.sourceShape.translate(x, y, z)
+
+        self.x += x
+        self.y += y
+        self.z += z
+
+        self.set_limits()
+
+
+class CircularPattern(Shape):
+    """n copies of a shape spaced evenly around an axis ('x', 'y' or 'z') through centre.
+
+    Points are rotated back into the sector of the source shape, so the cost does not depend on n."""
+
+    # Changes to the source shape appear in every copy
+    local = False
+
+    def __init__(self, shape, n=6, axis='z', centre=(0, 0, 0)):
+
+        if axis not in AXES:
+            raise ValueError(f'"{axis}" is not a valid axis, use "x", "y" or "z".')
+
+        super().__init__(shape.design_space, *centre)
+
+        self.n = n
+        self.axis = axis
+
+        self.sourceShape = shape
+        self.adopt(shape)
 
-        self.set_limits(self.shape)
+        self.set_limits()
 
-        for it in range(self.nz):
+    def __repr__(self):
 
-            it += 1
+        return f'{self.__class__.__name__}({repr(self.sourceShape)}, {self.n}, {self.axis}, ' \
+               f'({self.x}, {self.y}, {self.z}))'
 
-            new_shape = copy.deepcopy(self.sourceShape)
+    def set_limits(self):
 
-            new_shape.translate(0, 0, it*self.zd)
+        u, v, w = AXES[self.axis]
+        centre = (self.x, self.y, self.z)
+        source_limits = (self.sourceShape.x_limits, self.sourceShape.y_limits, self.sourceShape.z_limits)
 
-            self.shape += new_shape
+        # Every copy lies within the circle swept by the furthest corner of the source bounding box
+        radius = max(math.hypot(a - centre[u], b - centre[v]) for a in source_limits[u] for b in source_limits[v])
 
-        self.set_limits(self.shape)
+        limits = [None, None, None]
+        limits[u] = np.array([centre[u] - radius, centre[u] + radius])
+        limits[v] = np.array([centre[v] - radius, centre[v] + radius])
+        limits[w] = np.array(source_limits[w])
 
-    def set_limits(self, obj):
+        self.x_limits, self.y_limits, self.z_limits = limits
 
-        self.xLims = obj.x_limits
-        self.yLims = obj.y_limits
-        self.zLims = obj.z_limits
+    def evaluate_point(self, x, y, z, out=None):
 
-    def evaluate_point(self, x, y, z):
+        u, v, w = AXES[self.axis]
+        points = (x, y, z)
+        centre = (self.x, self.y, self.z)
+        source = (self.sourceShape.x, self.sourceShape.y, self.sourceShape.z)
 
-        return self.shape.evaluate_point(x, y, z)
+        pu = points[u]
+        pv = points[v]
+        cu = centre[u]
+        cv = centre[v]
+        sector = 2 * math.pi / self.n
+        start = math.atan2(source[v] - cv, source[u] - cu)
+
+        # Angle of the nearest copy, then rotate the point back by it
+        a = '(floor((arctan2(pv-cv, pu-cu) - start) / sector + 0.5) * sector)'
+
+        with buffer_arena.borrow(point_shape(x, y, z), 2) as (fu, fv):
+
+            folded = [None, None, None]
+            folded[u] = ne.evaluate(f'cu + (pu-cu)*cos({a}) + (pv-cv)*sin({a})', out=fu, casting='same_kind')
+            folded[v] = ne.evaluate(f'cv - (pu-cu)*sin({a}) + (pv-cv)*cos({a})', out=fv, casting='same_kind')
+            folded[w] = points[w]
+
+            return self.sourceShape.evaluate_point(*folded, out=out)
 
     def translate(self, x, y, z):
 
         self.sourceShape.translate(x, y, z)
 
-        self.set_limits(self.sourceShape)
+        self.x += x
+        self.y += y
+        self.z += z
+
+        self.set_limits()
+
+
+def extend_limits(limits, distance):
+
+    return np.array([min(limits) + min(distance, 0), max(limits) + max(distance, 0)])
+
+
+def nearest_copy(t):
+    """Expression for the index of the nearest copy at position t (an expression, in spacings), of copies 0 to n."""
+
+    return '(' + NEAREST_COPY.format(t=f'({t})') + ')'
+
+
+def fold(v, v0, d, n, out=None):
+    """Moves each coordinate back onto the nearest of n copies spaced d apart, starting from v0, into out if
+    given."""
+
+    if n <= 1 or d == 0:
+        return v
+
+    n = n - 1
 
-        self.__init__(self.sourceShape, self.nx, self.ny,
-                      self.nz, self.xd, self.yd, self.zd)
+    return ne.evaluate(f'v - {nearest_copy("(v-v0)/d")}*d', out=out, casting='same_kind')
@@ -1,57 +1,71 @@
 import numexpr as ne
-import perlin3d
 
+from MetaStruct.Objects.BufferArena import store
 from MetaStruct.Objects.Geometry import Geometry
+from MetaStruct.Objects.Misc.Noise import fractal_noise
 
 
 class PerlinNoise(Geometry):
+    """Perlin (gradient) noise field.
 
-    def __init__(self, design_space, shape, freq=(8, 8, 8)):
+    freq is the number of noise cells across the design space in each axis. The field is evaluated
+    pointwise from a seeded hash, so it can be evaluated in tiles or at arbitrary points. Use octaves > 1
+    for fractal noise."""
+
+    def __init__(self, design_space, shape, freq=(8, 8, 8), seed=0, octaves=1):
         super().__init__(design_space)
 
         self.morph = 'Shape'
 
         self.shape = shape
-        self.designSpace = design_space
+        self.freq = freq
+        self.seed = seed
+        self.octaves = octaves
 
-        self.xLims = self.shape.x_limits
-        self.yLims = self.shape.y_limits
-        self.zLims = self.shape.z_limits
+        extents = (self.design_space.X[-1] - self.design_space.X[0],
+                   self.design_space.Y[-1] - self.design_space.Y[0],
+                   self.design_space.Z[-1] - self.design_space.Z[0])
 
-        self.freq = freq
+        self.frequency = tuple(f / extent for f, extent in zip(self.freq, extents))
+
+        self.set_limits()
+
+    def set_limits(self):
+
+        self.x_limits = self.shape.x_limits
+        self.y_limits = self.shape.y_limits
+        self.z_limits = self.shape.z_limits
 
-    def evaluate_grid(self):
+    def evaluate_point(self, x, y, z, out=None):
 
-        print('Generating Perlin Noise...')
-        self.evaluatedGrid = perlin3d.generate_perlin_noise_3d(
-            self.designSpace.x_grid.shape, self.freq)
+        return store(fractal_noise(x, y, z, self.frequency, self.seed, kind='gradient', octaves=self.octaves), out)
 
     def noiseShape(self):
 
-        if not hasattr(self, 'evaluated_grid'):
+        if self.evaluated_grid is None:
 
             self.evaluate_grid()
 
-        if not hasattr(self.shape, 'evaluated_grid'):
+        if self.shape.evaluated_grid is None:
 
             self.shape.evaluate_grid()
 
         g1 = self.shape.evaluated_grid
-        g2 = self.evaluatedGrid
+        g2 = self.evaluated_grid
 
         expr = 'g1 + (g2 * 1.5)'
 
-        self.evaluatedGrid = ne.evaluate(expr)
+        self.evaluated_grid = ne.evaluate(expr)
 
     def noiseLattice(self):
 
-        if not hasattr(self, 'evaluated_grid'):
+        if self.evaluated_grid is None:
 
             self.evaluate_grid()
 
-        g1 = self.evaluatedGrid
-        g2 = -(self.evaluatedGrid + 0.1)
+        g1 = self.evaluated_grid
+        g2 = -(self.evaluated_grid + 0.1)
 
         expr = 'where(g1>g2, g1, g2)'
 
-        self.evaluatedGrid = ne.evaluate(expr)
+        self.evaluated_grid = ne.evaluate(expr)
@@ -23,7 +23,9 @@ class Vector:
         return mult(self, other)
 
 
-def subtract(a, b):
+def subtract(a, b, out=None):
+    """a - b, written into the three arrays of out if given."""
+
     ax = a.x
     ay = a.y
     az = a.z
@@ -32,27 +34,22 @@ def subtract(a, b):
     by = b.y
     bz = b.z
 
-    if ax.ndim == 0 and bx.ndim == 0:
-        arrx = ax-bx
-    if ay.ndim == 0 and by.ndim == 0:
-        arry = ay-by
-    if az.ndim == 0 and bz.ndim == 0:
-        arrz = az-bz
+    if out is None and all(np.ndim(v) == 0 for v in (ax, ay, az, bx, by, bz)):
+        return Vector([ax-bx, ay-by, az-bz])
 
-    else:
+    if out is None:
+        out = [np.empty(np.broadcast_shapes(np.shape(p), np.shape(q)), dtype=np.float32)
+               for p, q in ((ax, bx), (ay, by), (az, bz))]
 
-        arrx = np.empty(ax.shape, dtype=np.float32)
-        arry = np.empty(ay.shape, dtype=np.float32)
-        arrz = np.empty(az.shape, dtype=np.float32)
+    for p, q, o in zip((ax, ay, az), (bx, by, bz), out):
+        ne.evaluate('a-b', local_dict={'a': p, 'b': q}, out=o, casting='same_kind')
 
-        ne.evaluate('a-b', local_dict={'a': ax, 'b': bx}, out=arrx, casting='same_kind')
-        ne.evaluate('a-b', local_dict={'a': ay, 'b': by}, out=arry, casting='same_kind')
-        ne.evaluate('a-b', local_dict={'a': az, 'b': bz}, out=arrz, casting='same_kind')
+    return Vector(out)
 
-    return Vector([arrx, arry, arrz])
 
+def mult(a, b, out=None):
+    """Dot product of a and b, written into out if given."""
 
-def mult(a, b):
     ax = a.x
     ay = a.y
     az = a.z
@@ -61,10 +58,12 @@ def mult(a, b):
     by = b.y
     bz = b.z
 
-    if ax.ndim == 0 and bx.ndim == 0:
+    if out is None and all(np.ndim(v) == 0 for v in (ax, ay, az, bx, by, bz)):
         return (ax*bx)+(ay*by)+(az*bz)
 
-    else:
-        out = np.empty_like(ax, dtype=np.float32)
-        ne.evaluate('(ax*bx)+(ay*by)+(az*bz)', out=out, casting='same_kind')
-        return out
+    if out is None:
+        out = np.empty(np.broadcast_shapes(*[np.shape(v) for v in (ax, ay, az, bx, by, bz)]), dtype=np.float32)
+
+    ne.evaluate('(ax*bx)+(ay*by)+(az*bz)', out=out, casting='same_kind')
+
+    return out
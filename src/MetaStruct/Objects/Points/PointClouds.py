@@ -58,6 +58,254 @@ class FFPoints(PointCloud):
         self.generate_points(self.n_points)
 
 
+class PoissonDiskPoints(PointCloud):
+    """Blue noise point cloud in which no two points are closer than r (Bridson's algorithm).
+
+    Candidates are generated around batches of active points and tested against a background grid with a
+    cell size of r / sqrt(3), so each cell holds at most one point and neighbour checks are O(1). Candidates
+    outside the shape (shape.evaluate_point > 0) are rejected. An active point is retired once a batch of k
+    candidates around it is fully rejected.
+
+    radius_field is an optional callable f(x, y, z) or Geometry returning the local spacing at each point.
+    It is clamped to [r, r_max], r_max defaulting to 4 * r, and two points must be at least the larger of
+    their two radii apart."""
+
+    def __init__(self, shape=None, r=0.1, k=8, radius_field=None, r_max=None, n_points=None, seed=None,
+                 batch_size=65536):
+        super().__init__(n_points, shape)
+
+        if r <= 0:
+            raise ValueError('Minimum spacing r must be positive.')
+
+        self.r = r
+        self.k = k
+        self.radius_field = radius_field
+        self.batch_size = batch_size
+
+        if radius_field is None:
+            self.r_max = r
+        else:
+            self.r_max = 4 * r if r_max is None else max(r_max, r)
+
+        self.rng = np.random.default_rng(seed)
+
+        self.lower = np.array([min(self.shape.x_limits), min(self.shape.y_limits), min(self.shape.z_limits)])
+        self.upper = self.lower + np.array([self.xScale, self.yScale, self.zScale])
+
+        self.cell = self.r / math.sqrt(3)
+        self.reach = math.ceil(self.r_max / self.cell)
+        self.dims = np.ceil((self.upper - self.lower) / self.cell).astype(np.int64) + 1
+
+        # Only the neighbouring cells that can hold a point closer than r_max need checking
+        span = np.arange(-self.reach, self.reach + 1)
+        offsets = np.stack(np.meshgrid(span, span, span, indexing='ij'), axis=-1).reshape(-1, 3)
+        gaps = np.maximum(np.abs(offsets) - 1, 0) * self.cell
+        self.offsets = offsets[np.einsum('ij,ij->i', gaps, gaps) < self.r_max ** 2]
+
+        self.generate_points()
+
+    def local_radius(self, points):
+
+        if self.radius_field is None:
+            return np.full(len(points), self.r)
+
+        if hasattr(self.radius_field, 'evaluate_point'):
+            radii = self.radius_field.evaluate_point(points[:, 0], points[:, 1], points[:, 2])
+        else:
+            radii = self.radius_field(points[:, 0], points[:, 1], points[:, 2])
+
+        return np.clip(np.broadcast_to(radii, (len(points),)), self.r, self.r_max)
+
+    def generate_points(self):
+
+        # The grid is padded by the neighbour reach so that offset lookups never leave the array
+        self.grid = np.full(self.dims + 2 * self.reach, -1, dtype=np.int32)
+
+        # Offsets are grouped nearest first (own cell, faces, edges, corners, outer shells) so that most
+        # rejections happen before the outer shells are looked at
+        flat_offsets = self.offsets @ np.array(self.grid.strides) // self.grid.itemsize
+        shell = np.where(np.abs(self.offsets).max(axis=1) <= 1, np.abs(self.offsets).sum(axis=1), 4)
+        self.flat_offsets = [flat_offsets[shell == n] for n in range(5) if np.any(shell == n)]
+
+        self.points = np.empty((1024, 3))
+        self.radii = np.empty(1024)
+        self.count = 0
+
+        active = self.seed_points()
+
+        while active.size > 0 and not self.is_full():
+
+            self.rng.shuffle(active)
+
+            batch = active[:self.batch_size // self.k + 1]
+            active = active[len(batch):]
+
+            parents = np.repeat(batch, self.k)
+
+            directions = self.rng.normal(size=(len(parents), 3))
+            directions /= np.linalg.norm(directions, axis=1)[:, None]
+
+            # Candidates just outside the exclusion sphere of their parent pack more tightly than
+            # Bridson's original r to 2r shell, so far fewer are needed per accepted point
+            candidates = self.points[parents] + directions * (self.radii[parents] * (1 + 1e-6))[:, None]
+
+            new, accepted_parents = self.insert(candidates, parents)
+
+            active = np.concatenate((active, np.intersect1d(batch, accepted_parents), new))
+
+        self.points = self.points[:self.count].copy()
+        self.radii = self.radii[:self.count].copy()
+        self.n_points = self.count
+
+        del self.grid, self.flat_offsets
+
+    def seed_points(self):
+
+        for _ in range(100):
+
+            candidates = self.lower + self.rng.random((64, 3)) * (self.upper - self.lower)
+
+            new, _ = self.insert(candidates, np.full(len(candidates), -1))
+
+            if new.size > 0:
+                return new
+
+        raise ValueError('No points found inside shape.')
+
+    def is_full(self):
+
+        return self.n_points is not None and self.count >= self.n_points
+
+    def cell_index(self, points):
+
+        index = np.floor((points - self.lower) / self.cell).astype(np.int64)
+
+        return np.ravel_multi_index((index + self.reach).T, self.grid.shape)
+
+    def insert(self, candidates, parents):
+        """Accepts the valid candidates, returning the new point indices and the parents that produced them."""
+
+        inside = np.all((candidates >= self.lower) & (candidates <= self.upper), axis=1)
+        candidates, parents = candidates[inside], parents[inside]
+
+        radii = self.local_radius(candidates)
+        index = self.cell_index(candidates)
+
+        keep = self.free(candidates, radii, index)
+        candidates, parents, radii, index = candidates[keep], parents[keep], radii[keep], index[keep]
+
+        if candidates.size > 0:
+            keep = self.shape.evaluate_point(candidates[:, 0], candidates[:, 1], candidates[:, 2]) <= 0
+            candidates, parents, radii, index = candidates[keep], parents[keep], radii[keep], index[keep]
+
+        # Two candidates in one cell are always closer than r, so keep one per cell
+        _, first = np.unique(index, return_index=True)
+        candidates, parents, radii, index = candidates[first], parents[first], radii[first], index[first]
+
+        selected = np.flatnonzero(self.independent(candidates, radii, index))
+
+        if self.n_points is not None:
+            selected = selected[:max(self.n_points - self.count, 0)]
+
+        new = self.add(candidates[selected], radii[selected], index[selected])
+
+        return new, parents[selected]
+
+    def neighbours(self, index, offsets, chunk_size=16384):
+        """Yields (rows, grid values) for every occupied or marked cell around each flat cell index."""
+
+        grid = self.grid.ravel()
+
+        for start in range(0, len(index), chunk_size):
+
+            values = grid.take(index[start:start + chunk_size, None] + offsets).ravel()
+
+            hits = np.flatnonzero(values != -1)
+
+            yield start + hits // len(offsets), values[hits]
+
+    def close(self, a, radii_a, b, radii_b):
+
+        delta = a - b
+
+        return np.einsum('ij,ij->i', delta, delta) < np.maximum(radii_a, radii_b) ** 2
+
+    def free(self, candidates, radii, index):
+        """Mask of candidates that are far enough from every accepted point."""
+
+        free = np.ones(len(candidates), dtype=bool)
+
+        for offsets in self.flat_offsets:
+
+            remaining = np.flatnonzero(free)
+
+            for rows, others in self.neighbours(index[remaining], offsets):
+
+                rows = remaining[rows]
+                conflicts = self.close(candidates[rows], radii[rows], self.points[others], self.radii[others])
+
+                free[rows[conflicts]] = False
+
+        return free
+
+    def independent(self, candidates, radii, index):
+        """Mask of a maximal set of mutually compatible candidates, equal to accepting them greedily in order."""
+
+        # Candidates are marked in the grid with codes below -1 so that their conflicts can be found in one pass
+        self.grid.ravel()[index] = -2 - np.arange(len(candidates))
+
+        first = []
+        second = []
+
+        for rows, others in self.neighbours(index, np.concatenate(self.flat_offsets[1:])):
+
+            marked = others < -1
+            rows, others = rows[marked], -2 - others[marked]
+
+            conflicts = (rows < others) & self.close(candidates[rows], radii[rows], candidates[others],
+                                                     radii[others])
+
+            first.append(rows[conflicts])
+            second.append(others[conflicts])
+
+        self.grid.ravel()[index] = -1
+
+        first = np.concatenate(first) if first else np.empty(0, dtype=np.int64)
+        second = np.concatenate(second) if second else np.empty(0, dtype=np.int64)
+
+        # 0: undecided, 1: accepted, -1: rejected. Candidates without an undecided conflict earlier in the
+        # order are accepted and their later conflicts rejected, until every candidate is decided.
+        state = np.zeros(len(candidates), dtype=np.int8)
+
+        while np.any(state == 0):
+
+            blocked = np.zeros(len(candidates), dtype=bool)
+            blocked[second[(state[first] == 0) & (state[second] == 0)]] = True
+
+            state[(state == 0) & ~blocked] = 1
+            state[second[(state[first] == 1) & (state[second] == 0)]] = -1
+
+        return state == 1
+
+    def add(self, points, radii, index):
+
+        start = self.count
+        self.count += len(points)
+
+        if self.count > len(self.points):
+            size = max(self.count, 2 * len(self.points))
+            self.points = np.resize(self.points, (size, 3))
+            self.radii = np.resize(self.radii, size)
+
+        self.points[start:self.count] = points
+        self.radii[start:self.count] = radii
+
+        new = np.arange(start, self.count)
+        self.grid.ravel()[index] = new
+
+        return new
+
+
 class PointsOnSphere(PointCloud):
 
     def __init__(self, n_points=50, sphere=None):
@@ -80,25 +328,131 @@ class PointsOnSphere(PointCloud):
         return PointCloud(self.n_points, shape=self.shape, points=points)
 
 
+class SurfacePoints(PointCloud):
+    """Points on the zero level set of any Geometry.
+
+    method='mesh' samples the marching cubes mesh of the shape with a probability proportional to triangle
+    area, so the points are uniform over the surface. method='gradient' projects random points in the
+    shape's bounding box onto the surface with Newton steps along finite difference gradients, which avoids
+    meshing but gives a less uniform distribution."""
+
+    def __init__(self, n_points=100, shape=None, method='mesh', level=0, seed=None, max_iterations=20):
+        super().__init__(n_points, shape)
+
+        if method not in ('mesh', 'gradient'):
+            raise ValueError(f'"{method}" is not a valid sampling method, use "mesh" or "gradient".')
+
+        self.method = method
+        self.level = level
+        self.max_iterations = max_iterations
+        self.rng = np.random.default_rng(seed)
+
+        self.generate_points()
+
+    def generate_points(self):
+
+        if self.method == 'mesh':
+            self.points = self.sample_mesh()
+
+        else:
+            self.points = self.project_points()
+
+    def sample_mesh(self):
+
+        if self.shape.vertices is None or self.shape.faces is None:
+            self.shape.find_surface(level=self.level)
+
+        # Marching cubes vertices are relative to the first sample of the design space
+        design_space = self.shape.design_space
+        origin = np.array([design_space.X[0], design_space.Y[0], design_space.Z[0]])
+
+        triangles = self.shape.vertices[self.shape.faces]
+        a = triangles[:, 0]
+        ab = triangles[:, 1] - a
+        ac = triangles[:, 2] - a
+
+        areas = np.linalg.norm(np.cross(ab, ac), axis=1)
+        faces = self.rng.choice(len(areas), size=self.n_points, p=areas / areas.sum())
+
+        # Reflecting (u, v) back into the triangle keeps the samples uniform over its area
+        u, v = self.rng.random((2, self.n_points))
+        outside = u + v > 1
+        u[outside], v[outside] = 1 - u[outside], 1 - v[outside]
+
+        return a[faces] + u[:, None] * ab[faces] + v[:, None] * ac[faces] + origin
+
+    def project_points(self):
+
+        lower = np.array([min(self.shape.x_limits), min(self.shape.y_limits), min(self.shape.z_limits)])
+        scale = np.array([self.xScale, self.yScale, self.zScale])
+
+        design_space = self.shape.design_space
+        h = min(design_space.x_step, design_space.y_step, design_space.z_step)
+        tolerance = 1e-3 * h
+
+        found = []
+        n_found = 0
+
+        for _ in range(100):
+
+            if n_found >= self.n_points:
+                break
+
+            points = lower + self.rng.random((2 * (self.n_points - n_found), 3)) * scale
+            converged = np.zeros(len(points), dtype=bool)
+
+            for _ in range(self.max_iterations):
+
+                value, gradient = self.evaluate_gradient(points, h)
+                length = np.einsum('ij,ij->i', gradient, gradient)
+
+                step = np.divide((value - self.level)[:, None] * gradient, length[:, None],
+                                 out=np.zeros_like(gradient), where=length[:, None] > 0)
+                points -= step
+
+                converged = np.linalg.norm(step, axis=1) < tolerance
+
+                if converged.all():
+                    break
+
+            inside = np.all((points >= lower) & (points <= lower + scale), axis=1)
+            points = points[converged & inside]
+
+            found.append(points)
+            n_found += len(points)
+
+        if n_found == 0:
+            raise ValueError(f'No points found on the surface at level {self.level}.')
+
+        return np.concatenate(found)[:self.n_points]
+
+    def evaluate_gradient(self, points, h):
+        """Field value and central difference gradient at each point, from one batched evaluation."""
+
+        stencil = np.concatenate((np.zeros((1, 3)), np.eye(3) * h, -np.eye(3) * h))
+        samples = (points[None, :, :] + stencil[:, None, :]).reshape(-1, 3)
+
+        values = np.asarray(self.shape.evaluate_point(samples[:, 0], samples[:, 1], samples[:, 2]))
+        values = values.reshape(len(stencil), len(points))
+
+        return values[0], ((values[1:4] - values[4:7]) / (2 * h)).T
+
+
 def fibonacci_sphere(samples=20, sphere=None):
     'https://stackoverflow.com/questions/57123194/how-to-distribute-points-evenly-on-the-surface-of-hyperspheres-in-higher-dimensi'
-    cen_x = sphere.x
-    cen_y = sphere.y
-    cen_z = sphere.z
-    rad = sphere.r
 
-    points = []
     phi = math.pi * (3. - math.sqrt(5.))  # golden angle in radians
 
-    for i in range(samples):
-        y = ((1 - (i / float(samples - 1)) * 2) + cen_y)  # y goes from 1 to -1
-        radius = math.sqrt(1 - y * y) * rad # radius at y
+    i = np.arange(samples)
 
-        theta = phi * i  # golden angle increment
+    y = 1 - 2 * i / max(samples - 1, 1)  # y goes from 1 to -1 on the unit sphere
+    radius = np.sqrt(1 - y * y)  # radius at y
 
-        x = math.cos(theta) * radius + cen_x
-        z = math.sin(theta) * radius + cen_z
+    theta = phi * i  # golden angle increment
 
-        points.append((x, y*rad, z))
+    points = np.empty((samples, 3))
+    points[:, 0] = np.cos(theta) * radius
+    points[:, 1] = y
+    points[:, 2] = np.sin(theta) * radius
 
-    return np.array(points)
+    return points * sphere.r + np.array([sphere.x, sphere.y, sphere.z])
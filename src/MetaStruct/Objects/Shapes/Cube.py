@@ -1,5 +1,5 @@
-import numexpr as ne
-
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Shapes.Cuboid import Cuboid
 
 
@@ -10,18 +10,10 @@ class Cube(Cuboid):
 
         self.dim = dim
         self.round_r = round_r
-        ne.set_num_threads(ne.ncores)
-
     def __str__(self):
         return super().__str__() + f'\nCube Radius: {self.dim}'
 
-    def ne_max(self, a, b):
-        return ne.evaluate('where(a>b, a, b)')
-
-    def ne_min(self, a, b):
-        return ne.evaluate('where(a<b, a, b)')
-
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
         x0 = self.x
         y0 = self.y
         z0 = self.z
@@ -31,18 +23,40 @@ class Cube(Cuboid):
 
         scale = dim / (dim + round_r)
 
-        x_abs = ne.evaluate('abs((x-x0)/scale)-dim', casting='same_kind')
-        y_abs = ne.re_evaluate({'x': y, 'x0': y0, 'scale': scale, 'dim': dim})
-        z_abs = ne.re_evaluate({'x': z, 'x0': z0, 'scale': scale, 'dim': dim})
+        # Written out in full so numexpr evaluates it in one pass with no temporaries
+        x_abs = '(abs((x-x0)/scale)-dim)'
+        y_abs = '(abs((y-y0)/scale)-dim)'
+        z_abs = '(abs((z-z0)/scale)-dim)'
+
+        mag = f'sqrt({ne_max(x_abs, 0.0)}**2 + {ne_max(y_abs, 0.0)}**2 + {ne_max(z_abs, 0.0)}**2)'
+
+        minmax = ne_min(ne_max(x_abs, ne_max(y_abs, z_abs)), 0.0)
+
+        return evaluate(f'({mag} + {minmax} - round_r)*scale', out=out, node=self)
+
+    def evaluate_interval(self, x, y, z):
+
+        scale = self.dim / (self.dim + self.round_r)
+
+        x_abs, y_abs, z_abs = (Interval.offset(Interval.absolute(Interval.scale(Interval.offset(v, -v0), 1 / scale)), -self.dim)
+                               for v, v0 in ((x, self.x), (y, self.y), (z, self.z)))
+
+        zero = Interval.point(0.0)
+
+        mag = Interval.sqrt(Interval.add(Interval.add(Interval.square(Interval.maximum(x_abs, zero)),
+                                                      Interval.square(Interval.maximum(y_abs, zero))),
+                                         Interval.square(Interval.maximum(z_abs, zero))))
+
+        minmax = Interval.minimum(Interval.maximum(x_abs, Interval.maximum(y_abs, z_abs)), zero)
+
+        return Interval.scale(Interval.offset(Interval.add(mag, minmax), -self.round_r), scale)
+
+
+def ne_max(a, b):
 
-        x_max = ne.evaluate('where(x_abs>0.0, x_abs, 0.0)')
-        y_max = ne.re_evaluate(local_dict={'x_abs': y_abs})
-        z_max = ne.re_evaluate(local_dict={'x_abs': z_abs})
+    return f'where({a}>{b}, {a}, {b})'
 
-        mag = ne.evaluate(
-            'sqrt(((where(x_abs>0.0, x_abs, 0.0))**2+((where(y_abs>0.0, y_abs, 0.0))**2+((where(z_abs>0.0, z_abs, 0.0))**2))))')
 
-        minmax = self.ne_min(self.ne_max(
-            x_abs, self.ne_max(y_abs, z_abs)), 0.0)
+def ne_min(a, b):
 
-        return ne.evaluate('(mag + minmax - round_r)*scale')
+    return f'where({a}<{b}, {a}, {b})'
@@ -1,6 +1,7 @@
-import numexpr as ne
 import numpy as np
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Shapes.Shape import Shape
 
 
@@ -13,6 +14,10 @@ class Cuboid(Shape):
         self.yd = yd
         self.zd = zd
 
+        self.set_limits()
+
+    def set_limits(self):
+
         self.x_limits = np.array(
             [self.x - self.xd, self.x + self.xd])
         self.y_limits = np.array(
@@ -28,7 +33,7 @@ class Cuboid(Shape):
 
         return super().__str__() + f'\nDimensions(x, y, z): ({self.xd}, {self.yd}, {self.zd})'
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
 
         x0 = self.x
         y0 = self.y
@@ -37,10 +42,18 @@ class Cuboid(Shape):
         yd = self.yd
         zd = self.zd
 
-        arr1 = ne.evaluate('(x-x0)**2 - xd**2')
-        arr2 = ne.evaluate('(y-y0)**2 - yd**2')
-        arr3 = ne.evaluate('(z-z0)**2 - zd**2')
+        # One pass with no temporaries: max(max(arr1, arr2), arr3)
+        arr1 = '((x-x0)**2 - xd**2)'
+        arr2 = '((y-y0)**2 - yd**2)'
+        arr3 = '((z-z0)**2 - zd**2)'
+
+        max1 = f'where({arr1}>{arr2}, {arr1}, {arr2})'
+
+        return evaluate(f'where({max1}>{arr3}, {max1}, {arr3})', out=out, node=self)
+
+    def evaluate_interval(self, x, y, z):
 
-        max1 = ne.evaluate('where(arr1>arr2, arr1, arr2)')
+        x_term, y_term, z_term = (Interval.offset(Interval.square(Interval.offset(v, -v0)), -d ** 2)
+                                  for v, v0, d in ((x, self.x, self.xd), (y, self.y, self.yd), (z, self.z, self.zd)))
 
-        return ne.evaluate('where(max1>arr3, max1, arr3)')
+        return Interval.maximum(Interval.maximum(x_term, y_term), z_term)
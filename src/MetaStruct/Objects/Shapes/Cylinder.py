@@ -1,6 +1,7 @@
-import numexpr as ne
 import numpy as np
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Shapes.Shape import Shape
 
 
@@ -14,6 +15,10 @@ class Cylinder(Shape):
         self.l = l
         self.ax = ax
 
+        self.set_limits()
+
+    def set_limits(self):
+
         if self.ax == 'z':
             self.x_limits = np.array(
                 [self.x - self.r1, self.x + self.r1])
@@ -57,7 +62,7 @@ class Cylinder(Shape):
         if self.ax == 'y':
             return string + f'\nRadii(x, z): ({self.r1}, {self.r2})'
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
 
         x0 = self.x
         y0 = self.y
@@ -74,7 +79,21 @@ class Cylinder(Shape):
                    'x': '(x-x0)**2 - l**2',
                    'y': '(y-y0)**2 - l**2'}
 
-        array1 = ne.evaluate(circles[self.ax])
-        array2 = ne.evaluate(lengths[self.ax])
+        array1 = '(' + circles[self.ax] + ')'
+        array2 = '(' + lengths[self.ax] + ')'
+
+        return evaluate(f'where({array1} > {array2}, {array1}, {array2})', out=out, node=self)
+
+    def evaluate_interval(self, x, y, z):
+
+        u, v, w = {'z': ((x, self.x), (y, self.y), (z, self.z)),
+                   'x': ((y, self.y), (z, self.z), (x, self.x)),
+                   'y': ((x, self.x), (z, self.z), (y, self.y))}[self.ax]
+
+        u_term = Interval.scale(Interval.square(Interval.offset(u[0], -u[1])), 1 / self.r1 ** 2)
+        v_term = Interval.scale(Interval.square(Interval.offset(v[0], -v[1])), 1 / self.r2 ** 2)
+
+        circle = Interval.offset(Interval.add(u_term, v_term), -1)
+        length = Interval.offset(Interval.square(Interval.offset(w[0], -w[1])), -self.l ** 2)
 
-        return ne.evaluate('where(array1 > array2, array1, array2)')
+        return Interval.maximum(circle, length)
@@ -11,6 +11,7 @@ class HollowCube(Shape):
 
         self.dim = parameter_check(dim)
         self.t = parameter_check(t)
+        self.shell_parameters = self.shell_shape = None
         self.set_limits()
 
     def set_limits(self):
@@ -30,9 +31,22 @@ class HollowCube(Shape):
 
         return super().__str__() + f'\nCube Radius: {self.dim}\nWall Thickness: {self.t}'
 
-    def evaluate_point(self, x, y, z):
+    def shell(self):
+        """The wall as a Difference of two cubes, rebuilt only when the parameters change."""
 
-        box = Cube(self.design_space, self.x, self.y, self.z, self.dim) - \
-              Cube(self.design_space, self.x, self.y, self.z, self.dim - self.t)
+        parameters = (self.x, self.y, self.z, self.dim, self.t)
 
-        return box.evaluate_point(x, y, z)
+        if self.shell_parameters != parameters:
+            self.shell_parameters = parameters
+            self.shell_shape = Cube(self.design_space, self.x, self.y, self.z, self.dim) - \
+                Cube(self.design_space, self.x, self.y, self.z, self.dim - self.t)
+
+        return self.shell_shape
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        return self.shell().evaluate_point(x, y, z, out=out)
+
+    def evaluate_interval(self, x, y, z):
+
+        return self.shell().evaluate_interval(x, y, z)
@@ -14,6 +14,7 @@ class HollowSphere(Shape):
 
         self.r = r
         self.t = t
+        self.shell_parameters = self.shell_shape = None
         self.set_limits()
 
     def set_limits(self):
@@ -33,10 +34,22 @@ class HollowSphere(Shape):
 
         return super().__str__() + f'\nRadius: {self.r}\nWall Thickness: {self.t}'
 
-    def evaluate_point(self, x, y, z):
+    def shell(self):
+        """The wall as a Difference of two spheres, rebuilt only when the parameters change."""
 
-        ball = Sphere(self.designSpace, self.x, self.y, self.z, self.r) - \
-            Sphere(self.designSpace, self.x, self.y, self.z, self.r -
-                   self.t)
+        parameters = (self.x, self.y, self.z, self.r, self.t)
 
-        return ball.evaluate_point(x, y, z)
+        if self.shell_parameters != parameters:
+            self.shell_parameters = parameters
+            self.shell_shape = Sphere(self.designSpace, self.x, self.y, self.z, self.r) - \
+                Sphere(self.designSpace, self.x, self.y, self.z, self.r - self.t)
+
+        return self.shell_shape
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        return self.shell().evaluate_point(x, y, z, out=out)
+
+    def evaluate_interval(self, x, y, z):
+
+        return self.shell().evaluate_interval(x, y, z)
@@ -0,0 +1,160 @@
+import ast
+
+import numexpr as ne
+import numpy as np
+from numexpr import necompiler
+
+from MetaStruct.Functions.Backends import compute_context, evaluate
+from MetaStruct.Objects.BufferArena import point_shape
+from MetaStruct.Objects.Misc.Field import evaluate_field
+from MetaStruct.Objects.Shapes.Shape import Shape
+
+# Names bound to the position of the node in the compiled expression
+POSITION = {'x': 'x0', 'y': 'y0', 'z': 'z0'}
+
+# Compiled programs, (expression, input types) -> (NumExpr, input names, uses VML), shared by every node
+PROGRAMS = {}
+
+
+class ImplicitFunction(Shape):
+    """Shape defined by a numexpr expression in x, y, z and named parameters, eg.
+    ImplicitFunction(ds, 'sin(k*x)*cos(k*y) + sin(k*y)*cos(k*z) + sin(k*z)*cos(k*x) - t', {'k': 6.28, 't': 0.2}).
+
+    The expression is checked once when the node is created and compiled with numexpr.NumExpr once per input
+    types, so evaluating it has no parsing or compiling overhead. x, y and z are relative to the position
+    (x, y, z) of the node, so translate moves the surface. Parameters may be numbers or fields (see
+    Objects/Misc/Field.py). limits, ((x_lo, x_hi), (y_lo, y_hi), (z_lo, z_hi)) about the position, bound the
+    shape if given, and it is bounded by the design space otherwise."""
+
+    # Samples per side of the tiles the grid is evaluated in
+    TILE_SIZE = 64
+
+    def __init__(self, design_space, expression, params=None, x=0, y=0, z=0, limits=None):
+        super().__init__(design_space, x, y, z)
+
+        self.expression = expression
+        self.params = dict(params or {})
+        self.extent = None if limits is None else np.array(limits, dtype=float)
+
+        self.compiled = compile_expression(expression, self.params)
+
+        self.set_limits()
+
+        # Compiled here so invalid functions or types fail now rather than at the first evaluation
+        self.evaluate_point(*[np.zeros(1, dtype=design_space.DATA_TYPE)] * 3)
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({self.expression!r}, {self.params}, {self.x}, {self.y}, {self.z})'
+
+    def __str__(self):
+
+        return super().__str__() + f'\nExpression: {self.expression}\nParameters: {self.params}'
+
+    def set_limits(self):
+
+        if self.extent is None:
+            ds = self.design_space
+
+            self.x_limits = np.array([ds.x_lower, ds.x_upper])
+            self.y_limits = np.array([ds.y_lower, ds.y_upper])
+            self.z_limits = np.array([ds.z_lower, ds.z_upper])
+
+            return
+
+        self.x_limits, self.y_limits, self.z_limits = self.extent + np.array([[self.x], [self.y], [self.z]])
+
+    def update(self, **parameters):
+        """Sets parameters of the expression (eg. t=0.3) or of the node (eg. x=0.5) and marks the change."""
+
+        self.params.update({name: parameters.pop(name) for name in list(parameters) if name in self.params})
+
+        super().update(**parameters)
+
+    def arguments(self, x, y, z):
+
+        arguments = {'x': x, 'y': y, 'z': z, 'x0': self.x, 'y0': self.y, 'z0': self.z,
+                     **{name: evaluate_field(value, x, y, z) for name, value in self.params.items()}}
+
+        return {name: np.asarray(value) for name, value in arguments.items()}
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        arguments = self.arguments(x, y, z)
+
+        backend = compute_context.backend
+
+        if backend == 'auto':
+            backend, threads = compute_context.resolve(self, int(np.prod(point_shape(x, y, z))))
+            compute_context.set_threads(threads)
+
+        if backend != 'numexpr':
+            return evaluate(self.compiled, arguments, out, self)
+
+        program, names, uses_vml = compiled_program(self.compiled, arguments)
+
+        return program(*[arguments[name] for name in names], out=out, casting='same_kind', ex_uses_vml=uses_vml)
+
+    def compute_grid(self, verbose=True, tile_size=None):
+        """Evaluates the grid tile by tile, straight into the grid, so fields and temporaries stay tile sized."""
+
+        if tile_size is not None:
+            return super().compute_grid(verbose, tile_size)
+
+        if verbose is True:
+            print(f'Evaluating grid points for {self.name}...')
+
+        grid = np.empty(self.x_grid.shape, dtype=self.design_space.DATA_TYPE)
+
+        for tile in self.design_space.tiles(self.TILE_SIZE):
+            self.evaluate_point(self.x_grid[tile], self.y_grid[tile], self.z_grid[tile], out=grid[tile])
+
+        return grid
+
+
+class Relative(ast.NodeTransformer):
+
+    def visit_Name(self, node):
+
+        if node.id not in POSITION:
+            return node
+
+        return ast.BinOp(left=ast.Name(id=node.id, ctx=ast.Load()), op=ast.Sub(),
+                         right=ast.Name(id=POSITION[node.id], ctx=ast.Load()))
+
+
+def compile_expression(expression, params):
+    """Checks the expression and its names, and returns it with x, y and z relative to the node position."""
+
+    reserved = (set(POSITION) | set(POSITION.values())) & set(params)
+
+    if reserved:
+        raise ValueError(f'Parameter names {sorted(reserved)} are reserved for the coordinates and position.')
+
+    try:
+        names, _ = necompiler.getExprNames(expression, {})
+
+    except (SyntaxError, TypeError, ValueError) as error:
+        raise ValueError(f'Invalid expression "{expression}": {error}') from None
+
+    unknown = set(names) - set(POSITION) - set(params)
+
+    if unknown:
+        raise ValueError(f'Expression "{expression}" uses undefined names {sorted(unknown)}.')
+
+    return ast.unparse(Relative().visit(ast.parse(expression, mode='eval')))
+
+
+def compiled_program(expression, arguments):
+    """NumExpr program for the expression with the types of arguments, compiled on first use."""
+
+    key = (expression, tuple((name, value.dtype.char) for name, value in arguments.items()))
+
+    if key not in PROGRAMS:
+        names, uses_vml = necompiler.getExprNames(expression, {})
+
+        signature = [(name, necompiler.getType(arguments[name])) for name in names]
+
+        PROGRAMS[key] = ne.NumExpr(expression, signature=signature), names, uses_vml
+
+    return PROGRAMS[key]
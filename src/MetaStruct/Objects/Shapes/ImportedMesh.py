@@ -2,6 +2,7 @@ import igl
 import numpy as np
 from scipy.interpolate import RegularGridInterpolator
 
+from MetaStruct.Objects.BufferArena import store
 from MetaStruct.Objects.Shapes.Shape import Shape
 
 
@@ -35,17 +36,20 @@ class ImportedMesh(Shape):
         S, _, _ = igl.signed_distance(
             self.design_space.coordinate_list, vertices, faces)
 
-        self.evaluated_grid = S.reshape(
+        # Kept apart from evaluated_grid, which is a result rather than a parameter of the shape
+        self.distances = S.reshape(
             self.design_space.resolution, self.design_space.resolution, self.design_space.resolution)
 
-    def evaluate_point(self, x, y, z):
+        self.evaluated_grid = self.distances
+
+    def evaluate_point(self, x, y, z, out=None):
 
         interp = RegularGridInterpolator((self.design_space.X, self.design_space.Y, self.design_space.Z),
-                                         self.evaluated_grid)
+                                         self.distances)
         pts = np.empty(([len(x), 3]))
         pts[:, 0] = x
         pts[:, 1] = y
         pts[:, 2] = z
 
-        return interp(pts)
+        return store(interp(pts), out)
 
@@ -1,14 +1,14 @@
-import numexpr as ne
 import numpy as np
-from numpy.linalg import norm
 
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Misc.Vector import Vector
 from MetaStruct.Objects.Shapes.Shape import Shape
 
 
 def clamp(num, a, b):
+    """Expression for num clamped to [a, b]."""
 
-    return ne.evaluate('where(where(num<b, num, b)>a, where(num<b, num, b), a)')
+    return f'where(where({num}<{b}, {num}, {b})>{a}, where({num}<{b}, {num}, {b}), {a})'
 
 
 class Line(Shape):
@@ -29,22 +29,22 @@ class Line(Shape):
         self.y_limits = np.array(([min(p1[1], p2[1]) - r, max(p1[1], p2[1]) + r]), dtype=self.design_space.DATA_TYPE)
         self.z_limits = np.array(([min(p1[2], p2[2]) - r, max(p1[2], p2[2]) + r]), dtype=self.design_space.DATA_TYPE)
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
+
+        ax = self.p1.x
+        ay = self.p1.y
+        az = self.p1.z
 
-        pa = Vector([x, y, z]) - self.p1
         ba = self.p2 - self.p1
 
         bax = ba.x
         bay = ba.y
         baz = ba.z
 
-        paba = pa*ba
         baba = ba*ba
+        r = self.r
 
-        h = clamp(ne.evaluate('(paba)/(baba)'), 0.0, 1.0)
-
-        baxh = ne.evaluate('ba*h', local_dict={'ba': bax, 'h': h})
-        bayh = ne.re_evaluate({'ba': bay, 'h': h})
-        bazh = ne.re_evaluate({'ba': baz, 'h': h})
+        # Position of the nearest point along the line, inlined so the distance is one pass with no temporaries
+        h = clamp('((x-ax)*bax + (y-ay)*bay + (z-az)*baz)/baba', 0.0, 1.0)
 
-        return norm(pa-Vector([baxh, bayh, bazh])) - self.r
+        return evaluate(f'sqrt((x-ax-bax*{h})**2 + (y-ay-bay*{h})**2 + (z-az-baz*{h})**2) - r', out=out, node=self)
@@ -1,20 +1,27 @@
-import numexpr as ne
-
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Shapes.Spheroid import Spheroid
 
 
 class Sphere(Spheroid):
 
     def __init__(self, design_space, x=0, y=0, z=0, r=1):
+        self.r = r
+
         super().__init__(design_space, x, y, z, xr=r, yr=r, zr=r)
 
-        self.r = r
+    def set_limits(self):
+
+        # The radii follow r, so the limits stay right after r is updated
+        self.xr = self.yr = self.zr = self.r
+
+        super().set_limits()
 
     def __repr__(self):
 
         return f'Sphere({self.x}, {self.y}, {self.z}, {self.r})'
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
 
         x0 = self.x
         y0 = self.y
@@ -22,4 +29,12 @@ class Sphere(Spheroid):
 
         r = self.r
 
-        return ne.evaluate('sqrt((x-x0)**2 + (y-y0)**2 + (z-z0)**2) -r')
+        return evaluate('sqrt((x-x0)**2 + (y-y0)**2 + (z-z0)**2) -r', out=out, node=self)
+
+    def evaluate_interval(self, x, y, z):
+
+        squares = Interval.add(Interval.add(Interval.square(Interval.offset(x, -self.x)),
+                                            Interval.square(Interval.offset(y, -self.y))),
+                               Interval.square(Interval.offset(z, -self.z)))
+
+        return Interval.offset(Interval.sqrt(squares), -self.r)
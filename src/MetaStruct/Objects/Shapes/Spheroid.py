@@ -1,6 +1,7 @@
-import numexpr as ne
 import numpy as np
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Shapes.Shape import Shape
 
 
@@ -13,6 +14,10 @@ class Spheroid(Shape):
         self.yr = yr
         self.zr = zr
 
+        self.set_limits()
+
+    def set_limits(self):
+
         self.x_limits = np.array(
             [self.x - self.xr, self.x + self.xr])
         self.y_limits = np.array(
@@ -28,15 +33,22 @@ class Spheroid(Shape):
 
         return super().__str__() + f'\nRadii(xr, yr, zr): ({self.xr}, {self.yr}, {self.zr})'
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
 
         x0 = self.x
         y0 = self.y
-        z0 = self.y
+        z0 = self.z
         xr = self.xr
         yr = self.yr
         zr = self.zr
 
         expr = '((x-x0)**2)/(xr**2) + ((y-y0)**2)/(yr**2) + ((z-z0)**2)/(zr**2) - 1'
 
-        return ne.evaluate(expr)
+        return evaluate(expr, out=out, node=self)
+
+    def evaluate_interval(self, x, y, z):
+
+        terms = [Interval.scale(Interval.square(Interval.offset(v, -v0)), 1 / r ** 2)
+                 for v, v0, r in ((x, self.x, self.xr), (y, self.y, self.yr), (z, self.z, self.zr))]
+
+        return Interval.offset(Interval.add(Interval.add(terms[0], terms[1]), terms[2]), -1)
@@ -1,6 +1,7 @@
-import numexpr as ne
 import numpy as np
 
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
 from MetaStruct.Objects.Shapes.Shape import Shape
 
 
@@ -26,7 +27,7 @@ class Torus(Shape):
         self.z_limits = np.array(
             [self.z - self.r2, self.z + self.r2])
 
-    def evaluate_point(self, x, y, z):
+    def evaluate_point(self, x, y, z, out=None):
 
         x0 = self.x
         y0 = self.y
@@ -36,4 +37,12 @@ class Torus(Shape):
 
         expr = '(sqrt((x-x0)**2 + (y-y0)**2) - r1)**2 + (z-z0)**2 - r2**2'
 
-        return ne.evaluate(expr)
+        return evaluate(expr, out=out, node=self)
+
+    def evaluate_interval(self, x, y, z):
+
+        ring = Interval.offset(Interval.sqrt(Interval.add(Interval.square(Interval.offset(x, -self.x)),
+                                                          Interval.square(Interval.offset(y, -self.y)))), -self.r1)
+
+        return Interval.offset(Interval.add(Interval.square(ring), Interval.square(Interval.offset(z, -self.z))),
+                               -self.r2 ** 2)
@@ -0,0 +1,310 @@
+import itertools
+
+import numpy as np
+from scipy import ndimage
+from skimage import measure
+
+from MetaStruct.Functions.Backends import evaluate
+from MetaStruct.Functions.MeshWelding import pack, quantise, weld
+
+# Points evaluated per evaluate_point call when filling leaf blocks
+SPARSE_CHUNK = 2 ** 20
+
+
+class SparseGrid:
+    """Block-sparse field on a design space grid.
+
+    The grid is divided into cubic blocks of block_size samples. Blocks that may contain the surface at level
+    are leaves holding dense values; every other block is a tile holding only whether it is inside or outside,
+    read as the constant inside or outside value. A block is only tiled if it is on one side of level including
+    a one sample halo, so no grid edge between a tile and its neighbours crosses the surface and marching cubes
+    over the leaves gives the same surface as over the dense grid. Memory scales with the surface area."""
+
+    OUTSIDE = 0
+    INSIDE = 1
+    LEAF = 2
+
+    def __init__(self, shape, block_size=16, level=0, inside=-1., outside=1., dtype=np.float32):
+
+        self.shape = tuple(int(n) for n in shape)
+        self.block_size = block_size
+        self.level = level
+        self.inside = inside
+        self.outside = outside
+        self.dtype = dtype
+
+        # Sample axes when they differ from the design space's (eg. refined), None for the design space's
+        self.axes = None
+
+        self.counts = tuple(-(-n // block_size) for n in self.shape)
+        self.states = np.full(self.counts, SparseGrid.OUTSIDE, dtype=np.int8)
+        self.leaves = {}
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({self.shape}, {self.block_size}, {len(self.leaves)} leaves)'
+
+    @property
+    def nbytes(self):
+
+        return self.states.nbytes + sum(leaf.nbytes for leaf in self.leaves.values())
+
+    def block_slices(self, key):
+
+        b = self.block_size
+
+        return tuple(slice(k * b, min((k + 1) * b, n)) for k, n in zip(key, self.shape))
+
+    def block_shape(self, key):
+
+        return tuple(s.stop - s.start for s in self.block_slices(key))
+
+    def block(self, key):
+        """Values of a block, filled with the tile value if it is not a leaf."""
+
+        if key in self.leaves:
+            return self.leaves[key]
+
+        value = self.inside if self.states[key] == SparseGrid.INSIDE else self.outside
+
+        return np.full(self.block_shape(key), value, dtype=self.dtype)
+
+    def set_leaf(self, key, values):
+
+        self.leaves[key] = np.asarray(values, dtype=self.dtype)
+        self.states[key] = SparseGrid.LEAF
+
+    def set_tile(self, key, inside):
+
+        self.leaves.pop(key, None)
+        self.states[key] = SparseGrid.INSIDE if inside else SparseGrid.OUTSIDE
+
+    def region(self, start, stop):
+        """Dense values of samples start to stop (exclusive) per axis, clipped to the grid, read from the
+        blocks they overlap."""
+
+        start = np.maximum(start, 0)
+        stop = np.minimum(stop, self.shape)
+
+        out = np.empty(tuple(stop - start), dtype=self.dtype)
+
+        b = self.block_size
+        ranges = [range(start[i] // b, (stop[i] - 1) // b + 1) for i in range(3)]
+
+        for key in itertools.product(*ranges):
+            slices = self.block_slices(key)
+
+            source = tuple(slice(max(s.start, a), min(s.stop, c)) for s, a, c in zip(slices, start, stop))
+            target = tuple(slice(s.start - a, s.stop - a) for s, a in zip(source, start))
+            local = tuple(slice(s.start - t.start, s.stop - t.start) for s, t in zip(source, slices))
+
+            out[target] = self.block(key)[local]
+
+        return out
+
+    def to_dense(self):
+
+        grid = np.empty(self.shape, dtype=self.dtype)
+
+        for key in np.ndindex(self.counts):
+            grid[self.block_slices(key)] = self.block(key)
+
+        return grid
+
+    @classmethod
+    def from_dense(cls, grid, block_size=16, level=0):
+
+        sparse = cls(grid.shape, block_size, level, dtype=grid.dtype)
+
+        # Minimum and maximum over each sample's neighbourhood, so blocks are only tiled with their halo
+        lo = ndimage.minimum_filter(grid, size=3, mode='nearest')
+        hi = ndimage.maximum_filter(grid, size=3, mode='nearest')
+
+        for key in np.ndindex(sparse.counts):
+            slices = sparse.block_slices(key)
+
+            if lo[slices].min() > level:
+                sparse.set_tile(key, False)
+
+            elif hi[slices].max() < level:
+                sparse.set_tile(key, True)
+
+            else:
+                sparse.set_leaf(key, grid[slices])
+
+        return sparse
+
+    @classmethod
+    def from_shape(cls, shape, block_size=16, level=0, verbose=True):
+        """Evaluates shape block by block. Blocks are classified with shape.evaluate_interval over their box
+        grown by one sample, and only the blocks that may contain the surface are evaluated."""
+
+        ds = shape.design_space
+        axes = (ds.X, ds.Y, ds.Z)
+
+        sparse = cls((len(ds.X), len(ds.Y), len(ds.Z)), block_size, level, dtype=ds.DATA_TYPE)
+
+        boxes = []
+
+        for axis, count in zip(axes, sparse.counts):
+            starts = np.arange(count) * block_size
+            stops = np.minimum(starts + block_size, len(axis))
+
+            boxes.append((axis[np.maximum(starts - 1, 0)], axis[np.minimum(stops, len(axis) - 1)]))
+
+        lower = np.meshgrid(*[box[0] for box in boxes], indexing='ij')
+        upper = np.meshgrid(*[box[1] for box in boxes], indexing='ij')
+
+        lo, hi = (np.broadcast_to(bound, sparse.counts) for bound in shape.evaluate_interval(*zip(lower, upper)))
+
+        sparse.states[lo > level] = SparseGrid.OUTSIDE
+        sparse.states[hi < level] = SparseGrid.INSIDE
+
+        keys = [tuple(key) for key in np.argwhere(~((lo > level) | (hi < level)))]
+
+        if verbose is True:
+            print(f'Evaluating {shape.name} in {len(keys)} of {lo.size} blocks...')
+
+        sparse.evaluate_blocks(shape, keys)
+
+        return sparse
+
+    def tiles_under(self, other):
+        """Keys of the blocks that are tiles here and leaves in other."""
+
+        return [tuple(key) for key in np.argwhere((self.states != SparseGrid.LEAF) & (other.states == SparseGrid.LEAF))]
+
+    def evaluate_blocks(self, shape, keys, axes=None):
+        """Evaluates shape at the samples of the blocks and stores them as leaves, batching the blocks into
+        evaluate_point calls of about SPARSE_CHUNK points. axes are the sample axes, the design space's if None."""
+
+        if axes is None:
+            ds = shape.design_space
+            axes = (ds.X, ds.Y, ds.Z)
+
+        batch, size = [], 0
+
+        for n, key in enumerate(keys):
+            batch.append(key)
+            size += int(np.prod(self.block_shape(key)))
+
+            if size >= SPARSE_CHUNK or n == len(keys) - 1:
+                self.evaluate_batch(shape, batch, axes)
+                batch, size = [], 0
+
+    def evaluate_batch(self, shape, keys, axes):
+
+        coordinates = [[], [], []]
+
+        for key in keys:
+            grids = np.meshgrid(*[axis[s] for axis, s in zip(axes, self.block_slices(key))],
+                                indexing='ij')
+
+            for c, g in zip(coordinates, grids):
+                c.append(g.reshape(-1))
+
+        values = np.asarray(shape.evaluate_point(*[np.concatenate(c) for c in coordinates]))
+
+        start = 0
+
+        for key in keys:
+            block_shape = self.block_shape(key)
+            stop = start + int(np.prod(block_shape))
+
+            self.set_leaf(key, values[start:stop].reshape(block_shape))
+
+            start = stop
+
+    def combine(self, other, expression, blend=None, node=None):
+        """Applies a Boolean expression in g1 (self) and g2 (other) block by block. Blocks that are tiles in
+        both grids stay tiles, and only leaves are computed densely. Tiles are combined by their inside and
+        outside values, so the expression must be local (min/max like, see Geometry.local): its sign may only
+        depend on the signs of g1 and g2."""
+
+        if self.shape != other.shape or self.block_size != other.block_size or self.level != other.level:
+            raise ValueError('Sparse grids must have the same shape, block size and level to be combined.')
+
+        result = SparseGrid(self.shape, self.block_size, self.level, self.inside, self.outside, self.dtype)
+
+        # Tile against tile, evaluated once per combination of states with the tile values
+        for s1, s2 in itertools.product((SparseGrid.INSIDE, SparseGrid.OUTSIDE), repeat=2):
+            value = evaluate(expression, {'g1': self.inside if s1 == SparseGrid.INSIDE else self.outside,
+                                          'g2': other.inside if s2 == SparseGrid.INSIDE else other.outside,
+                                          'b': blend}, node=node)
+
+            result.states[(self.states == s1) & (other.states == s2)] = \
+                SparseGrid.INSIDE if value < self.level else SparseGrid.OUTSIDE
+
+        for key in map(tuple, np.argwhere((self.states == SparseGrid.LEAF) | (other.states == SparseGrid.LEAF))):
+            result.set_leaf(key, evaluate(expression, {'g1': self.block(key), 'g2': other.block(key), 'b': blend},
+                                          node=node))
+
+        result.prune()
+
+        return result
+
+    def prune(self):
+        """Turns leaves that are on one side of level, including their one sample halo, into tiles."""
+
+        b = self.block_size
+
+        for key in list(self.leaves):
+            leaf = self.leaves[key]
+
+            if leaf.min() > self.level or leaf.max() < self.level:
+
+                start = np.array(key) * b
+                halo = self.region(start - 1, start + np.array(leaf.shape) + 1)
+
+                if halo.min() > self.level:
+                    self.set_tile(key, False)
+
+                elif halo.max() < self.level:
+                    self.set_tile(key, True)
+
+    def marching_cubes(self, level=0, spacing=(1., 1., 1.)):
+        """Marching cubes over the leaves, each with one extra sample on its upper sides, welded into one mesh.
+        Returns (vertices, faces, normals, values) as skimage does, relative to the first grid sample."""
+
+        if level != self.level:
+            raise ValueError(f'Sparse grid was built for level {self.level}, not {level}.')
+
+        b = self.block_size
+        spacing = np.asarray(spacing, dtype=np.float64)
+
+        scale = 1024
+        extent = np.array(self.shape) * scale + 1
+
+        vertices, faces, normals, values, keys, shared = [], [], [], [], [], []
+        n_vertices = 0
+
+        for key in self.leaves:
+            start = np.array(key) * b
+            block = self.region(start, start + b + 1)
+
+            if not block.min() < level < block.max() or min(block.shape) < 2:
+                continue
+
+            v, f, n, val = measure.marching_cubes(block, level=level, spacing=tuple(spacing), allow_degenerate=False)
+
+            q = quantise(v, spacing, scale)
+
+            vertices.append(v + start * spacing)
+            faces.append(f + n_vertices)
+            normals.append(n)
+            values.append(val)
+            keys.append(pack(q + start * scale, extent))
+            shared.append(((q == 0) | (q == (np.array(block.shape) - 1) * scale)).any(axis=1))
+            n_vertices += len(v)
+
+        if n_vertices == 0:
+            raise ValueError('Surface level must be within volume data range.')
+
+        keys, shared = np.concatenate(keys), np.concatenate(shared)
+        vertices, faces, normals = weld(np.concatenate(vertices), np.concatenate(faces), keys, shared,
+                                        np.concatenate(normals))
+
+        values = np.concatenate(values)
+        values = np.concatenate([values[~shared], values[shared][np.unique(keys[shared], return_index=True)[1]]])
+
+        return vertices.astype(np.float32), faces, normals, values
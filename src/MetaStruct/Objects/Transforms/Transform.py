@@ -0,0 +1,174 @@
+import itertools
+
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+from MetaStruct.Functions import Interval
+from MetaStruct.Functions.Backends import evaluate
+from MetaStruct.Objects.BufferArena import buffer_arena, point_shape
+from MetaStruct.Objects.Geometry import Geometry, union_box
+
+
+class Transform(Geometry):
+    """Affine transform of a shape, applied lazily.
+
+    matrix maps the shape's coordinates to world coordinates and is either a 4x4 homogeneous matrix or a
+    3x3 linear part, with translation added afterwards. evaluate_point maps the points back with the inverse
+    in one numexpr expression per axis, so no coordinate grids are stored. A Transform of a Transform is
+    composed into a single matrix."""
+
+    def __init__(self, shape, matrix=None, translation=(0, 0, 0)):
+        super().__init__(shape.design_space)
+
+        affine = np.eye(4)
+
+        if matrix is not None:
+            matrix = np.asarray(matrix, dtype=float)
+
+            if matrix.shape == (4, 4):
+                affine = matrix.copy()
+            elif matrix.shape == (3, 3):
+                affine[:3, :3] = matrix
+            else:
+                raise ValueError('Transform matrix must be 3x3 or 4x4.')
+
+        affine[:3, 3] += translation
+
+        if np.linalg.matrix_rank(affine[:3, :3]) < 3:
+            raise ValueError('Transform matrix is singular.')
+
+        if isinstance(shape, Transform):
+            affine = affine @ shape.matrix
+            shape = shape.shape
+
+        self.shape = shape
+        self.morph = shape.morph
+        self.name = f'{self.__class__.__name__}_{shape.name}'
+
+        self.adopt(shape)
+
+        self.set_matrix(affine)
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({repr(self.shape)}, {self.matrix.tolist()})'
+
+    def set_matrix(self, matrix):
+
+        before = self.bounding_box()
+
+        self.matrix = matrix
+        self.inverse = np.linalg.inv(matrix)
+
+        # Distances in the shape's frame shrink by at most the smallest singular value, so scaling by it keeps
+        # the field a lower bound on the distance under non-uniform scales
+        self.scale = np.linalg.svd(matrix[:3, :3], compute_uv=False).min()
+
+        self.x, self.y, self.z = matrix[:3, :3] @ (self.shape.x, self.shape.y, self.shape.z) + matrix[:3, 3]
+
+        self.set_limits()
+
+        self.changed(union_box(before, self.bounding_box()))
+
+    def child_changed(self, child, region):
+        """Maps the box changed in the shape's frame into this frame."""
+
+        if not (np.isfinite(region[0]).all() and np.isfinite(region[1]).all()):
+            return self.changed(None)
+
+        corners = np.array(list(itertools.product(*zip(*region))), dtype=float)
+        corners = corners @ self.matrix[:3, :3].T + self.matrix[:3, 3]
+
+        self.changed((corners.min(axis=0), corners.max(axis=0)))
+
+    def set_limits(self):
+
+        limits = (self.shape.x_limits, self.shape.y_limits, self.shape.z_limits)
+
+        if any(limit is None for limit in limits):
+            self.x_limits = self.y_limits = self.z_limits = None
+            return
+
+        corners = np.array(list(itertools.product(*limits)), dtype=float)
+        corners = corners @ self.matrix[:3, :3].T + self.matrix[:3, 3]
+
+        self.x_limits, self.y_limits, self.z_limits = np.stack((corners.min(axis=0), corners.max(axis=0)), axis=1)
+
+    def translate(self, x, y, z):
+
+        matrix = self.matrix.copy()
+        matrix[:3, 3] += (x, y, z)
+
+        self.set_matrix(matrix)
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        (a00, a01, a02, a03), (a10, a11, a12, a13), (a20, a21, a22, a23) = self.inverse[:3]
+        scale = self.scale
+
+        with buffer_arena.borrow(point_shape(x, y, z), 3) as (xs, ys, zs):
+
+            evaluate('a00*x + a01*y + a02*z + a03', out=xs, node=self)
+            evaluate('a10*x + a11*y + a12*z + a13', out=ys, node=self)
+            evaluate('a20*x + a21*y + a22*z + a23', out=zs, node=self)
+
+            value = self.shape.evaluate_point(xs, ys, zs, out=out)
+
+        if scale == 1:
+            return value
+
+        return evaluate('value * scale', out=out, node=self)
+
+    def evaluate_interval(self, x, y, z):
+
+        local = []
+
+        for a0, a1, a2, a3 in self.inverse[:3]:
+            local.append(Interval.offset(Interval.add(Interval.add(Interval.scale(x, a0), Interval.scale(y, a1)),
+                                                      Interval.scale(z, a2)), a3))
+
+        return Interval.scale(self.shape.evaluate_interval(*local), self.scale)
+
+
+class Rotate(Transform):
+    """Rotation of a shape by angle about an axis ('x', 'y', 'z' or a vector) through centre, which defaults
+    to the shape's centre."""
+
+    def __init__(self, shape, angle=0, axis='z', centre=None, degrees=True):
+
+        if isinstance(axis, str):
+            axis = {'x': (1, 0, 0), 'y': (0, 1, 0), 'z': (0, 0, 1)}[axis]
+
+        axis = np.asarray(axis, dtype=float)
+        axis /= np.linalg.norm(axis)
+
+        if degrees:
+            angle = np.radians(angle)
+
+        rotation = Rotation.from_rotvec(axis * angle).as_matrix()
+
+        super().__init__(shape, about(rotation, shape, centre))
+
+
+class Scale(Transform):
+    """Scaling of a shape about centre, which defaults to the shape's centre. factor is a scalar or one
+    factor per axis."""
+
+    def __init__(self, shape, factor=1, centre=None):
+
+        super().__init__(shape, about(np.diag(np.broadcast_to(np.asarray(factor, dtype=float), (3,))), shape, centre))
+
+
+def about(linear, shape, centre=None):
+    """4x4 matrix applying the linear map about a centre point, by default the shape's centre."""
+
+    if centre is None:
+        centre = (shape.x, shape.y, shape.z)
+
+    centre = np.asarray(centre, dtype=float)
+
+    matrix = np.eye(4)
+    matrix[:3, :3] = linear
+    matrix[:3, 3] = centre - linear @ centre
+
+    return matrix
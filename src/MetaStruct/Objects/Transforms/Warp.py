@@ -0,0 +1,223 @@
+import math
+import weakref
+
+import numexpr as ne
+import numpy as np
+
+from MetaStruct.Functions.Backends import evaluate
+from MetaStruct.Objects.Geometry import Geometry, union_box
+
+
+class Warp(Geometry):
+    """Evaluates a shape (usually a lattice) in warped coordinates about a centre point.
+
+    The warped coordinate fields depend only on the design space, the warp type and its parameters, so they
+    are computed once per design space (or per tile) and shared through design_space.coordinate_cache by
+    every warp of the same kind. They are freed when the last of those warps is deleted or released."""
+
+    expressions = None
+
+    # Boxes are not preserved by the warp
+    local = False
+
+    def __init__(self, shape, centre=(0, 0, 0)):
+        super().__init__(shape.design_space)
+
+        self.shape = shape
+        self.morph = shape.morph
+        self.name = f'{self.__class__.__name__}_{shape.name}'
+
+        self.adopt(shape)
+
+        self.x, self.y, self.z = centre
+
+        self.key = None
+        self.acquire()
+
+        self.set_limits()
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({repr(self.shape)}, ({self.x}, {self.y}, {self.z}))'
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+
+        # Registers with the coordinate cache of this process
+        self.acquire()
+
+    def parameters(self):
+        """Values the warped coordinates depend on, other than the sample points."""
+
+        return {'x0': self.x, 'y0': self.y, 'z0': self.z}
+
+    def acquire(self):
+
+        cache = self.design_space.coordinate_cache
+
+        self.key = (self.__class__.__name__,) + tuple(self.parameters().items())
+        cache.acquire(self.key)
+
+        self._finalizer = weakref.finalize(self, cache.release, self.key)
+
+    def release(self):
+
+        self._finalizer()
+
+    def warp(self, x, y, z):
+
+        local_dict = {'x': x, 'y': y, 'z': z, **self.parameters()}
+
+        return tuple(ne.evaluate(expression, local_dict=local_dict) for expression in self.expressions)
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        u, v, w = self.design_space.coordinate_cache.get(self.key, self.design_space.locate(x, y, z),
+                                                           lambda: self.warp(x, y, z))
+
+        return self.shape.evaluate_point(u, v, w, out=out)
+
+    def translate(self, x, y, z):
+
+        before = self.bounding_box()
+
+        self.release()
+
+        self.x += x
+        self.y += y
+        self.z += z
+
+        self.acquire()
+        self.set_limits()
+
+        self.changed(union_box(before, self.bounding_box()))
+
+
+class CylindricalWarp(Warp):
+    """Maps (x, y, z) to (radius, azimuth, height) about a z axis through centre. Limits of the shape are read
+    in those coordinates."""
+
+    expressions = ('sqrt((x-x0)**2 + (y-y0)**2)',
+                   'arctan2(y-y0, x-x0)',
+                   'z-z0')
+
+    def set_limits(self):
+
+        if self.shape.x_limits is None:
+            return
+
+        radius = max(np.abs(self.shape.x_limits))
+
+        self.x_limits = np.array([self.x - radius, self.x + radius])
+        self.y_limits = np.array([self.y - radius, self.y + radius])
+        self.z_limits = np.array(self.shape.z_limits) + self.z
+
+
+class SphericalWarp(Warp):
+    """Maps (x, y, z) to (radius, polar angle, azimuth) about centre."""
+
+    expressions = ('sqrt((x-x0)**2 + (y-y0)**2 + (z-z0)**2)',
+                   'arctan2(sqrt((x-x0)**2 + (y-y0)**2), z-z0)',
+                   'arctan2(y-y0, x-x0)')
+
+    def set_limits(self):
+
+        if self.shape.x_limits is None:
+            return
+
+        radius = max(np.abs(self.shape.x_limits))
+
+        self.x_limits = np.array([self.x - radius, self.x + radius])
+        self.y_limits = np.array([self.y - radius, self.y + radius])
+        self.z_limits = np.array([self.z - radius, self.z + radius])
+
+
+class PringleWarp(Warp):
+    """Bends a shape into a saddle, evaluating it at (x, y, z + factor * ((x-x0)**2 - (y-y0)**2)) about centre."""
+
+    expressions = ('x',
+                   'y',
+                   'z + f*((x-x0)**2 - (y-y0)**2)')
+
+    def __init__(self, shape, factor=0.1, centre=(0, 0, 0)):
+
+        self.factor = factor
+
+        super().__init__(shape, centre)
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({repr(self.shape)}, {self.factor}, ({self.x}, {self.y}, {self.z}))'
+
+    def parameters(self):
+
+        return {**super().parameters(), 'f': self.factor}
+
+    def set_limits(self):
+
+        if self.shape.x_limits is None:
+            return
+
+        self.x_limits = np.array(self.shape.x_limits)
+        self.y_limits = np.array(self.shape.y_limits)
+
+        (x_min, x_max), (y_min, y_max) = squared_range(self.x_limits, self.x), squared_range(self.y_limits, self.y)
+
+        # Points of the shape move by -factor * ((x-x0)**2 - (y-y0)**2) in z
+        offsets = -self.factor * np.array([x_min - y_max, x_max - y_min])
+
+        self.z_limits = np.array(self.shape.z_limits) + [offsets.min(), offsets.max()]
+
+
+class ConformalWarp(Warp):
+    """Log-polar map (log(radius / r0), azimuth, height) about a z axis through centre.
+
+    The map is conformal in planes normal to the axis only: unit cells grow in proportion to the radius across
+    the axis but keep their height along it, so they are stretched along the axis inside radius 1 and squashed
+    beyond it. Radial and azimuthal distances shrink by the radius while heights keep theirs, so the field is
+    scaled by min(radius, 1), the smallest singular value of the map back to world coordinates, to keep it
+    changing no faster than distance near the surface (as with Transform.scale)."""
+
+    expressions = ('log(sqrt((x-x0)**2 + (y-y0)**2 + 1e-30) / r0)',
+                   'arctan2(y-y0, x-x0)',
+                   'z-z0')
+
+    def __init__(self, shape, centre=(0, 0, 0), r0=1):
+
+        self.r0 = r0
+
+        super().__init__(shape, centre)
+
+    def __repr__(self):
+
+        return f'{self.__class__.__name__}({repr(self.shape)}, ({self.x}, {self.y}, {self.z}), {self.r0})'
+
+    def parameters(self):
+
+        return {**super().parameters(), 'r0': self.r0}
+
+    def evaluate_point(self, x, y, z, out=None):
+
+        value = super().evaluate_point(x, y, z, out=out)
+
+        return evaluate('value * where((x-x0)**2 + (y-y0)**2 < 1, sqrt((x-x0)**2 + (y-y0)**2), 1)',
+                        {'value': value, 'x': x, 'y': y, 'x0': self.x, 'y0': self.y}, out, self)
+
+    def set_limits(self):
+
+        if self.shape.x_limits is None:
+            return
+
+        radius = self.r0 * math.exp(max(self.shape.x_limits))
+
+        self.x_limits = np.array([self.x - radius, self.x + radius])
+        self.y_limits = np.array([self.y - radius, self.y + radius])
+        self.z_limits = np.array(self.shape.z_limits) + self.z
+
+
+def squared_range(limits, centre):
+    """(min, max) of (t - centre)**2 for t within limits."""
+
+    lower, upper = min(limits) - centre, max(limits) - centre
+
+    return (0 if lower <= 0 <= upper else min(lower ** 2, upper ** 2)), max(lower ** 2, upper ** 2)
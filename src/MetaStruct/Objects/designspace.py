@@ -1,5 +1,17 @@
+import uuid
+import weakref
+
 import numpy as np
 
+# Sample grids and what is derived from them, built on first use rather than pickled
+SAMPLE_GRIDS = ('x_grid', 'y_grid', 'z_grid', 'coordinate_list')
+
+# Attributes rebuilt rather than pickled
+NOT_PICKLED = (*SAMPLE_GRIDS, 'coordinate_cache')
+
+# Design spaces of this process by token, so unpickling one that is already here returns the same instance
+DESIGN_SPACES = weakref.WeakValueDictionary()
+
 
 class DesignSpace:
     DATA_TYPE = np.float32
@@ -11,15 +23,21 @@ class DesignSpace:
                  z_resolution=0,
                  x_bounds=None,
                  y_bounds=None,
-                 z_bounds=None):
+                 z_bounds=None,
+                 x_axis=None,
+                 y_axis=None,
+                 z_axis=None):
+        """x_axis, y_axis and z_axis are optional increasing arrays of sample positions, for non-uniform
+        (rectilinear) sampling along that axis. Their bounds are the first and last sample."""
+
         if resolution is None:
             resolution=200
         if x_bounds is None:
-            x_bounds = [-1.1, 1.1]
+            x_bounds = [-1.1, 1.1] if x_axis is None else [x_axis[0], x_axis[-1]]
         if y_bounds is None:
-            y_bounds = [-1.1, 1.1]
+            y_bounds = [-1.1, 1.1] if y_axis is None else [y_axis[0], y_axis[-1]]
         if z_bounds is None:
-            z_bounds = [-1.1, 1.1]
+            z_bounds = [-1.1, 1.1] if z_axis is None else [z_axis[0], z_axis[-1]]
 
         self.x_bounds = x_bounds
         self.y_bounds = y_bounds
@@ -76,20 +94,199 @@ class DesignSpace:
                                          retstep=True,
                                          dtype=DesignSpace.DATA_TYPE)
 
+        # Explicit axes are used as given. Their step is the largest spacing, which bounds the distance from any
+        # point in the grid to a sample.
+        if x_axis is not None:
+            self.X, self.x_step = rectilinear_axis(x_axis)
+        if y_axis is not None:
+            self.Y, self.y_step = rectilinear_axis(y_axis)
+        if z_axis is not None:
+            self.Z, self.z_step = rectilinear_axis(z_axis)
+
+        self.uniform = all(is_uniform(axis) for axis in (self.X, self.Y, self.Z))
+
         print('Generating Sample Grid in Design Space')
 
+        self.generate_grids()
+        self.coordinate_cache = CoordinateCache()
+
+        self.token = uuid.uuid4().hex
+        DESIGN_SPACES[self.token] = self
+
+    def __reduce__(self):
+        """Pickles the axes only. The sample grids are rebuilt when first used after unpickling, once per
+        process, so eg. workers evaluating tiles from the axes never build them."""
+
+        return restore, (self.token, {name: value for name, value in vars(self).items() if name not in NOT_PICKLED})
+
+    def __getattr__(self, name):
+
+        # Only called for missing attributes, the sample grids of an unpickled design space
+        if name in SAMPLE_GRIDS and 'X' in vars(self):
+            self.generate_grids()
+
+            return vars(self)[name]
+
+        raise AttributeError(f"'DesignSpace' object has no attribute '{name}'")
+
+    def generate_grids(self):
+
         self.x_grid, self.y_grid, self.z_grid = np.meshgrid(self.X,
                                                             self.Y,
                                                             self.Z,
                                                             indexing='ij')
 
-        if self.x_resolution == 0:
-            self.coordinate_list = np.empty(
-                (self.resolution * self.resolution * self.resolution, 3), dtype=np.float32)
-
-        else:
-            self.coordinate_list = np.empty(
-                (self.x_resolution * self.y_resolution * self.z_resolution, 3), dtype=np.float32)
+        self.coordinate_list = np.empty((self.x_grid.size, 3), dtype=np.float32)
         self.coordinate_list[:, 0] = self.x_grid.flatten()
         self.coordinate_list[:, 1] = self.y_grid.flatten()
         self.coordinate_list[:, 2] = self.z_grid.flatten()
+
+    def axes(self, factor=1):
+        """Sample axes with factor - 1 samples added evenly between each pair of samples, ((X, Y, Z), steps)."""
+
+        axes = tuple(refine_axis(axis, factor) for axis in (self.X, self.Y, self.Z))
+
+        steps = tuple(step / factor for step in (self.x_step, self.y_step, self.z_step))
+
+        return axes, steps
+
+    def tiles(self, tile_size=64):
+        """Yields tuples of slices covering the sample grid in blocks of at most tile_size points per axis."""
+
+        nx, ny, nz = len(self.X), len(self.Y), len(self.Z)
+
+        for i in range(0, nx, tile_size):
+            for j in range(0, ny, tile_size):
+                for k in range(0, nz, tile_size):
+                    yield slice(i, i + tile_size), slice(j, j + tile_size), slice(k, k + tile_size)
+
+    def locate(self, x, y, z):
+        """Returns a hashable key for the tile if (x, y, z) are matching views of the sample grids, else None."""
+
+        # Nothing can be a view of grids that are not built
+        if 'x_grid' not in vars(self):
+            return None
+
+        keys = []
+
+        for array, grid in ((x, self.x_grid), (y, self.y_grid), (z, self.z_grid)):
+
+            if not isinstance(array, np.ndarray) or array.dtype != grid.dtype:
+                return None
+
+            offset = array.__array_interface__['data'][0] - grid.__array_interface__['data'][0]
+
+            if not 0 <= offset < grid.nbytes:
+                return None
+
+            keys.append((offset, array.shape, array.strides))
+
+        if keys[0] != keys[1] or keys[0] != keys[2]:
+            return None
+
+        return keys[0]
+
+
+def restore(token, state):
+    """The design space of token in this process, rebuilt from its pickled state if there is none yet."""
+
+    design_space = DESIGN_SPACES.get(token)
+
+    if design_space is None:
+        design_space = DesignSpace.__new__(DesignSpace)
+        design_space.__dict__.update(state)
+        design_space.coordinate_cache = CoordinateCache()
+
+        DESIGN_SPACES[token] = design_space
+
+    return design_space
+
+
+def rectilinear_axis(axis):
+    """Checks an explicit axis is strictly increasing, returning it and its largest spacing."""
+
+    axis = np.asarray(axis, dtype=DesignSpace.DATA_TYPE).reshape(-1)
+
+    if len(axis) < 2 or np.any(np.diff(axis) <= 0):
+        raise ValueError('Design space axes must be strictly increasing with at least 2 samples.')
+
+    return axis, float(np.diff(axis).max())
+
+
+def is_uniform(axis):
+
+    steps = np.diff(axis.astype(np.float64))
+
+    return np.allclose(steps, steps[0], rtol=1e-4, atol=0)
+
+
+def refine_axis(axis, factor):
+
+    index = np.arange((len(axis) - 1) * factor + 1) / factor
+
+    return np.interp(index, np.arange(len(axis)), axis.astype(np.float64)).astype(DesignSpace.DATA_TYPE)
+
+
+def map_to_axes(vertices, normals, axes):
+    """Maps marching cubes vertices and normals from sample index space onto the given axes. Vertices stay
+    relative to the first sample, as with a uniform spacing."""
+
+    vertices = np.array(vertices, dtype=np.float64)
+    normals = np.array(normals, dtype=np.float64)
+
+    for i, axis in enumerate(axes):
+        index = np.arange(len(axis))
+        axis = axis.astype(np.float64)
+
+        # Normals come from central differences at the samples, which scale by the local spacing
+        normals[:, i] /= np.interp(vertices[:, i], index, np.gradient(axis))
+        vertices[:, i] = np.interp(vertices[:, i], index, axis) - axis[0]
+
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+    return vertices.astype(np.float32), normals.astype(np.float32)
+
+
+class CoordinateCache:
+    """Coordinate fields derived from the sample grids (eg. cylindrical coordinates), shared between nodes.
+
+    Fields are stored per key and tile. Nodes acquire a key while they exist, and the fields for a key are
+    dropped as soon as the last node using it releases it."""
+
+    def __init__(self):
+
+        self.references = {}
+        self.fields = {}
+
+    def acquire(self, key):
+
+        self.references[key] = self.references.get(key, 0) + 1
+
+    def release(self, key):
+
+        if key not in self.references:
+            return
+
+        self.references[key] -= 1
+
+        if self.references[key] == 0:
+            del self.references[key]
+
+            for entry in [entry for entry in self.fields if entry[0] == key]:
+                del self.fields[entry]
+
+    def get(self, key, tile, compute):
+        """Cached result of compute() for the key and tile. Nothing is cached for unknown tiles or keys."""
+
+        if tile is None or key not in self.references:
+            return compute()
+
+        if (key, tile) not in self.fields:
+            self.fields[(key, tile)] = compute()
+
+        return self.fields[(key, tile)]
+
+    @property
+    def nbytes(self):
+
+        return sum(array.nbytes for field in self.fields.values() for array in field)
@@ -7,11 +7,17 @@ from .Objects.Shapes.Line import Line
 from .Objects.Shapes.Spheroid import Spheroid
 from .Objects.Shapes.Torus import Torus
 from .Objects.Shapes.ImportedMesh import ImportedMesh
+from .Objects.Shapes.ImplicitFunction import ImplicitFunction
 
 from .Objects.Geometry import Geometry
+from .Objects.SparseGrid import SparseGrid
+from .Objects.EvaluationCache import EvaluationCache, evaluation_cache
+from .Objects.BufferArena import BufferArena, buffer_arena
 
 from .Objects.Booleans.Boolean import *
 
+from .Objects.Transforms.Transform import Transform, Rotate, Scale
+
 from .Objects.Lattices.Gyroid import Gyroid
 from .Objects.Lattices.Diamond import Diamond
 from .Objects.Lattices.Primitive import Primitive
@@ -24,6 +30,12 @@ from .Objects.Points.PointClouds import *
 
 from .Functions.ModifierArray import create_modifier_array
 from .Functions.Remap import remap
+from .Functions.Octree import octree_evaluate
+from .Functions.Refinement import refine_evaluate
+from .Functions.Backends import autotune, compute_context
+from .Functions.Scheduler import parallel_evaluate
+from .Functions.Distributed import distributed_evaluate, local_workers
+from .Functions.Serialization import save_model, load_model
 
 from .voronoi_test import voro_test
 from .convex_hull_test import convex_test
@@ -1,14 +1,42 @@
+import argparse
+import sys
+
+from MetaStruct.Functions.Batch import run_batch
 from MetaStruct.Objects.designspace import DesignSpace
 from MetaStruct.Objects.Lattices.Primitive import Primitive
 from MetaStruct.Objects.Shapes.Cylinder import Cylinder
 
 
-def main():
-    # Execute code here
-    ds = DesignSpace()
-    shape = Cylinder(ds) / Primitive(ds)
-    shape.preview_model()
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(prog='MetaStruct-cli',
+                                     description='Generates, meshes and exports every scene (a JSON or YAML parameter '
+                                                 'set) in a directory. See MetaStruct.Functions.Batch.run_batch.')
+
+    parser.add_argument('scenes', nargs='?', help='directory of scene files, previews an example if not given')
+    parser.add_argument('-o', '--output', help='directory for meshes, logs and reports, SCENES/output by default')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes, the number of cores by default')
+    parser.add_argument('-f', '--force', action='store_true', help='also run the scenes whose inputs are unchanged')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only print failures')
+
+    args = parser.parse_args(argv)
+
+    if args.scenes is None:
+        ds = DesignSpace()
+        shape = Cylinder(ds) / Primitive(ds)
+        shape.preview_model()
+
+        return 0
+
+    reports = run_batch(args.scenes, args.output, args.jobs, args.force, verbose=not args.quiet)
+
+    failed = [report for report in reports if report['status'] == 'failed']
+
+    for report in failed:
+        print(f'{report["scene"]} failed: {report["error"]}', file=sys.stderr)
+
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def dense(shape):
+    """Reference values of shape on its design space grid, evaluated point by point."""
+
+    ds = shape.design_space
+
+    return np.asarray(shape.evaluate_point(ds.x_grid, ds.y_grid, ds.z_grid), dtype=ds.DATA_TYPE)
+
+
+def surface_samples(grid, level=0):
+    """Mask of the samples at either end of a grid edge crossing level, the values marching cubes reads."""
+
+    inside = grid <= level
+    mask = np.zeros(grid.shape, dtype=bool)
+
+    for axis in range(3):
+
+        crossing = np.diff(inside, axis=axis)
+
+        lower = [slice(None)] * 3
+        upper = [slice(None)] * 3
+        lower[axis], upper[axis] = slice(None, -1), slice(1, None)
+
+        mask[tuple(lower)] |= crossing
+        mask[tuple(upper)] |= crossing
+
+    return mask
@@ -0,0 +1,32 @@
+import pytest
+
+from MetaStruct.Objects.EvaluationCache import evaluation_cache
+from MetaStruct.Objects.designspace import DesignSpace
+
+
+@pytest.fixture
+def ds():
+    """A small design space, so the dense references stay quick."""
+
+    return DesignSpace(resolution=40)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Grids cached by one test are not hits in the next."""
+
+    evaluation_cache.clear()
+
+    yield
+
+    evaluation_cache.clear()
+
+
+@pytest.fixture(autouse=True, scope='session')
+def calibration_cache(tmp_path_factory):
+    """Lattice calibration tables are written to a temporary directory rather than the user's cache."""
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('METASTRUCT_CACHE', str(tmp_path_factory.mktemp('calibration')))
+
+        yield
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+
+import numexpr as ne
+import numpy as np
+import pytest
+
+from MetaStruct.Functions.Backends import ComputeContext, compute_context, default_shapes
+
+
+@pytest.fixture(params=['numpy', 'numba'])
+def backend(request):
+
+    if request.param == 'numba':
+        pytest.importorskip('numba')
+
+    return request.param
+
+
+@pytest.mark.parametrize('shape', default_shapes(), ids=lambda shape: type(shape).__name__)
+def test_backends_match_numexpr(shape, backend):
+
+    axis = np.linspace(-1, 1, 12, dtype=np.float32)
+    x, y, z = np.meshgrid(axis, axis, axis, indexing='ij')
+
+    with compute_context.using('numexpr'):
+        reference = np.array(shape.evaluate_point(x, y, z))
+
+    with compute_context.using(backend):
+        values = np.array(shape.evaluate_point(x, y, z))
+
+    np.testing.assert_allclose(values, reference, rtol=1e-5, atol=1e-5)
+
+
+def write_autotune(path, backend='numpy'):
+
+    with open(path, 'w') as f:
+        json.dump({'cores': ne.detect_number_of_cores(),
+                   'choices': {'Sphere': {'16': {'backend': backend, 'threads': 1, 'seconds': 0}}}}, f)
+
+
+def test_importing_does_not_load_autotune_results(tmp_path):
+
+    path = tmp_path / 'autotune.json'
+    write_autotune(path)
+
+    backend = subprocess.run([sys.executable, '-c', 'import MetaStruct; print(MetaStruct.compute_context.backend)'],
+                             env={**os.environ, 'METASTRUCT_AUTOTUNE': str(path)}, capture_output=True, text=True,
+                             check=True).stdout.split()[-1]
+
+    assert backend == 'numexpr'
+
+
+def test_load_switches_to_auto_and_drops_unknown_backends(tmp_path):
+
+    context = ComputeContext()
+
+    write_autotune(tmp_path / 'tuned.json')
+    write_autotune(tmp_path / 'unknown.json', backend='fortran')
+
+    assert context.load(tmp_path / 'tuned.json')
+    assert context.backend == 'auto'
+    assert context.choices == {'Sphere': {'16': {'backend': 'numpy', 'threads': 1, 'seconds': 0}}}
+
+    assert context.load(tmp_path / 'unknown.json')
+    assert context.choices == {'Sphere': {}}
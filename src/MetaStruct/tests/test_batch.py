@@ -0,0 +1,61 @@
+import json
+
+import igl
+import numpy as np
+
+from MetaStruct.Functions.Batch import run_batch
+from MetaStruct.main import main
+
+MODEL = '''
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+
+
+def build(design_space, r=0.5):
+    return Sphere(design_space, r=r)
+'''
+
+
+def write_scenes(directory, r=0.5):
+
+    (directory / 'model.py').write_text(MODEL)
+    (directory / 'sphere.json').write_text(json.dumps({'model': 'model.py', 'parameters': {'r': r},
+                                                       'design_space': {'resolution': 30}, 'format': 'obj'}))
+    (directory / 'broken.json').write_text(json.dumps({'model': 'model.py:missing'}))
+
+
+def test_batch_meshes_each_scene_and_reports_failures(tmp_path):
+
+    write_scenes(tmp_path)
+
+    reports = {report['scene'].rsplit('/', 1)[-1]: report
+               for report in run_batch(str(tmp_path), processes=2, verbose=False)}
+
+    assert reports['broken.json']['status'] == 'failed'
+    assert reports['sphere.json']['status'] == 'done'
+    assert set(reports['sphere.json']['stages']) == {'generate', 'mesh', 'export'}
+
+    # Vertices are relative to the first sample, (-1.2, -1.2, -1.2) by default
+    vertices, _ = igl.read_triangle_mesh(reports['sphere.json']['outputs'][0])
+    np.testing.assert_allclose(np.linalg.norm(vertices - 1.2, axis=1), 0.5, atol=0.02)
+
+
+def test_unchanged_scenes_are_skipped(tmp_path):
+
+    write_scenes(tmp_path)
+    run_batch(str(tmp_path), processes=1, verbose=False)
+
+    statuses = [report['status'] for report in run_batch(str(tmp_path), processes=1, verbose=False)]
+    assert statuses == ['failed', 'skipped']
+
+    write_scenes(tmp_path, r=0.4)
+
+    statuses = [report['status'] for report in run_batch(str(tmp_path), processes=1, verbose=False)]
+    assert statuses == ['failed', 'done']
+
+
+def test_cli_exits_with_failures(tmp_path, capsys):
+
+    write_scenes(tmp_path)
+
+    assert main([str(tmp_path), '--quiet', '--jobs', '1']) == 1
+    assert 'broken.json failed' in capsys.readouterr().err
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from MetaStruct.Objects.Booleans.Boolean import BooleanN, Difference, Intersection, IntersectionN, SmoothUnion, UnionN
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense, surface_samples
+
+
+def slab_and_sphere(ds):
+
+    return Intersection(Cuboid(ds, xd=1, yd=1, zd=0.15), Sphere(ds, r=0.8))
+
+
+def test_lazy_intersection_is_exact_under_a_smooth_union(ds):
+
+    lazy = SmoothUnion(slab_and_sphere(ds), Sphere(ds, x=0.5, r=0.4))
+    lazy.evaluate_grid(verbose=False)
+
+    eager = SmoothUnion(slab_and_sphere(ds), Sphere(ds, x=0.5, r=0.4))
+
+    np.testing.assert_allclose(lazy.evaluated_grid, dense(eager), atol=1e-5)
+    assert not lazy.sign_only and not lazy.shape1.sign_only
+
+
+def test_lazy_root_has_exact_surface_and_right_sign(ds):
+
+    for boolean in (Intersection, Difference):
+
+        shape = boolean(Cuboid(ds, xd=1, yd=1, zd=0.15), Sphere(ds, r=0.5))
+        shape.evaluate_grid(verbose=False)
+
+        reference = dense(shape)
+
+        assert shape.sign_only
+        np.testing.assert_array_equal(shape.evaluated_grid <= 0, reference <= 0)
+
+        near = surface_samples(reference)
+
+        assert near.any()
+        np.testing.assert_allclose(shape.evaluated_grid[near], reference[near], atol=1e-5)
+
+
+def test_evaluate_point_of_lazy_booleans_is_exact(ds):
+
+    slab, sphere = Cuboid(ds, xd=1, yd=1, zd=0.15), Sphere(ds, r=0.8)
+
+    np.testing.assert_allclose(dense(Intersection(slab, sphere)), np.maximum(dense(slab), dense(sphere)), atol=1e-6)
+    np.testing.assert_allclose(dense(Difference(slab, sphere)), np.maximum(dense(slab), -dense(sphere)), atol=1e-6)
+
+
+def test_exact_grids_of_lazy_roots(ds):
+
+    shape = slab_and_sphere(ds)
+    shape.evaluate_grid(verbose=False, exact=True)
+
+    assert not shape.sign_only
+    np.testing.assert_allclose(shape.evaluated_grid, dense(shape), atol=1e-6)
+
+
+def test_sign_only_grids_are_not_read_by_new_parents(ds):
+
+    shape = slab_and_sphere(ds)
+    shape.evaluate_grid(verbose=False)
+
+    assert shape.sign_only and not shape.up_to_date()
+
+    parent = SmoothUnion(shape, Sphere(ds, x=0.5, r=0.4))
+    parent.evaluate_grid(verbose=False)
+
+    np.testing.assert_allclose(parent.evaluated_grid, dense(parent), atol=1e-5)
+
+
+def small_spheres(ds):
+
+    return [Sphere(ds, x=-0.5, r=0.2), Sphere(ds, x=0.1, y=0.3, r=0.25), Sphere(ds, z=-0.5, r=0.15)]
+
+
+def test_n_ary_grids_under_a_parent_are_exact(ds):
+
+    for n_ary in (UnionN, IntersectionN):
+
+        child = n_ary(small_spheres(ds))
+        shape = SmoothUnion(child, Sphere(ds, x=0.6, r=0.2))
+        shape.evaluate_grid(verbose=False)
+
+        assert not child.sign_only
+        np.testing.assert_allclose(child.evaluated_grid, dense(child), atol=1e-6)
+        np.testing.assert_allclose(shape.evaluated_grid, dense(shape), atol=1e-5)
+
+
+def test_culled_n_ary_roots_have_exact_surface_and_right_sign(ds):
+
+    shape = UnionN(small_spheres(ds))
+    shape.evaluate_grid(verbose=False)
+
+    reference = dense(shape)
+
+    assert shape.sign_only
+    assert (shape.evaluated_grid <= reference + 1e-6).all()
+    np.testing.assert_array_equal(shape.evaluated_grid <= 0, reference <= 0)
+
+    near = surface_samples(reference)
+    np.testing.assert_allclose(shape.evaluated_grid[near], reference[near], atol=1e-6)
+
+
+def test_intersection_chains_stay_binary(ds):
+
+    a, b, c = small_spheres(ds)
+
+    assert isinstance(a / b / c, Intersection)
+
+
+def test_n_ary_base_cannot_be_built(ds):
+
+    with pytest.raises(TypeError):
+        BooleanN([Sphere(ds), Sphere(ds, x=0.5)])
@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from MetaStruct.Functions.Backends import default_shapes
+from MetaStruct.Objects.BufferArena import BufferArena, buffer_arena
+from MetaStruct.Objects.Booleans.Boolean import Difference, SmoothUnion, UnionN
+from MetaStruct.Objects.Misc.Noise import Noise
+from MetaStruct.Objects.Misc.Pattern import CircularPattern, Pattern
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.Shapes.Torus import Torus
+from MetaStruct.Objects.Transforms.Transform import Rotate
+from MetaStruct.Objects.Transforms.Warp import CylindricalWarp
+
+
+def composite(ds):
+
+    return SmoothUnion(Difference(Rotate(Cuboid(ds, xd=0.6, yd=0.4, zd=0.5), 30, 'x'), Sphere(ds, r=0.4)),
+                       UnionN([Pattern(Sphere(ds, x=-0.8, r=0.1), 3, 1, 1, 0.3), Noise(ds, Torus(ds), seed=2),
+                               CircularPattern(Sphere(ds, x=0.6, r=0.1), 4), CylindricalWarp(Sphere(ds, r=0.3))]))
+
+
+def points():
+
+    return tuple(np.random.default_rng(0).uniform(-1, 1, (3, 20, 20, 20)).astype(np.float32))
+
+
+@pytest.mark.parametrize('index', range(11))
+def test_values_written_into_out_match_a_new_array(ds, index):
+
+    shape = (default_shapes() + [composite(ds)])[index]
+    x, y, z = points()
+
+    out = np.full(x.shape, np.nan, dtype=np.float32)
+
+    assert shape.evaluate_point(x, y, z, out=out) is out
+    np.testing.assert_allclose(out, shape.evaluate_point(x, y, z), atol=1e-6)
+
+
+def test_evaluating_a_tree_again_allocates_no_buffers(ds):
+
+    shape = composite(ds)
+    x, y, z = points()
+    out = np.empty(x.shape, dtype=np.float32)
+
+    shape.evaluate_point(x, y, z, out=out)
+    allocations = buffer_arena.allocations
+
+    shape.evaluate_point(x, y, z, out=out)
+
+    assert buffer_arena.allocations == allocations
+    assert buffer_arena.in_use == 0
+
+
+def test_arena_reuses_buffers_within_its_budget():
+
+    arena = BufferArena(budget=2 * 4 * 1000)
+
+    with arena.borrow((1000,), 3) as buffers:
+        assert len({id(buffer) for buffer in buffers}) == 3
+        assert arena.in_use == 3 * 4000
+
+    # One of the buffers returned is over the budget and dropped
+    assert arena.nbytes == 2 * 4000 and arena.in_use == 0
+
+    with arena.borrow((1000,), 2):
+        pass
+
+    assert arena.stats()['allocations'] == 3 and arena.stats()['reuses'] == 2
+
+
+def test_threads_borrow_from_their_own_arena(ds):
+
+    shape = composite(ds)
+    x, y, z = points()
+    reference = shape.evaluate_point(x, y, z)
+
+    # Every thread waits for the others, so the four run at once
+    barrier = threading.Barrier(4)
+
+    def evaluate(_):
+
+        barrier.wait()
+
+        return buffer_arena.arena, [shape.evaluate_point(x, y, z) for _ in range(5)]
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(evaluate, range(4)))
+
+    arenas = {id(arena) for arena, _ in results}
+
+    assert len(arenas) == 4 and id(buffer_arena.arena) not in arenas
+
+    for _, values in results:
+        for value in values:
+            np.testing.assert_allclose(value, reference, atol=1e-6)
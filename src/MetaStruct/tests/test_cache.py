@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from MetaStruct.Objects.EvaluationCache import EvaluationCache, evaluation_cache
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense
+
+
+@pytest.fixture
+def cache():
+
+    budget = evaluation_cache.budget
+    evaluation_cache.budget = 64 * 2 ** 20
+
+    yield evaluation_cache
+
+    evaluation_cache.budget = budget
+
+
+@pytest.mark.skipif('METASTRUCT_CACHE_BYTES' in os.environ, reason='cache budget set in the environment')
+def test_cache_is_off_by_default():
+
+    assert not evaluation_cache.enabled
+
+
+def test_nodes_with_the_same_parameters_share_one_read_only_grid(ds, cache):
+
+    a, b = Sphere(ds, r=0.5), Sphere(ds, r=0.5)
+
+    a.evaluate_grid(verbose=False)
+    b.evaluate_grid(verbose=False)
+
+    assert cache.stats()['hits'] == 1
+    assert b.evaluated_grid is a.evaluated_grid
+    assert not a.evaluated_grid.flags.writeable
+    assert cache.nbytes == a.evaluated_grid.nbytes
+
+    np.testing.assert_allclose(b.evaluated_grid, dense(b), atol=1e-6)
+
+
+def test_changing_a_cached_grid_leaves_the_cache_alone(ds, cache):
+
+    a = Sphere(ds, r=0.5)
+    a.evaluate_grid(verbose=False)
+
+    cached = a.evaluated_grid
+
+    a.update(r=0.3)
+    a.evaluate_grid(verbose=False)
+
+    np.testing.assert_allclose(cached, dense(Sphere(ds, r=0.5)), atol=1e-6)
+
+
+def test_cached_grids_can_be_meshed(ds, cache):
+
+    a = Sphere(ds, r=0.5)
+    a.evaluate_grid(verbose=False)
+    a.find_surface()
+
+    assert len(a.faces) > 0
+
+
+def test_least_recently_used_grids_spill_to_disk(ds, tmp_path):
+
+    grid = np.zeros(ds.x_grid.shape, dtype=ds.DATA_TYPE)
+    cache = EvaluationCache(budget=grid.nbytes, spill_directory=str(tmp_path))
+
+    spheres = Sphere(ds, r=0.5), Sphere(ds, r=0.3)
+
+    for sphere in spheres:
+        cache.get(sphere, lambda: dense(sphere))
+
+    assert cache.stats()['evictions'] == 1 and cache.stats()['spilled'] == 1
+
+    np.testing.assert_array_equal(cache.get(spheres[0], lambda: None), dense(spheres[0]))
+    assert cache.stats()['disk_hits'] == 1
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from MetaStruct.Objects.Lattices.Gyroid import Gyroid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.designspace import DesignSpace
+from MetaStruct.testing import dense
+
+
+@pytest.fixture
+def graded_ds():
+    """Samples three times as dense near x = 0 as at the ends of the axis."""
+
+    t = np.linspace(-1, 1, 41)
+    axis = 1.2 * (t + np.sign(t) * t ** 2) / 2
+
+    return DesignSpace(resolution=30, x_axis=axis)
+
+
+def test_non_uniform_axes_are_sampled_as_given(graded_ds):
+
+    assert not graded_ds.uniform
+    assert graded_ds.x_grid.shape == (41, 30, 30)
+    np.testing.assert_allclose(graded_ds.x_grid[:, 0, 0], graded_ds.X)
+    assert graded_ds.x_step == pytest.approx(np.diff(graded_ds.X).max())
+
+
+def test_grids_on_non_uniform_axes_match_dense_evaluation(graded_ds):
+
+    lattice = Gyroid(graded_ds, nx=2, ny=2, nz=2)
+
+    assert lattice.periods() is None
+
+    lattice.evaluate_grid(verbose=False)
+    np.testing.assert_allclose(lattice.evaluated_grid, dense(lattice), atol=1e-6)
+
+
+def test_meshes_on_non_uniform_axes_lie_on_the_surface(graded_ds):
+
+    sphere = Sphere(graded_ds, r=0.7)
+    sphere.find_surface()
+
+    ds = graded_ds
+    vertices = sphere.vertices + np.array([ds.X[0], ds.Y[0], ds.Z[0]])
+
+    np.testing.assert_allclose(np.linalg.norm(vertices, axis=1), 0.7, atol=0.1 * ds.y_step)
+
+
+def test_axes_must_increase():
+
+    with pytest.raises(ValueError):
+        DesignSpace(x_axis=[0, 0.5, 0.4, 1])
@@ -0,0 +1,67 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from MetaStruct.Functions.Distributed import answer_challenge, connect, distributed_evaluate, evaluate_tile, \
+    get_authkey, local_workers
+from MetaStruct.Objects import designspace
+from MetaStruct.Objects.Booleans.Boolean import Difference
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense
+
+AUTHKEY = 'test-key'
+
+
+def scene(ds):
+
+    return Difference(Cuboid(ds, xd=0.6, yd=0.6, zd=0.6), Sphere(ds, r=0.7))
+
+
+def test_distributed_grid_matches_dense(ds):
+
+    shape = scene(ds)
+
+    with local_workers(2, authkey=AUTHKEY) as addresses:
+        grid = distributed_evaluate(shape, addresses, tile_size=16, verbose=False, authkey=AUTHKEY)
+
+    np.testing.assert_allclose(grid, dense(shape), atol=1e-6)
+
+
+def test_workers_reject_the_wrong_authkey(ds):
+
+    with local_workers(1, authkey=AUTHKEY) as addresses:
+
+        connection = connect(addresses[0], timeout=10)
+
+        with connection, pytest.raises(ConnectionError, match='rejected'):
+            answer_challenge(connection, b'wrong-key')
+
+        with pytest.raises(ConnectionError, match='No workers left'):
+            distributed_evaluate(scene(ds), addresses, verbose=False, authkey='wrong-key')
+
+
+def test_an_authkey_is_required(monkeypatch):
+
+    monkeypatch.delenv('METASTRUCT_AUTHKEY', raising=False)
+
+    with pytest.raises(ValueError):
+        get_authkey()
+
+
+def test_tiles_are_evaluated_without_building_the_sample_grids(ds):
+
+    shape = scene(ds)
+    payload = pickle.dumps(shape)
+
+    # As on a worker, where the design space is not already there
+    designspace.DESIGN_SPACES.pop(ds.token)
+    received = pickle.loads(payload)
+
+    tile = (slice(8, 24), slice(0, 16), slice(30, 40))
+    values = evaluate_tile(received, tile)
+
+    assert received.design_space is not ds
+    assert 'x_grid' not in vars(received.design_space)
+    np.testing.assert_allclose(values, dense(shape)[tile], atol=1e-6)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from MetaStruct.Objects.Booleans.Boolean import Difference, Union
+from MetaStruct.Objects.Misc.Field import LinearField
+from MetaStruct.Objects.Shapes import ImplicitFunction as implicit
+from MetaStruct.Objects.Shapes.ImplicitFunction import ImplicitFunction
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense
+
+SPHERE = 'sqrt(x**2 + y**2 + z**2) - r'
+
+
+def test_implicit_sphere_matches_the_sphere(ds):
+
+    shape = ImplicitFunction(ds, SPHERE, {'r': 0.5}, x=0.2, limits=((-0.5, 0.5),) * 3)
+    shape.evaluate_grid(verbose=False)
+
+    np.testing.assert_allclose(shape.evaluated_grid, dense(Sphere(ds, x=0.2, r=0.5)), atol=1e-6)
+    np.testing.assert_allclose(shape.x_limits, (-0.3, 0.7))
+
+    shape.update(r=0.3)
+    shape.translate(0, -0.1, 0)
+    shape.evaluate_grid(verbose=False, exact=True)
+
+    np.testing.assert_allclose(shape.evaluated_grid, dense(Sphere(ds, x=0.2, y=-0.1, r=0.3)), atol=1e-6)
+
+
+def test_parameters_may_be_fields(ds):
+
+    radius = LinearField(start=(-1, 0, 0), end=(1, 0, 0), start_value=0.2, end_value=0.6)
+    shape = ImplicitFunction(ds, SPHERE, {'r': radius})
+
+    x, y, z = ds.x_grid, ds.y_grid, ds.z_grid
+    reference = np.sqrt(x ** 2 + y ** 2 + z ** 2) - (0.4 + 0.2 * np.clip(x, -1, 1))
+
+    np.testing.assert_allclose(dense(shape), reference, atol=1e-5)
+
+
+def test_expressions_are_compiled_once(ds):
+
+    shape = ImplicitFunction(ds, 'sin(k*x)*cos(k*y) + sin(k*y)*cos(k*z) + sin(k*z)*cos(k*x)', {'k': 6.0})
+    shape.evaluate_grid(verbose=False)
+
+    programs = len(implicit.PROGRAMS)
+
+    ImplicitFunction(ds, 'sin(k*x)*cos(k*y) + sin(k*y)*cos(k*z) + sin(k*z)*cos(k*x)', {'k': 3.0}).evaluate_point(
+        ds.x_grid, ds.y_grid, ds.z_grid)
+
+    assert len(implicit.PROGRAMS) == programs
+
+
+@pytest.mark.parametrize('expression, params', [('sqrt(x**2 + ', {}), ('x + a', {}), ('x - x0', {'x0': 1}),
+                                                 ('x**2 + y**2 + z**2 - r', {'r': 0.25, 'x': 5.})])
+def test_invalid_expressions_are_rejected(ds, expression, params):
+
+    with pytest.raises(ValueError):
+        ImplicitFunction(ds, expression, params)
+
+
+@pytest.mark.parametrize('operation', [Union, Difference])
+def test_unbounded_functions_combine_with_shapes(ds, operation):
+
+    plane, sphere = ImplicitFunction(ds, 'x - 0.2'), Sphere(ds, r=0.5)
+    shape = operation(plane, sphere)
+
+    assert plane.x_limits[0] == ds.x_lower and plane.x_limits[1] == ds.x_upper
+
+    shape.evaluate_grid(verbose=False, exact=True)
+
+    np.testing.assert_allclose(shape.evaluated_grid, dense(shape), atol=1e-6)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from MetaStruct.Objects.Booleans.Boolean import SmoothUnion, Union
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense, surface_samples
+
+
+def assert_same_surface(grid, reference):
+
+    np.testing.assert_array_equal(grid <= 0, reference <= 0)
+
+    near = surface_samples(reference)
+    np.testing.assert_allclose(grid[near], reference[near], atol=1e-5)
+
+
+def test_update_under_a_smooth_union_matches_fresh_evaluation(ds):
+
+    a = Sphere(ds, x=-0.3, r=0.4)
+    shape = SmoothUnion(a, Sphere(ds, x=0.4, r=0.3))
+    shape.evaluate_grid(verbose=False)
+
+    a.update(r=0.2)
+    shape.evaluate_grid(verbose=False)
+
+    fresh = SmoothUnion(Sphere(ds, x=-0.3, r=0.2), Sphere(ds, x=0.4, r=0.3))
+
+    np.testing.assert_allclose(shape.evaluated_grid, dense(fresh), atol=1e-5)
+    np.testing.assert_allclose(a.evaluated_grid, dense(Sphere(ds, x=-0.3, r=0.2)), atol=1e-6)
+
+
+def test_children_of_updated_roots_match_fresh_evaluation(ds):
+
+    a, b = Cuboid(ds, xd=0.6, yd=0.6, zd=0.6), Sphere(ds, x=0.3, r=0.3)
+    shape = Union(a, b)
+    shape.evaluate_grid(verbose=False)
+
+    b.translate(0.3, 0, 0)
+    shape.evaluate_grid(verbose=False)
+
+    np.testing.assert_allclose(b.evaluated_grid, dense(Sphere(ds, x=0.6, r=0.3)), atol=1e-6)
+    assert_same_surface(shape.evaluated_grid, dense(Union(Cuboid(ds, xd=0.6, yd=0.6, zd=0.6),
+                                                           Sphere(ds, x=0.6, r=0.3))))
+
+
+def test_region_updates_of_roots_keep_the_surface(ds):
+
+    a = Sphere(ds, r=0.3)
+    shape = Union(a, Sphere(ds, x=0.5, y=0.5, r=0.2))
+    shape.evaluate_grid(verbose=False)
+
+    a.translate(-0.3, 0, 0.1)
+    shape.evaluate_grid(verbose=False)
+
+    assert shape.sign_only
+    assert_same_surface(shape.evaluated_grid, dense(Union(Sphere(ds, x=-0.3, z=0.1, r=0.3),
+                                                           Sphere(ds, x=0.5, y=0.5, r=0.2))))
+
+    sphere = Sphere(ds, r=0.3)
+    sphere.evaluate_grid(verbose=False)
+
+    sphere.update(r=0.2)
+    sphere.evaluate_grid(verbose=False)
+
+    assert_same_surface(sphere.evaluated_grid, dense(Sphere(ds, r=0.2)))
+
+
+def test_exact_grids_do_not_depend_on_edit_history(ds):
+
+    edited = Sphere(ds, r=0.3)
+    edited.evaluate_grid(verbose=False)
+
+    edited.update(r=0.2)
+    edited.evaluate_grid(verbose=False, exact=True)
+
+    assert not edited.sign_only
+    np.testing.assert_array_equal(edited.evaluated_grid, dense(Sphere(ds, r=0.2)))
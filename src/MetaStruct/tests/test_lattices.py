@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+import pytest
+
+from MetaStruct.Functions import Calibration
+from MetaStruct.Objects.Lattices.BCC import BCC
+from MetaStruct.Objects.Lattices.Diamond import Diamond
+from MetaStruct.Objects.Lattices.DiamondNetwork import DiamondNetwork
+from MetaStruct.Objects.Lattices.DiamondSurface import DiamondSurface
+from MetaStruct.Objects.Lattices.DoubleGyroidNetwork import DoubleGyroidNetwork
+from MetaStruct.Objects.Lattices.Gyroid import Gyroid
+from MetaStruct.Objects.Lattices.GyroidNetwork import GyroidNetwork
+from MetaStruct.Objects.Lattices.GyroidSurface import GyroidSurface
+from MetaStruct.Objects.Lattices.Primitive import Primitive
+from MetaStruct.Objects.Lattices.PrimitiveNetwork import PrimitiveNetwork
+from MetaStruct.Objects.Lattices.PrimitiveSurface import PrimitiveSurface
+from MetaStruct.Objects.designspace import DesignSpace
+from MetaStruct.Objects.Misc.Field import DistanceField, Field, LinearField
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense
+
+
+def test_graded_lattice_matches_uniform_lattices_where_the_field_is_constant(ds):
+
+    field = LinearField(start=(-0.4, 0, 0), end=(0.4, 0, 0), start_value=0.2, end_value=0.6)
+    graded = Gyroid(ds, nx=2, ny=2, nz=2, vf=field)
+    graded.evaluate_grid(verbose=False, tile_size=16)
+
+    np.testing.assert_allclose(graded.evaluated_grid, dense(graded), atol=1e-6)
+
+    low, high = ds.x_grid <= -0.4, ds.x_grid >= 0.4
+
+    np.testing.assert_allclose(graded.evaluated_grid[low], dense(Gyroid(ds, nx=2, ny=2, nz=2, vf=0.2))[low], atol=1e-5)
+    np.testing.assert_allclose(graded.evaluated_grid[high], dense(Gyroid(ds, nx=2, ny=2, nz=2, vf=0.6))[high],
+                               atol=1e-5)
+
+
+def test_lattice_graded_by_the_distance_to_a_shape(ds):
+
+    sphere = Sphere(ds, r=0.5)
+    graded = Primitive(ds, nx=3, ny=3, nz=3, vf=DistanceField(sphere, distance=0.3, near_value=0.6, far_value=0.2))
+
+    inside, far = dense(sphere) <= 0, dense(sphere) >= 0.3
+
+    np.testing.assert_allclose(dense(graded)[inside], dense(Primitive(ds, nx=3, ny=3, nz=3, vf=0.6))[inside],
+                               atol=1e-5)
+    np.testing.assert_allclose(dense(graded)[far], dense(Primitive(ds, nx=3, ny=3, nz=3, vf=0.2))[far], atol=1e-5)
+
+
+@pytest.mark.parametrize('lattice', [Gyroid, Diamond, Primitive, GyroidNetwork, DiamondNetwork, PrimitiveNetwork,
+                                     DoubleGyroidNetwork, GyroidSurface, DiamondSurface, PrimitiveSurface, BCC],
+                         ids=lambda lattice: lattice.__name__)
+def test_lattices_fill_their_volume_fraction(ds, lattice):
+
+    # Cell centred samples of one unit cell, not the samples the tables were measured on
+    centres = (np.arange(50) + 0.5) / 50
+
+    for vf in (0.15, 0.3, 0.5):
+
+        values = lattice(ds, vf=vf).evaluate_point(*np.meshgrid(centres, centres, centres, indexing='ij'))
+
+        assert abs(np.mean(values <= 0) - vf) < 0.01
+
+
+def test_calibration_tables_are_read_back_from_disk(tmp_path, monkeypatch):
+
+    monkeypatch.setenv('METASTRUCT_CACHE', str(tmp_path))
+    monkeypatch.setattr(Calibration, '_tables', {})
+
+    measured = Calibration.calibration_table('Gyroid', GyroidSurface.surface)
+
+    assert len(os.listdir(tmp_path)) == 1
+
+    def measure_levels(*args):
+        raise AssertionError('The table was measured again.')
+
+    monkeypatch.setattr(Calibration, '_tables', {})
+    monkeypatch.setattr(Calibration, 'measure_levels', measure_levels)
+
+    np.testing.assert_array_equal(Calibration.calibration_table('Gyroid', GyroidSurface.surface)[1], measured[1])
+
+
+def test_periodic_lattices_are_tiled_from_one_cell():
+
+    # A step of 0.05, so cells of 0.5 are 10 samples
+    ds = DesignSpace(resolution=49)
+
+    for lattice in (Gyroid(ds, nx=2, ny=2, nz=2, vf=0.3), Diamond(ds, x=0.1, nx=2, ny=4, nz=2),
+                    BCC(ds, nx=2, ny=2, nz=2)):
+
+        assert lattice.periods() is not None
+
+        lattice.evaluate_grid(verbose=False)
+
+        np.testing.assert_allclose(lattice.evaluated_grid, dense(lattice), atol=1e-4)
+
+
+def test_lattices_out_of_step_with_the_grid_are_evaluated_in_full():
+
+    ds = DesignSpace(resolution=49)
+    lattice = Gyroid(ds, nx=2.1, ny=2, nz=2)
+
+    assert lattice.periods() is None
+
+    lattice.evaluate_grid(verbose=False)
+
+    np.testing.assert_allclose(lattice.evaluated_grid, dense(lattice), atol=1e-6)
+
+
+def mesh_volume(vertices, faces):
+
+    a, b, c = (vertices[faces[:, i]].astype(np.float64) for i in range(3))
+
+    return np.einsum('ij,ij->i', a, np.cross(b, c)).sum() / 6
+
+
+def test_instanced_lattice_meshes_are_closed_and_on_the_clipped_surface(ds):
+
+    lattice, sphere = Gyroid(ds, nx=3, ny=3, nz=3, vf=0.3), Sphere(ds, r=0.8)
+    lattice.instance_mesh(sphere, cell_resolution=16, verbose=False)
+
+    vertices = lattice.vertices + np.array([ds.X[0], ds.Y[0], ds.Z[0]])
+    values = np.maximum(sphere.evaluate_point(*vertices.T), lattice.evaluate_point(*vertices.T))
+
+    assert np.abs(values).max() < 0.1 and np.abs(values).mean() < 0.01
+
+    # Welded across cells, so every edge is shared by exactly two faces
+    edges = np.sort(lattice.faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    assert (np.unique(edges, axis=0, return_counts=True)[1] == 2).all()
+
+    assert abs(mesh_volume(lattice.vertices, lattice.faces) / (0.3 * 4 / 3 * np.pi * 0.8 ** 3) - 1) < 0.05
+
+
+def test_field_base_cannot_be_built():
+
+    with pytest.raises(TypeError):
+        Field()
@@ -0,0 +1,61 @@
+import numpy as np
+
+from MetaStruct.Objects.Misc.Noise import Noise, fractal_noise, lattice_noise
+from MetaStruct.Objects.Misc.PerlinNoise import PerlinNoise
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense
+
+
+def test_noise_grids_match_pointwise_evaluation(ds):
+
+    for kind in ('value', 'gradient'):
+
+        shape = Noise(ds, Sphere(ds, r=0.6), intensity=5, seed=4, kind=kind)
+        shape.evaluate_grid(verbose=False, tile_size=16)
+
+        np.testing.assert_allclose(shape.evaluated_grid, dense(shape), atol=1e-6)
+
+        # Any point on its own gives the value it has in the grid
+        index = tuple(np.random.default_rng(0).integers(0, 40, (3, 50)))
+        points = [np.ascontiguousarray(grid[index]) for grid in (ds.x_grid, ds.y_grid, ds.z_grid)]
+
+        np.testing.assert_allclose(shape.evaluate_point(*points), shape.evaluated_grid[index], atol=1e-6)
+
+
+def test_value_noise_shifts_the_field_by_at_most_the_intensity(ds):
+
+    sphere = Sphere(ds, r=0.6)
+    shift = dense(Noise(ds, sphere, intensity=5, seed=1)) - dense(sphere)
+
+    assert shift.min() >= -1e-6 and shift.max() <= 0.05 + 1e-6
+    assert shift.std() > 0.005
+
+
+def test_lattice_noise_is_smooth_and_bounded():
+
+    x, y, z = np.random.default_rng(2).uniform(-5, 5, (3, 10000))
+
+    for kind in ('value', 'gradient'):
+
+        values = lattice_noise(x, y, z, frequency=2, seed=7, kind=kind)
+        nearby = lattice_noise(x + 1e-3, y, z, frequency=2, seed=7, kind=kind)
+
+        assert np.abs(values).max() <= 1
+        assert np.abs(nearby - values).max() < 0.05
+        assert not np.array_equal(values, lattice_noise(x, y, z, frequency=2, seed=8, kind=kind))
+
+    # Gradient noise is zero at the lattice points
+    corners = np.arange(-3, 4, dtype=np.float32)
+    np.testing.assert_allclose(lattice_noise(corners, corners, corners, kind='gradient'), 0, atol=1e-6)
+
+
+def test_perlin_noise_is_fractal_noise_of_its_frequency(ds):
+
+    noise = PerlinNoise(ds, Sphere(ds, r=0.5), freq=(4, 4, 4), seed=3, octaves=2)
+
+    extent = ds.X[-1] - ds.X[0]
+    reference = fractal_noise(ds.x_grid, ds.y_grid, ds.z_grid, 4 / extent, 3, octaves=2)
+
+    noise.evaluate_grid(verbose=False)
+
+    np.testing.assert_allclose(noise.evaluated_grid, reference, atol=1e-6)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from MetaStruct.Functions.Octree import octree_evaluate
+from MetaStruct.Objects.Booleans.Boolean import Difference, SmoothUnion, Union
+from MetaStruct.Objects.Lattices.Gyroid import Gyroid
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Cylinder import Cylinder
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.Shapes.Spheroid import Spheroid
+from MetaStruct.Objects.Shapes.Torus import Torus
+from MetaStruct.testing import dense, surface_samples
+
+
+def shapes(ds):
+
+    return [Sphere(ds, x=0.2, r=0.5), Cuboid(ds, xd=0.6, yd=0.4, zd=0.8), Torus(ds), Cylinder(ds, r1=0.4, r2=0.4, l=0.5),
+            Gyroid(ds, nx=2, ny=2, nz=2), Difference(Cuboid(ds, xd=0.8, yd=0.8, zd=0.8), Sphere(ds, r=0.5)),
+            SmoothUnion(Sphere(ds, x=-0.3, r=0.4), Torus(ds)), Spheroid(ds, y=0.3, z=-0.2, xr=0.3, yr=0.4, zr=0.5)]
+
+
+@pytest.mark.parametrize('index', range(8))
+def test_interval_bounds_contain_every_value_in_the_box(ds, index):
+
+    shape = shapes(ds)[index]
+    rng = np.random.default_rng(index)
+
+    lower = rng.uniform(-1.1, 0.9, (200, 3))
+    upper = lower + rng.uniform(0.01, 0.4, (200, 3))
+
+    lo, hi = (np.broadcast_to(bound, (200,)) for bound in shape.evaluate_interval(*zip(lower.T, upper.T)))
+
+    # Samples in each box, including its corners
+    t = np.concatenate((rng.random((20, 3)), np.array(np.meshgrid([0, 1], [0, 1], [0, 1])).reshape(3, -1).T))
+    points = lower[:, None, :] + t[None, :, :] * (upper - lower)[:, None, :]
+    values = shape.evaluate_point(*points.reshape(-1, 3).T).reshape(200, -1)
+
+    assert (lo[:, None] <= values + 1e-5).all() and (values <= hi[:, None] + 1e-5).all()
+
+
+def test_spheroids_are_centred_on_their_position(ds):
+
+    shape = Spheroid(ds, y=0.3, z=-0.2, xr=0.3, yr=0.4, zr=0.5)
+    x, y, z = (np.array(v) for v in ([0., 0., 0.3, 0.], [0.3, 0.3, 0.3, 0.7], [-0.2, 0.3, -0.2, -0.2]))
+
+    np.testing.assert_allclose(shape.evaluate_point(x, y, z), [-1, 0, 0, 0], atol=1e-6)
+
+
+def test_octree_grid_has_the_surface_of_a_full_evaluation(ds):
+
+    shape = Union(Difference(Cuboid(ds, xd=0.8, yd=0.8, zd=0.8), Sphere(ds, r=0.5)), Torus(ds, x=0.5))
+
+    grid = octree_evaluate(shape, min_block=4, verbose=False)
+    reference = dense(shape)
+
+    assert shape.sign_only
+    np.testing.assert_array_equal(grid <= 0, reference <= 0)
+
+    near = surface_samples(reference)
+    np.testing.assert_allclose(grid[near], reference[near], atol=1e-6)
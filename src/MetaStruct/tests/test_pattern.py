@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+
+from MetaStruct.Objects.Misc.Pattern import CircularPattern, LinearPattern, Pattern
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import dense
+
+
+def copies(ds, centres, r):
+    """Values of the union of spheres of radius r at centres, one sphere at a time."""
+
+    return np.min([dense(Sphere(ds, x=x, y=y, z=z, r=r)) for x, y, z in centres], axis=0)
+
+
+def test_pattern_matches_the_union_of_its_copies(ds):
+
+    shape = Pattern(Sphere(ds, x=-0.6, y=-0.3, z=-0.3, r=0.2), nx=3, ny=2, nz=2, xd=0.5, yd=0.6, zd=0.6)
+    shape.evaluate_grid(verbose=False)
+
+    centres = [(-0.6 + 0.5 * i, -0.3 + 0.6 * j, -0.3 + 0.6 * k) for i in range(3) for j in range(2) for k in range(2)]
+
+    np.testing.assert_allclose(shape.evaluated_grid, copies(ds, centres, 0.2), atol=1e-5)
+
+
+def test_linear_pattern_matches_the_union_of_its_copies(ds):
+
+    shape = LinearPattern(Sphere(ds, x=-0.6, y=-0.4, r=0.2), n=4, direction=(0.4, 0.25, 0))
+
+    centres = [(-0.6 + 0.4 * i, -0.4 + 0.25 * i, 0) for i in range(4)]
+
+    np.testing.assert_allclose(dense(shape), copies(ds, centres, 0.2), atol=1e-5)
+
+
+def test_circular_pattern_matches_the_union_of_its_copies(ds):
+
+    shape = CircularPattern(Sphere(ds, x=0.6, r=0.15), n=5, axis='z')
+
+    centres = [(0.6 * math.cos(2 * math.pi * i / 5), 0.6 * math.sin(2 * math.pi * i / 5), 0) for i in range(5)]
+
+    np.testing.assert_allclose(dense(shape), copies(ds, centres, 0.15), atol=1e-5)
@@ -0,0 +1,72 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from MetaStruct.Objects.Points.PointClouds import PoissonDiskPoints, PointsOnSphere, SurfacePoints
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+
+
+def test_poisson_disk_points_are_inside_and_spaced(ds):
+
+    shape = Sphere(ds, r=0.8)
+    cloud = PoissonDiskPoints(shape, r=0.1, seed=1)
+
+    points = cloud.points
+
+    assert len(points) > 100
+    assert (shape.evaluate_point(points[:, 0], points[:, 1], points[:, 2]) <= 0).all()
+    assert cKDTree(points).query(points, k=2)[0][:, 1].min() >= 0.1 - 1e-9
+
+
+def test_poisson_disk_points_follow_the_radius_field(ds):
+
+    shape = Sphere(ds, r=0.8)
+
+    def radius(x, y, z):
+        return np.where(x > 0, 0.2, 0.1)
+
+    points = PoissonDiskPoints(shape, r=0.1, radius_field=radius, seed=1).points
+
+    distances, neighbours = cKDTree(points).query(points, k=2)
+    radii = np.maximum(radius(*points.T), radius(*points[neighbours[:, 1]].T))
+
+    assert (distances[:, 1] >= radii - 1e-9).all()
+    assert (points[:, 0] > 0).sum() < (points[:, 0] <= 0).sum()
+
+
+def test_poisson_disk_points_are_repeatable(ds):
+
+    shape = Sphere(ds, r=0.5)
+
+    np.testing.assert_array_equal(PoissonDiskPoints(shape, r=0.1, seed=3).points,
+                                  PoissonDiskPoints(shape, r=0.1, seed=3).points)
+
+
+def test_points_on_sphere_lie_on_it(ds):
+
+    sphere = Sphere(ds, x=0.1, y=-0.2, r=0.6)
+    points = PointsOnSphere(200, sphere).points
+
+    assert points.shape == (200, 3)
+    np.testing.assert_allclose(sphere.evaluate_point(points[:, 0], points[:, 1], points[:, 2]), 0, atol=1e-6)
+
+    # The golden angle spiral from the top of the sphere to the bottom
+    phi = np.pi * (3 - np.sqrt(5))
+    y = 1 - 2 * np.arange(200) / 199
+    spiral = np.stack((np.cos(phi * np.arange(200)) * np.sqrt(1 - y ** 2), y,
+                       np.sin(phi * np.arange(200)) * np.sqrt(1 - y ** 2)), axis=1)
+
+    np.testing.assert_allclose(points, spiral * 0.6 + [0.1, -0.2, 0], atol=1e-12)
+
+
+def test_surface_points_lie_on_the_surface(ds):
+
+    shape = Cuboid(ds, xd=1, yd=0.8, zd=0.6)
+
+    for method, tolerance in (('mesh', 0.5 * ds.x_step), ('gradient', 1e-3)):
+
+        points = SurfacePoints(300, shape, method=method, seed=2).points
+        values = shape.evaluate_point(points[:, 0], points[:, 1], points[:, 2])
+
+        assert len(points) == 300
+        assert np.abs(values).max() < tolerance, method
@@ -0,0 +1,37 @@
+import numpy as np
+
+from MetaStruct.Functions.Refinement import refine_evaluate
+from MetaStruct.Objects.Booleans.Boolean import Union
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.testing import surface_samples
+
+
+def test_refined_grid_matches_a_dense_fine_grid(ds):
+
+    shape = Union(Sphere(ds, x=-0.3, r=0.45), Cuboid(ds, x=0.4, xd=0.5, yd=0.5, zd=0.5))
+    grid = refine_evaluate(shape, levels=2, block_size=8, verbose=False)
+
+    (X, Y, Z), _ = ds.axes(4)
+    reference = np.asarray(shape.evaluate_point(*np.meshgrid(X, Y, Z, indexing='ij')), dtype=np.float32)
+
+    assert grid.shape == reference.shape
+    assert len(grid.leaves) < grid.states.size / 2
+
+    values = grid.to_dense()
+    near = surface_samples(reference)
+
+    np.testing.assert_array_equal(values <= 0, reference <= 0)
+    np.testing.assert_allclose(values[near], reference[near], atol=1e-6)
+
+
+def test_refined_mesh_lies_on_the_surface(ds):
+
+    sphere = Sphere(ds, r=0.6)
+    grid = refine_evaluate(sphere, levels=2, block_size=8, verbose=False)
+
+    (X, Y, Z), steps = ds.axes(4)
+    vertices, _, _, _ = grid.marching_cubes(spacing=steps)
+    vertices = vertices + np.array([X[0], Y[0], Z[0]])
+
+    np.testing.assert_allclose(np.linalg.norm(vertices, axis=1), 0.6, atol=0.1 * max(steps))
@@ -0,0 +1,38 @@
+import numpy as np
+
+from MetaStruct.Functions.Scheduler import parallel_evaluate, topological_order
+from MetaStruct.Objects.Booleans.Boolean import Difference, Intersection, SmoothUnion, Union
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.Shapes.Torus import Torus
+from MetaStruct.testing import dense, surface_samples
+
+
+def test_parallel_grid_matches_dense_evaluation(ds):
+
+    shared = Sphere(ds, r=0.3)
+    left = Union(Cuboid(ds, x=-0.4, xd=0.5, yd=0.5, zd=0.5), shared)
+    right = Difference(Torus(ds, x=0.3), shared)
+    shape = SmoothUnion(left, right)
+
+    # The shared sphere is one node of the tree, so it is evaluated once
+    assert sum(node is shared for node in topological_order(shape)) == 1
+
+    grid = parallel_evaluate(shape, processes=2, verbose=False)
+
+    np.testing.assert_allclose(grid, dense(shape), atol=1e-5)
+    np.testing.assert_allclose(left.evaluated_grid, dense(left), atol=1e-6)
+    np.testing.assert_allclose(right.evaluated_grid, dense(right), atol=1e-6)
+
+
+def test_parallel_root_intersection_has_the_dense_surface(ds):
+
+    shape = Intersection(Union(Cuboid(ds, xd=0.8, yd=0.8, zd=0.2), Sphere(ds, r=0.4)), Sphere(ds, r=0.7))
+
+    grid = parallel_evaluate(shape, processes=2, verbose=False)
+    reference = dense(shape)
+
+    np.testing.assert_array_equal(grid <= 0, reference <= 0)
+
+    near = surface_samples(reference)
+    np.testing.assert_allclose(grid[near], reference[near], atol=1e-6)
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from MetaStruct.Functions.Serialization import load_model, save_model
+from MetaStruct.Objects.Booleans.Boolean import Intersection, SmoothUnion, Union
+from MetaStruct.Objects.Lattices.Gyroid import Gyroid
+from MetaStruct.Objects.Lattices.StrutLattice import DelaunayLattice
+from MetaStruct.Objects.Misc.Field import LinearField
+from MetaStruct.Objects.Misc.Noise import Noise
+from MetaStruct.Objects.Points.PointClouds import PoissonDiskPoints
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.ImplicitFunction import ImplicitFunction
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.Transforms.Transform import Rotate
+from MetaStruct.testing import dense
+
+
+def model(ds):
+
+    shared = Sphere(ds, x=0.3, r=0.4)
+    struts = DelaunayLattice(ds, PoissonDiskPoints(shared, r=0.2, seed=1), r=0.03)
+    graded = Gyroid(ds, nx=2, ny=2, nz=2, vf=LinearField(start_value=0.2, end_value=0.5))
+
+    return SmoothUnion(Union(Intersection(shared, struts), Rotate(Cuboid(ds, x=-0.5, xd=0.3, yd=0.3, zd=0.3), 20)),
+                       Union(Noise(ds, ImplicitFunction(ds, 'sqrt(x**2 + y**2 + z**2) - 0.2', y=-0.5,
+                                                       limits=((-0.2, 0.2),) * 3), seed=3),
+                             Intersection(Sphere(ds, z=0.6, r=0.3), graded)))
+
+
+def test_saved_models_load_with_the_same_field(ds, tmp_path):
+
+    shape = model(ds)
+    path = tmp_path / 'model.json'
+
+    save_model(shape, str(path))
+    loaded = load_model(str(path))
+
+    assert os.path.exists(tmp_path / 'model.npz')
+    assert loaded is not shape and loaded.design_space is ds
+
+    np.testing.assert_array_equal(dense(loaded), dense(shape))
+
+    # Nodes shared in the tree stay shared
+    intersection = loaded.shape1.shape1
+    assert intersection.shape1 is intersection.shape2.point_cloud.shape
+
+
+def test_saved_models_load_in_a_new_process(ds, tmp_path):
+
+    shape = model(ds)
+    save_model(shape, str(tmp_path / 'model.json'))
+
+    script = ('import sys, numpy as np\n'
+              'from MetaStruct.Functions.Serialization import load_model\n'
+              'from MetaStruct.testing import dense\n'
+              'np.save(sys.argv[2], dense(load_model(sys.argv[1])))\n')
+
+    subprocess.run([sys.executable, '-c', script, str(tmp_path / 'model.json'), str(tmp_path / 'values.npy')],
+                   check=True, capture_output=True)
+
+    np.testing.assert_allclose(np.load(tmp_path / 'values.npy'), dense(shape), atol=1e-6)
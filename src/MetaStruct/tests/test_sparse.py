@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from skimage import measure
+
+from MetaStruct.Objects.Booleans.Boolean import Add, Blend, Difference, Subtract, Union
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.Shapes.Torus import Torus
+from MetaStruct.Objects.SparseGrid import SparseGrid
+from MetaStruct.testing import dense, surface_samples
+
+
+def mesh_area(vertices, faces):
+
+    a, b, c = (vertices[faces[:, i]] for i in range(3))
+
+    return np.linalg.norm(np.cross(b - a, c - a), axis=1).sum() / 2
+
+
+def test_sparse_grids_hold_the_dense_values_near_the_surface(ds):
+
+    shape = Difference(Cuboid(ds, xd=0.8, yd=0.8, zd=0.8), Sphere(ds, r=0.5))
+    sparse, reference = SparseGrid.from_shape(shape, block_size=4, verbose=False), dense(shape)
+
+    assert isinstance(sparse, SparseGrid) and sparse.nbytes < reference.nbytes
+
+    for key, leaf in sparse.leaves.items():
+        np.testing.assert_allclose(leaf, reference[sparse.block_slices(key)], atol=1e-6)
+
+    values = sparse.to_dense()
+    near = surface_samples(reference)
+
+    np.testing.assert_array_equal(values <= 0, reference <= 0)
+    np.testing.assert_allclose(values[near], reference[near], atol=1e-6)
+
+
+def test_sparse_marching_cubes_gives_the_dense_surface(ds):
+
+    reference = dense(Torus(ds))
+    sparse = SparseGrid.from_dense(reference, block_size=8)
+
+    vertices, faces, _, _ = sparse.marching_cubes()
+    dense_vertices, dense_faces, _, _ = measure.marching_cubes(reference, level=0)
+
+    assert len(vertices) == len(dense_vertices)
+    np.testing.assert_allclose(mesh_area(vertices, faces), mesh_area(dense_vertices, dense_faces), rtol=1e-6)
+
+
+def test_combined_sparse_grids_match_the_dense_boolean(ds):
+
+    a, b = Sphere(ds, x=-0.3, r=0.5), Cuboid(ds, x=0.3, xd=0.6, yd=0.6, zd=0.6)
+    reference = dense(Union(a, b))
+
+    combined = SparseGrid.from_dense(dense(a), 8).combine(SparseGrid.from_dense(dense(b), 8), 'where(g1<g2, g1, g2)')
+    values = combined.to_dense()
+    near = surface_samples(reference)
+
+    np.testing.assert_array_equal(values <= 0, reference <= 0)
+    np.testing.assert_allclose(values[near], reference[near], atol=1e-6)
+
+
+@pytest.mark.parametrize('operation', [Subtract, Add, Blend])
+def test_sparse_arithmetic_booleans_keep_the_dense_sign(ds, operation):
+
+    shape = operation(Sphere(ds, x=-0.3, r=0.8), Sphere(ds, x=0.6, r=0.3))
+    reference = dense(shape)
+
+    shape.evaluate_grid(verbose=False, sparse=True, exact=True)
+    values = shape.evaluated_grid.to_dense()
+    near = surface_samples(reference)
+
+    np.testing.assert_array_equal(values <= 0, reference <= 0)
+    np.testing.assert_allclose(values[near], reference[near], atol=1e-6)
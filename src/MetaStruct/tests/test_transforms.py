@@ -0,0 +1,68 @@
+import numpy as np
+
+from MetaStruct.Objects.Shapes.Cuboid import Cuboid
+from MetaStruct.Objects.Shapes.Sphere import Sphere
+from MetaStruct.Objects.Transforms.Transform import Rotate, Scale
+from MetaStruct.Objects.Transforms.Warp import ConformalWarp, PringleWarp
+
+from MetaStruct.testing import dense
+
+
+def test_scaled_sphere_matches_larger_sphere(ds):
+
+    np.testing.assert_allclose(dense(Scale(Sphere(ds, r=0.25), 2)), dense(Sphere(ds, r=0.5)), atol=1e-5)
+
+
+def test_rotated_cuboid_matches_swapped_cuboid(ds):
+
+    rotated = Rotate(Cuboid(ds, xd=0.8, yd=0.4, zd=0.6), 90, 'z')
+
+    np.testing.assert_allclose(dense(rotated), dense(Cuboid(ds, xd=0.4, yd=0.8, zd=0.6)), atol=1e-5)
+
+
+def test_pringle_matches_shape_at_bent_points(ds):
+
+    sphere = Sphere(ds, r=0.5)
+    sphere.pringle(0.2)
+
+    bent = ds.z_grid + 0.2 * (ds.x_grid ** 2 - ds.y_grid ** 2)
+
+    np.testing.assert_allclose(sphere.evaluated_grid, sphere.evaluate_point(ds.x_grid, ds.y_grid, bent), atol=1e-5)
+
+    # The design space grids are left alone
+    assert ds.z_grid is sphere.z_grid
+
+
+def test_pringle_limits_contain_shape(ds):
+
+    warp = PringleWarp(Cuboid(ds, xd=1.2, yd=0.8, zd=0.2), 0.3)
+
+    inside = dense(warp) <= 0
+
+    assert inside.any()
+
+    for grid, limits in ((ds.x_grid, warp.x_limits), (ds.y_grid, warp.y_limits), (ds.z_grid, warp.z_limits)):
+        assert limits[0] <= grid[inside].min() and grid[inside].max() <= limits[1]
+
+
+def test_conformal_warp_is_scaled_by_radius(ds):
+
+    sphere = Sphere(ds, x=0.3, r=0.4)
+    warp = ConformalWarp(sphere, r0=0.5)
+
+    radius = np.sqrt(ds.x_grid ** 2 + ds.y_grid ** 2)
+    reference = sphere.evaluate_point(np.log(radius / 0.5), np.arctan2(ds.y_grid, ds.x_grid), ds.z_grid)
+
+    np.testing.assert_allclose(dense(warp), reference * np.minimum(radius, 1), rtol=1e-4, atol=1e-5)
+
+
+def test_conformal_warp_changes_no_faster_than_distance_near_surface(ds):
+
+    grid = dense(ConformalWarp(Sphere(ds, x=0.3, r=0.4), r0=0.5))
+    slope = np.linalg.norm(np.gradient(grid, ds.X, ds.Y, ds.Z), axis=0)
+
+    # Away from the axis, where the map is smooth
+    near = (np.abs(grid) < ds.x_step) & (np.hypot(ds.x_grid, ds.y_grid) > 2 * ds.x_step)
+
+    assert near.any()
+    assert slope[near].max() < 1.1
@@ -0,0 +1,45 @@
+import argparse
+
+from MetaStruct.Functions.Backends import compute_context
+from MetaStruct.Functions.Distributed import DEFAULT_ADDRESS, get_authkey, serve
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(prog='metastruct-worker',
+                                     description='Evaluates tiles of the scenes sent by distributed_evaluate.')
+
+    parser.add_argument('--address', default=DEFAULT_ADDRESS,
+                        help='host:port to listen on (port 0 for any free port), or unix:path for a Unix socket')
+    parser.add_argument('--threads', type=int, default=None, help='numexpr threads, all cores by default')
+    parser.add_argument('--quiet', action='store_true', help='only print the address listened on')
+    parser.add_argument('--authkey-file', default=None,
+                        help='file holding the key clients must prove they hold, the METASTRUCT_AUTHKEY environment '
+                             'variable is used if not given')
+
+    args = parser.parse_args(argv)
+
+    authkey = None
+
+    if args.authkey_file is not None:
+        with open(args.authkey_file, 'rb') as f:
+            authkey = f.read().strip()
+
+    try:
+        authkey = get_authkey(authkey)
+
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.threads is not None:
+        compute_context.set_threads(args.threads)
+
+    try:
+        serve(args.address, verbose=not args.quiet, authkey=authkey)
+
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()